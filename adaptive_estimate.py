@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Script to estimate journey metrics for one persona with adaptive Monte Carlo early stopping
+"""
+
+import argparse
+
+from simulation.batch import PREFERENCE_FLAGS
+from simulation.logic import CustomerSimulator
+from simulation.monte_carlo import adaptive_estimate, METRICS, DEFAULT_TARGET_WIDTHS
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive Monte Carlo estimate of ShopTwin journey metrics")
+    parser.add_argument("persona", help="Persona name, e.g. 'Budget Shopper'")
+    parser.add_argument("--budget", type=int, default=3, help="Budget sensitivity (1-5)")
+    parser.add_argument("--prefs", nargs="*", default=[], choices=PREFERENCE_FLAGS, help="Enabled preference flags")
+    parser.add_argument("--store", default=None, help="Store id from data/stores.json")
+    parser.add_argument("--metrics", nargs="+", default=list(METRICS), choices=METRICS, help="Metrics to track")
+    parser.add_argument("--time-width", type=float, default=DEFAULT_TARGET_WIDTHS["total_time"],
+                        help="Target CI width for total time, dwell plus walking (minutes)")
+    parser.add_argument("--coverage-width", type=float, default=DEFAULT_TARGET_WIDTHS["coverage"],
+                        help="Target CI width for coverage (fraction)")
+    parser.add_argument("--dwell-width", type=float, default=DEFAULT_TARGET_WIDTHS["dwell"],
+                        help="Target CI width for per-section dwell (minutes)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level")
+    parser.add_argument("--batch", type=int, default=50, help="Journeys per batch")
+    parser.add_argument("--max", type=int, default=5000, help="Maximum number of journeys")
+    parser.add_argument("--fixed-n", type=int, default=None, help="Fixed-N run to compare against (default: --max)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    simulator = CustomerSimulator(store_id=args.store)
+    if args.persona not in simulator.persona_data:
+        parser.error(f"Unknown persona {args.persona!r}; choose from {', '.join(simulator.persona_data)}")
+    report = adaptive_estimate(
+        simulator, args.persona, args.budget, {flag: flag in args.prefs for flag in PREFERENCE_FLAGS},
+        metrics=args.metrics,
+        target_widths={"total_time": args.time_width, "coverage": args.coverage_width, "dwell": args.dwell_width},
+        confidence=args.confidence, batch_size=args.batch, max_samples=args.max, fixed_n=args.fixed_n,
+        seed=args.seed
+    )
+
+    status = "converged" if report["converged"] else "did NOT converge"
+    print(f"{args.persona}: {status} after {report['samples']} journeys in {report['batches']} batches "
+          f"({report['elapsed_seconds']:.2f}s)")
+    print(f"Saved {report['saved_runs']} of {report['fixed_n']} fixed-N runs ({report['saved_fraction'] * 100:.0f}%), "
+          f"about {report['fixed_n_seconds'] - report['elapsed_seconds']:.2f}s of compute")
+    estimates = report["estimates"]
+    for name in ("total_time", "coverage"):
+        if name in estimates:
+            e = estimates[name]
+            print(f"  {name:25s} {e['mean']:8.3f}  [{e['low']:.3f}, {e['high']:.3f}]  width {e['width']:.3f}")
+    dwell = sorted(((n, e) for n, e in estimates.items() if n.startswith("dwell:")), key=lambda item: -item[1]["mean"])
+    for name, e in dwell[:10]:
+        print(f"  {name:25s} {e['mean']:8.3f}  [{e['low']:.3f}, {e['high']:.3f}]  width {e['width']:.3f}")
+
+if __name__ == "__main__":
+    main()
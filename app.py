@@ -5,12 +5,25 @@ import json
 import pandas as pd
 from simulation.logic import CustomerSimulator
 from simulation.dashboard import AnalyticsDashboard
+from simulation.journey_store import JourneyStore
+from simulation.journey_index import JourneyIndex
+from simulation.history import JourneyHistory, DEFAULT_SESSION_HISTORY, DEFAULT_GLOBAL_HISTORY
+from simulation.summary import columns_from_store
+from simulation.section_stats import SectionStatsIndex, DWELL_PERCENTILES
+from simulation.tiles import TilePyramid, TileRenderer, ensure_pyramid, file_version, heat_layer, mask_layer
+from simulation.checkout_queue import ServiceModel
+from simulation.travel import TravelModel, journey_total_time
 import time
+import tempfile
+import uuid
 import base64
 from io import BytesIO
 import PIL.Image
 import os
-from simulation.pathfinding_cv import load_aisle_mask, compute_full_path, draw_path_on_image, overlay_mask_on_map
+from simulation.pathfinding_cv import load_aisle_mask, compute_full_path, draw_path_on_image, overlay_points_and_paths, polyline_length
+from simulation.store_registry import StoreRegistry
+from simulation.batch import export_trajectories
+from simulation.background import JobManager, journey_job, RUNNING, DONE, FAILED
 import cv2
 import numpy as np
 from collections import Counter
@@ -79,6 +92,125 @@ PERSONA_AVATARS = {
 }
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNEY_STORE_DIR = os.path.join(BASE_DIR, "data", "journeys")
+TILE_DIR = os.path.join(BASE_DIR, "data", "tiles")
+# Widest image the map explorer sends to the browser; coarser pyramid levels are used above it
+EXPLORER_WIDTH = 900
+# Journeys kept for insights: per browser session, and shared by all sessions (0 disables)
+SESSION_HISTORY_SIZE = DEFAULT_SESSION_HISTORY
+GLOBAL_HISTORY_SIZE = DEFAULT_GLOBAL_HISTORY
+
+@st.cache_resource
+def get_store_registry():
+    """Per-store layouts, aisle grids and route caches shared by all sessions, hot-reloaded on edits"""
+    return StoreRegistry(watch=True)
+
+def get_store_assets(store_id=None):
+    """Store layout, aisle grid and route caches for one store (loaded on demand, LRU-evicted)"""
+    return get_store_registry().get(store_id)
+
+@st.cache_resource
+def get_job_manager():
+    """Background executor for simulation jobs, shared by all sessions"""
+    return JobManager(max_workers=4)
+
+def get_session_key():
+    """Stable id of this browser session, used to key its background job"""
+    if 'session_key' not in st.session_state:
+        st.session_state.session_key = uuid.uuid4().hex
+    return st.session_state.session_key
+
+@st.cache_resource
+def get_journey_store(store_id=None):
+    """Shared on-disk journey store that accumulates results across runs and sessions"""
+    simulator = CustomerSimulator(store_id=store_id, registry=get_store_registry())
+    return JourneyStore(os.path.join(JOURNEY_STORE_DIR, f"{simulator.store_id}.bin"), sections=simulator.sections,
+                        personas=list(simulator.persona_data.keys()))
+
+def journey_store_version(store_id=None):
+    """(generation, records, live journeys) of the journey store: changes on append, delete and compaction"""
+    store = get_journey_store(store_id)
+    records = store.records()
+    return store.generation(), len(records), int(store.live_mask(records).sum())
+
+@st.cache_resource(max_entries=8)
+def get_section_stats(store_id=None, version=None):
+    """Per-section stats index of the stored journeys, rebuilt only when the store version changes"""
+    return SectionStatsIndex.from_store(get_journey_store(store_id))
+
+@st.cache_data
+def map_image_uri(path, mtime):
+    """Store map as a data URI for Plotly, straight from the file bytes (no decode/re-encode)"""
+    with PIL.Image.open(path) as img:
+        # Only the header is read; the map assets are not always PNG despite the extension
+        mime = PIL.Image.MIME.get(img.format, "image/png")
+    with open(path, "rb") as f:
+        return f"data:{mime};base64," + base64.b64encode(f.read()).decode("ascii")
+
+def get_tile_renderer(store_id=None):
+    """Tile renderer over the store map's pyramid, rebuilt when the map file changes"""
+    map_path = get_store_registry().paths(store_id)["map"]
+    return _tile_renderer(get_store_registry().resolve(store_id), map_path, file_version(map_path))
+
+@st.cache_resource(max_entries=8)
+def _tile_renderer(store_id, map_path, version):
+    base = ensure_pyramid(os.path.join(TILE_DIR, store_id, "map"), version,
+                          lambda: cv2.imread(map_path, cv2.IMREAD_COLOR))
+    return TileRenderer(base)
+
+def get_mask_tiles(store_id=None):
+    """Aisle mask overlay pyramid, rebuilt when the mask or map file changes"""
+    paths = get_store_registry().paths(store_id)
+    return _mask_tiles(get_store_registry().resolve(store_id), file_version(paths["mask"], paths["map"]))
+
+@st.cache_resource(max_entries=8)
+def _mask_tiles(store_id, version):
+    return ensure_pyramid(os.path.join(TILE_DIR, store_id, "mask"), version,
+                          lambda: mask_layer(get_store_assets(store_id).state.mask))
+
+@st.cache_resource(max_entries=4)
+def get_heat_tiles(store_id=None, version=None):
+    """In-memory dwell heatmap pyramid (expected minutes per journey in each section's aisles)"""
+    index = get_section_stats(store_id, version)
+    state = get_store_assets(store_id).state
+    values = np.zeros(len(state.section_names))
+    for i, name in enumerate(state.section_names):
+        if name in index.section_ids:
+            col = index.section_ids[name]
+            values[i] = index.dwell_mean[0, col] * index.visit_rate[0, col]
+    return TilePyramid.build(heat_layer(state.section_labels, values), version=f"heat:{store_id}:{version}")
+
+def render_base_map(store_id=None):
+    """Full store map in BGR from cached tiles (a fresh array, safe to draw on)"""
+    return get_tile_renderer(store_id).render()["image"]
+
+@st.cache_resource
+def get_journey_index(store_id=None):
+    """Bitmap index over the journey store; refreshed incrementally on each query"""
+    return JourneyIndex(get_journey_store(store_id))
+
+@st.cache_resource
+def get_global_history(store_id=None):
+    """History shared by all sessions, seeded once from the journey store"""
+    history = JourneyHistory(GLOBAL_HISTORY_SIZE)
+    history.extend(get_journey_store(store_id).recent_results(limit=GLOBAL_HISTORY_SIZE))
+    return history
+
+def get_session_history(store_id=None):
+    """This session's bounded journey history for the store"""
+    if 'journey_history' not in st.session_state:
+        st.session_state.journey_history = {}
+    histories = st.session_state.journey_history
+    if store_id not in histories:
+        histories[store_id] = JourneyHistory(SESSION_HISTORY_SIZE)
+    return histories[store_id]
+
+def record_history(results):
+    """Add a finished journey to the session and global histories"""
+    store_id = results.get('store_id')
+    get_session_history(store_id).append(results)
+    if GLOBAL_HISTORY_SIZE > 0:
+        get_global_history(store_id).append(results)
 
 def main():
     # Header
@@ -87,6 +219,14 @@ def main():
     
     # Sidebar
     with st.sidebar:
+        st.header("🏬 Store")
+        registry = get_store_registry()
+        store_ids = registry.store_ids()
+        store_id = st.selectbox("Store Format", store_ids, index=store_ids.index(registry.default_store),
+                                format_func=lambda sid: registry.stores[sid]["name"], key="store_id")
+
+        st.markdown("---")
+
         st.header("🎭 Customer Persona")
         
         # Persona selection with avatars
@@ -140,26 +280,50 @@ def main():
         
         # Simulation button
         simulate_btn = st.button("🎯 Simulate Customer Journey", type="primary", use_container_width=True)
+        params = {
+            'store_id': store_id,
+            'persona': selected_persona,
+            'budget_sensitivity': budget_sensitivity,
+            'preferences': {
+                'eco_preference': eco_preference,
+                'time_constraint': time_constraint,
+                'health_focus': health_focus,
+                'convenience_priority': convenience_priority
+            },
+            'entrance': "Southwest Entrance",
+            'exit': "Southwest Exit"
+        }
+        manager = get_job_manager()
+        session_key = get_session_key()
+        job = manager.get(session_key)
         if simulate_btn:
-            with st.spinner("Simulating customer journey..."):
-                try:
-                    simulator = CustomerSimulator()
-                    results = simulator.simulate_journey(
-                        persona=selected_persona,
-                        budget_sensitivity=budget_sensitivity,
-                        preferences={
-                            'eco_preference': eco_preference,
-                            'time_constraint': time_constraint,
-                            'health_focus': health_focus,
-                            'convenience_priority': convenience_priority
-                        },
-                        entrance="Southwest Entrance",
-                        exit="Southwest Exit"
-                    )
-                    st.session_state.simulation_results = results
-                    st.success("Simulation completed!")
-                except Exception as e:
-                    st.error(f"Simulation failed: {e}")
+            try:
+                simulator = CustomerSimulator(store_id=store_id, registry=registry)
+                # Simulation and routing run in the background; reruns poll the job for progress
+                job = manager.submit(session_key, params, journey_job(simulator, get_store_assets(store_id).state))
+            except Exception as e:
+                st.error(f"Simulation failed: {e}")
+        elif job is not None and job.running and job.params != params:
+            # Parameters changed while routing: the running job is stale
+            job.cancel()
+            st.info("Parameters changed, cancelled the running simulation.")
+        if job is not None:
+            if job.status == FAILED:
+                st.error(f"Simulation failed: {job.error}")
+            elif job.running:
+                progress = job.done_steps / job.total_steps if job.total_steps else 0.0
+                st.progress(progress, text=f"Routing segments {job.done_steps}/{job.total_steps}")
+            elif job.status == DONE and not job.recorded:
+                job.recorded = True
+                record_history(job.results)
+                get_journey_store(store_id).append(job.results)
+                st.success("Simulation completed!")
+            if job.results is not None and job.status in (RUNNING, DONE):
+                st.session_state.simulation_results = job.results
+            if job.recorded or job.status == FAILED:
+                # Output is in session state (or the error was shown); the manager can forget the job
+                manager.collect(session_key, job)
+    job_running = job is not None and job.running
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -170,18 +334,15 @@ def main():
         # Debug: Option to show mask overlay
         debug_mask_overlay = st.checkbox("Show aisle mask overlay (debug)", value=False)
         if debug_mask_overlay:
-            img_path = os.path.join(BASE_DIR, "assets", "walmart_layout.png")
-            mask_path = os.path.join(BASE_DIR, "assets", "aisle_mask_resized.png")
-            img = PIL.Image.open(img_path)
-            mask_img = PIL.Image.open(mask_path)
-            img_np = np.array(img)
-            mask_np = np.array(mask_img)
-            overlay = overlay_mask_on_map(img_np, mask_np, alpha=0.4)
-            st.image(overlay, caption="Aisle Mask Overlay on Store Map (debug)", use_container_width=True)
+            store_id = (st.session_state.simulation_results or {}).get('store_id')
+            overlay = get_tile_renderer(store_id).render(overlays=[get_mask_tiles(store_id)])["image"]
+            st.image(overlay, channels="BGR", caption="Aisle Mask Overlay on Store Map (debug)", use_container_width=True)
         
         if st.session_state.simulation_results:
-            # Create store layout visualization
-            create_store_visualization(st.session_state.simulation_results)
+            # Create store layout visualization (partial route while the background job is running)
+            create_store_visualization(st.session_state.simulation_results,
+                                       route=job.route_snapshot() if job_running else None)
+            create_map_explorer(st.session_state.simulation_results.get('store_id'))
         else:
             st.info("👈 Select a persona and click 'Simulate' to see the customer journey!")
     
@@ -206,6 +367,11 @@ def main():
         with col2:
             create_insights_panel(st.session_state.simulation_results)
 
+        create_history_filter_panel(st.session_state.simulation_results.get('store_id'))
+        persona_summary_table(st.session_state.simulation_results.get('store_id'))
+        create_archetype_panel(st.session_state.simulation_results.get('store_id'))
+        create_checkout_panel(st.session_state.simulation_results.get('store_id'))
+
     # Download/export buttons
     if st.session_state.simulation_results:
         st.download_button(
@@ -224,35 +390,56 @@ def main():
             file_name="dwell_times.csv",
             mime="text/csv"
         )
+        results = st.session_state.simulation_results
+        if 'leg_distance_m' in results:
+            sections = [s for s in results['path'] if s in get_store_assets(results.get('store_id')).section_coords]
+            legs = pd.DataFrame({
+                "From": sections[:-1],
+                "To": sections[1:],
+                "Distance (m)": results['leg_distance_m'],
+                "Walk Time (min)": results['leg_walk_time'],
+            })
+            st.download_button(
+                label="Download Walking Legs (CSV)",
+                data=legs.to_csv(index=False),
+                file_name="walking_legs.csv",
+                mime="text/csv"
+            )
+        if not job_running:
+            # Routed path as a compact delta/varint trajectory (routes are cached, so this is cheap)
+            results = st.session_state.simulation_results
+            trajectory = BytesIO()
+            export_trajectories([results], get_store_assets(results.get('store_id')).state, trajectory)
+            st.download_button(
+                label="Download Route (Binary Trajectory)",
+                data=trajectory.getvalue(),
+                file_name="journey_route.sttr",
+                mime="application/octet-stream"
+            )
 
-def create_store_visualization(results):
-    """Create the advanced store layout visualization with customer path over the Walmart map image"""
-    img_path = os.path.join(BASE_DIR, "assets", "walmart_layout.png")
-    mask_path = os.path.join(BASE_DIR, "assets", "aisle_mask.png")
+    if job_running:
+        # Poll the background job; widget interactions interrupt this rerun immediately
+        time.sleep(0.5)
+        st.rerun()
+
+def create_store_visualization(results, route=None):
+    """Create the advanced store layout visualization with customer path over the Walmart map image.
+    route: optional (snapped_stops, path_segments, failed_pairs) already routed, e.g. partial background output"""
+    store_id = results.get('store_id')
+    img_path = get_store_registry().paths(store_id)["map"]
     img = PIL.Image.open(img_path)
-    width, height = img.size
-
-    # Load and resize mask if needed
-    mask_img = PIL.Image.open(mask_path)
-    mask_width, mask_height = mask_img.size
-    if (width, height) != (mask_width, mask_height):
-        st.warning(f"Resizing aisle mask from {mask_width}x{mask_height} to {width}x{height} for alignment.")
-        mask_img = mask_img.resize((width, height), PIL.Image.Resampling.NEAREST)
-        # Save to a temporary file for OpenCV loading
-        temp_mask_path = os.path.join(BASE_DIR, "assets", "aisle_mask_resized.png")
-        mask_img.save(temp_mask_path)
-        mask_path = temp_mask_path
-
-    with open(os.path.join(BASE_DIR, "data", "store_layout.json"), "r") as f:
-        store_data = json.load(f)
-    section_coords = {}
-    for s in store_data['sections']:
-        x, y = s['position']['x'], s['position']['y']
-        if 0 <= x <= 1 and 0 <= y <= 1:
-            px, py = int(x * width), int(y * height)
-        else:
-            px, py = int(x), int(y)
-        section_coords[s['name']] = (px, py)
+
+    try:
+        assets = get_store_assets(store_id)
+    except Exception as e:
+        st.warning(f"Aisle mask error: {e}")
+        st.image(img, caption="Walmart Store Layout", use_container_width=True)
+        return
+    # Hold one snapshot for the whole render; a hot reload swaps in a new one for later reruns
+    state = assets.state
+    store_data = state.store_data
+    grid = state.grid
+    section_coords = state.section_coords
 
     path_sections = results['path']
     
@@ -273,43 +460,45 @@ def create_store_visualization(results):
     unique_sections = []
     seen = set()
     for section in path_sections:
-        if section not in seen:
+        if section not in seen and section in section_coords:
             unique_sections.append(section)
             seen.add(section)
-    stop_points = [section_coords[section] for section in unique_sections if section in section_coords]
-
-    if len(stop_points) >= 2:
-        try:
-            from simulation.pathfinding_cv import snap_to_aisle, overlay_points_and_paths, load_aisle_mask
-            grid, _ = load_aisle_mask(mask_path)
-            if grid is None:
-                st.warning(f"Aisle mask not found or could not be loaded: {mask_path}.")
-                st.image(img, caption="Walmart Store Layout", use_container_width=True)
-                return
-        except Exception as e:
-            st.warning(f"Aisle mask error: {e}")
-            st.image(img, caption="Walmart Store Layout", use_container_width=True)
-            return
-        snapped_stops = [snap_to_aisle(grid, pt) for pt in stop_points]
-        from simulation.pathfinding_cv import astar
-        path_segments = []
-        failed_pairs = []
-        for i in range(len(snapped_stops)-1):
-            start, end = snapped_stops[i], snapped_stops[i+1]
-            segment = astar(grid, start, end)
-            if segment is None:
-                failed_pairs.append((start, end))
-                continue
-            path_segments.append(segment)
-        img_color = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-        dwell_times = []
-        for section in unique_sections:
-            dwell_times.append(results['dwell_time'].get(section, 0))
-        img_with_overlay, walkability = overlay_points_and_paths(
-            img_color, snapped_stops, path_segments, failed_pairs, dwell_times, walkable_mask=grid,
-            section_names=unique_sections, visit_counts=visit_counts)
-        img_display = cv2.cvtColor(img_with_overlay, cv2.COLOR_BGR2RGB)
-        st.image(img_display, caption="Walmart Store Layout with Customer Journey Path", use_container_width=True)
+
+    if len(unique_sections) >= 2:
+        if route is not None:
+            snapped_stops, path_segments, failed_pairs = route
+        else:
+            # Snapped points and section-to-section routes are cached on the store snapshot
+            snapped_stops, path_segments, failed_pairs = state.route_sections(unique_sections, smooth=True)
+        map_view = st.radio("Map View", ["Route Image", "Interactive Map"], horizontal=True, key="map_view")
+        if map_view == "Interactive Map":
+            create_section_map(results, state, img_path, path_segments)
+        else:
+            # Composited from cached map tiles, already BGR: no decode or color conversion per rerun
+            img_color = render_base_map(store_id)
+            dwell_times = []
+            for section in unique_sections:
+                dwell_times.append(results['dwell_time'].get(section, 0))
+            img_with_overlay, walkability = overlay_points_and_paths(
+                img_color, snapped_stops, path_segments, failed_pairs, dwell_times, walkable_mask=grid,
+                section_names=unique_sections, visit_counts=visit_counts)
+            st.image(img_with_overlay, channels="BGR", caption="Walmart Store Layout with Customer Journey Path",
+                     use_container_width=True)
+
+        if route is None and st.button("🎬 Replay Journey"):
+            with st.spinner("Rendering journey replay..."):
+                # One file per render, so concurrent sessions don't overwrite each other's video
+                fd, replay_path = tempfile.mkstemp(suffix=".webm")
+                os.close(fd)
+                try:
+                    AnalyticsDashboard().scenario_replay(
+                        results, render_base_map(store_id), snapped_stops, path_segments, replay_path,
+                        frame_stride=8, fps=24, walkable_mask=grid)
+                    with open(replay_path, "rb") as f:
+                        video = f.read()
+                finally:
+                    os.remove(replay_path)
+                st.video(video, format="video/webm")
         
         # Add path analysis
         st.markdown("---")
@@ -327,18 +516,109 @@ def create_store_visualization(results):
         with col2:
             st.write("**Path Characteristics:**")
             if len(path_sections) > 2:
-                # Calculate path length (number of transitions)
+                # Walking distance between consecutive sections, with the number of legs
                 path_length = len(path_sections) - 1
-                st.metric("Path Length", f"{path_length} steps")
+                if 'walk_distance_m' in results:
+                    st.metric("Path Length", f"{results['walk_distance_m']:.0f} m", f"{path_length} legs", delta_color="off")
+                else:
+                    st.metric("Path Length", f"{path_length} steps")
+            # Euclidean length of the smoothed (any-angle) route
+            route_length = sum(polyline_length(segment) for segment in path_segments)
+            st.metric("Route Length", f"{route_length * TravelModel(state).scale:.0f} m")
+        if route is None:
+            # Map the routed pixels back to sections to find aisles walked through but not planned
+            attribution = state.attribute_segments(path_segments)
+            passed = [name for i, name in enumerate(state.section_names)
+                      if attribution["visits"][i] > 0 and name not in visit_counts]
+            if passed:
+                st.write(f"**Passed Through:** {', '.join(passed)}")
     else:
         st.image(img, caption="Walmart Store Layout", use_container_width=True)
 
+def create_map_explorer(store_id=None):
+    """Pan and zoom the store map with overlays; only the tiles in view are composited"""
+    with st.expander("🔍 Map Explorer"):
+        col1, col2 = st.columns(2)
+        with col1:
+            layers = st.multiselect("Overlays", ["Aisle Mask", "Dwell Heatmap"], key="explorer_layers")
+            center_x = st.slider("Center X (%)", 0, 100, 50, key="explorer_x")
+        with col2:
+            zoom = st.select_slider("Zoom", [1, 2, 4, 8], value=1, key="explorer_zoom")
+            center_y = st.slider("Center Y (%)", 0, 100, 50, key="explorer_y")
+        renderer = get_tile_renderer(store_id)
+        overlays = []
+        if "Aisle Mask" in layers:
+            overlays.append(get_mask_tiles(store_id))
+        if "Dwell Heatmap" in layers:
+            overlays.append(get_heat_tiles(store_id, journey_store_version(store_id)))
+        width, height = renderer.base.width, renderer.base.height
+        view_w, view_h = width / zoom, height / zoom
+        x0 = min(max(center_x / 100 * width - view_w / 2, 0), width - view_w)
+        y0 = min(max(center_y / 100 * height - view_h / 2, 0), height - view_h)
+        view = renderer.render((x0, y0, x0 + view_w, y0 + view_h), output_width=EXPLORER_WIDTH, overlays=overlays)
+        st.image(view["image"], channels="BGR", use_container_width=True)
+        st.caption(f"Zoom {zoom}x · pyramid level {view['level']} (1/{view['scale']} resolution) · "
+                   f"{view['tiles']} tiles · tile cache {renderer.hits:,} hits / {renderer.misses:,} misses")
+
+def create_section_map(results, state, img_path, path_segments):
+    """
+    Plotly store map: section markers sized by visit rate and colored by median dwell,
+    with tooltips from the stored journeys' per-section stats index. The persona menu
+    switches precomputed traces in the browser, so hovering and filtering never rerun.
+    """
+    store_id = results.get('store_id')
+    index = get_section_stats(store_id, journey_store_version(store_id))
+    width, height = state.width, state.height
+    fig = go.Figure()
+    fig.add_layout_image(source=map_image_uri(img_path, os.path.getmtime(img_path)), xref="x", yref="y",
+                         x=0, y=height, sizex=width, sizey=height, sizing="stretch", layer="below")
+    # This journey's smoothed route; points are (row, col) pixels
+    route_x, route_y = [], []
+    for segment in path_segments:
+        route_x += [p[1] for p in segment] + [None]
+        route_y += [height - p[0] for p in segment] + [None]
+    fig.add_trace(go.Scatter(x=route_x, y=route_y, mode="lines", line=dict(color="#1f77b4", width=3),
+                             name="This Journey", hoverinfo="skip"))
+
+    sections = [s for s in index.sections if s in state.section_coords]
+    cols = [index.section_ids[s] for s in sections]
+    x = [state.section_coords[s][1] for s in sections]
+    y = [height - state.section_coords[s][0] for s in sections]
+    dwell = results.get('dwell_time', {})
+    journey = [f"{dwell.get(s, 0)} min" if s in dwell else "not visited" for s in sections]
+    p50, p90 = (f"p{q}" for q in DWELL_PERCENTILES)
+    hover = ("<b>%{text}</b> (%{meta})<br>Visited by %{customdata[0]:,} (%{customdata[1]:.0%})"
+             "<br>Dwell median %{customdata[2]:.1f} min · " + p90 + " %{customdata[3]:.1f} min"
+             "<br>Skip rate %{customdata[4]:.0%}<br>This journey: %{customdata[5]}<extra></extra>")
+    for row, persona in enumerate(index.personas):
+        customdata = np.column_stack([index.visitors[row, cols], index.visit_rate[row, cols],
+                                      index.dwell_percentiles[0, row, cols], index.dwell_percentiles[1, row, cols],
+                                      index.skip_rate[row, cols], np.array(journey, dtype=object)])
+        fig.add_trace(go.Scatter(
+            x=x, y=y, mode="markers", text=sections, meta=persona, customdata=customdata, hovertemplate=hover,
+            name=persona, visible=row == 0,
+            marker=dict(size=8 + 30 * index.visit_rate[row, cols], color=index.dwell_percentiles[0, row, cols],
+                        colorscale="YlOrRd", cmin=0, showscale=row == 0, colorbar=dict(title=f"Dwell {p50}"),
+                        line=dict(color="white", width=1), opacity=0.85)))
+    buttons = [dict(label=persona, method="update",
+                    args=[{"visible": [True] + [i == row for i in range(len(index.personas))],
+                           "marker.showscale": [False] + [i == row for i in range(len(index.personas))]}])
+               for row, persona in enumerate(index.personas)]
+    fig.update_layout(
+        updatemenus=[dict(buttons=buttons, direction="down", x=0, xanchor="left", y=1.12, yanchor="top")],
+        xaxis=dict(range=[0, width], visible=False), yaxis=dict(range=[0, height], visible=False, scaleanchor="x"),
+        margin=dict(l=0, r=0, t=40, b=0), height=560, showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Section stats over {len(index):,} stored journeys · persona menu filters without rerunning")
+
 def display_quick_stats(results):
     """Display quick statistics about the simulation"""
     
-    # Total time
-    total_time = sum(results['dwell_time'].values())
-    st.metric("⏱️ Total Time", f"{total_time} min")
+    # Total time: dwell plus walking once the route has been costed
+    total_time = journey_total_time(results)
+    st.metric("⏱️ Total Time", f"{total_time:.1f} min" if 'walk_time' in results else f"{total_time} min")
+    if 'walk_distance_m' in results:
+        st.metric("🚶 Walking", f"{results['walk_distance_m']:.0f} m", f"{results['walk_time']:.1f} min", delta_color="off")
     
     # Sections visited
     sections_visited = len(results['path'])
@@ -386,7 +666,11 @@ def create_insights_panel(results):
     
     # Create dashboard instance
     dashboard = AnalyticsDashboard()
-    insights = dashboard.generate_insights(results)
+    store_id = results.get('store_id')
+    history = get_session_history(store_id)
+    if GLOBAL_HISTORY_SIZE > 0 and len(get_global_history(store_id)) > len(history):
+        history = get_global_history(store_id)
+    insights = dashboard.generate_insights(results, history)
     
     for insight in insights:
         st.markdown(f"""
@@ -404,11 +688,98 @@ def create_insights_panel(results):
     for i, rec in enumerate(recommendations, 1):
         st.markdown(f"**{i}.** {rec}")
 
-# Persona summary table (skeleton)
-def persona_summary_table():
+def create_history_filter_panel(store_id=None):
+    """Filter all stored journeys by persona, budget, preferences and visited sections"""
+    store = get_journey_store(store_id)
+    with st.expander("🔎 Filter Journey History"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            personas = st.multiselect("Persona", store.personas, key="history_persona")
+            budgets = st.multiselect("Budget Level", [1, 2, 3, 4, 5], key="history_budget")
+        with col2:
+            required_prefs = st.multiselect("Preferences", store.preferences, key="history_prefs")
+        with col3:
+            visited = st.multiselect("Visited Sections", store.sections, key="history_visited")
+        filters = {
+            "persona": personas,
+            "budget": budgets,
+            "preferences": {name: True for name in required_prefs},
+            "visited": visited,
+        }
+        dashboard = AnalyticsDashboard()
+        summary = dashboard.dynamic_filtering(filters=filters, index=get_journey_index(store_id))
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Matching Journeys", f"{summary['count']:,} / {summary['total_journeys']:,}")
+        col2.metric("Avg Total Time", f"{summary['average_total_time']:.1f} min")
+        col3.metric("Avg Sections", f"{summary['average_sections']:.1f}")
+        if summary['top_sections']:
+            st.write("**Most visited:** " + ", ".join(
+                f"{s} ({summary['section_visit_rates'][s] * 100:.0f}%)" for s in summary['top_sections']))
+
+def persona_summary_table(store_id=None):
+    """Per-persona distributions over every journey stored for this store"""
     st.subheader("Persona Summary Table")
-    # TODO: Aggregate and display summary stats for all personas
-    st.info("Persona summary table coming soon!")
+    store = get_journey_store(store_id)
+    if len(store) == 0:
+        st.info("Run some simulations to build up the persona summary")
+        return
+    columns = columns_from_store(store, store_data=get_store_registry().layout(store_id))
+    table = AnalyticsDashboard().persona_summary_table(columns=columns)
+    st.caption(f"{len(columns):,} stored journeys · times in minutes")
+    st.dataframe(table, use_container_width=True)
+
+def create_archetype_panel(store_id=None):
+    """Clusters of similar stored journeys with their representative paths"""
+    store = get_journey_store(store_id)
+    with st.expander("🧬 Shopper Archetypes"):
+        if len(store) == 0:
+            st.info("Run some simulations to discover shopper archetypes")
+            return
+        key = f"archetypes_{store_id}"
+        if st.button("Find Archetypes", key="find_archetypes"):
+            with st.spinner("Clustering stored journeys..."):
+                st.session_state[key] = (len(store), AnalyticsDashboard().shopper_archetypes(store=store))
+        if key in st.session_state:
+            count, table = st.session_state[key]
+            if table.empty:
+                st.info("No groups of similar journeys yet")
+            else:
+                st.caption(f"Largest groups of similar journeys among {count:,} stored")
+                st.dataframe(table, use_container_width=True)
+
+def create_checkout_panel(store_id=None):
+    """Checkout lane queue simulation fed by the stored journeys' shopping times"""
+    store = get_journey_store(store_id)
+    with st.expander("🚦 Checkout Bottlenecks"):
+        history = store.recent_results(2000)
+        if not history:
+            st.info("Run some simulations to model checkout queues")
+            return
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            lanes = st.slider("Open Lanes", 1, 40, 8, key="checkout_lanes")
+        with col2:
+            customers = st.number_input("Customers per Day", 100, 50000, 3000, step=100, key="checkout_customers")
+        with col3:
+            service_kind = st.selectbox("Service Time", ServiceModel.KINDS, index=2, key="checkout_service")
+        report = AnalyticsDashboard().bottleneck_detection(
+            history, lanes=lanes, customers=int(customers), service=ServiceModel(service_kind), seed=0)
+        checkout = report["checkout"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Mean Wait", f"{checkout['mean_wait']:.1f} min")
+        col2.metric("P90 Wait", f"{checkout['p90_wait']:.1f} min")
+        col3.metric("Max Queue", f"{checkout['max_queue_length']:,}")
+        col4.metric("Lane Utilization", f"{checkout['mean_utilization'] * 100:.0f}%")
+        if checkout["congested"]:
+            st.warning("Checkout is congested: consider opening more lanes at peak times")
+        fig = px.bar(x=[f"Lane {i + 1}" for i in range(lanes)],
+                     y=[u * 100 for u in checkout["lane_utilization"]],
+                     labels={"x": "Lane", "y": "Utilization (%)"}, title="Lane Utilization")
+        fig.update_layout(height=300)
+        st.plotly_chart(fig, use_container_width=True)
+        if report["sections"]:
+            st.write("**Section hotspots:** " + ", ".join(
+                f"{s['section']} ({', '.join(s['reasons'])})" for s in report["sections"]))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
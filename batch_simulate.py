@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Script to run batch customer simulations and export them
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from simulation.arrivals import ArrivalProfile, generate_arrivals, load_arrival_profile, simulate_day_load
+from simulation.batch import simulate_batch, simulate_arrivals, export_trajectories
+from simulation.journey_store import JourneyStore
+from simulation.logic import CustomerSimulator
+from simulation.store_registry import get_registry
+from simulation.travel import TravelModel
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batch ShopTwin simulations")
+    parser.add_argument("n", type=int, nargs="?", default=None,
+                        help="Number of journeys to simulate (with --day: expected arrivals, default from the profile)")
+    parser.add_argument("--store", default=None, help="Store id from data/stores.json")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--journeys", default=None, help="Append results to this journey store file")
+    parser.add_argument("--trajectories", default=None, help="Write routed trajectories to this file")
+    parser.add_argument("--raw", action="store_true", help="Export raw pixel routes instead of smoothed ones")
+    parser.add_argument("--no-travel", action="store_true", help="Skip walking distances and times")
+    parser.add_argument("--day", action="store_true", help="Simulate one day of time-of-day arrivals")
+    parser.add_argument("--arrival-profile", default=None,
+                        help="Arrival profile JSON for --day (default: the store's, else built-in curves)")
+    parser.add_argument("--lanes", type=int, default=8, help="Checkout lanes for the --day load report")
+    args = parser.parse_args()
+    if args.n is None and not args.day:
+        parser.error("the number of journeys is required without --day")
+
+    registry = get_registry()
+    simulator = CustomerSimulator(store_id=args.store, registry=registry)
+    arrivals = None
+    if args.day:
+        profile_path = args.arrival_profile or registry.paths(simulator.store_id).get("arrivals")
+        if profile_path:
+            profile = load_arrival_profile(profile_path, simulator.entrances)
+        else:
+            profile = ArrivalProfile.default(simulator.entrances)
+        if args.n:
+            profile = profile.scaled(args.n)
+        arrivals = generate_arrivals(profile, np.random.default_rng(args.seed))
+        results = list(simulate_arrivals(arrivals, simulator=simulator, seed=args.seed))
+        busiest = np.bincount(np.minimum(arrivals.times // 60, profile.hours - 1).astype(int)).argmax()
+        print(f"Simulated {len(results)} arrivals over {profile.hours} hours for store {simulator.store_id} "
+              f"(busiest hour from {arrivals.clock(busiest * 60)})")
+    else:
+        results = list(simulate_batch(args.n, simulator=simulator, seed=args.seed))
+        print(f"Simulated {len(results)} journeys for store {simulator.store_id}")
+
+    if not args.no_travel:
+        TravelModel(registry.get(simulator.store_id).state).apply_batch(results)
+        walk = sum(r["walk_distance_m"] for r in results) / max(len(results), 1)
+        print(f"Added walking legs: {walk:.0f} m per journey on average")
+
+    if arrivals is not None and results:
+        load = simulate_day_load(results, arrivals, args.lanes, seed=args.seed, step=60)
+        print(f"Checkout with {args.lanes} lanes: mean wait {load['checkout']['mean_wait']:.1f} min, "
+              f"p90 {load['checkout']['p90_wait']:.1f} min")
+        by_hour = load["checkout_by_hour"]
+        for minutes, shoppers in zip(load["occupancy"]["minutes"], load["occupancy"]["shoppers"]):
+            hour = int(minutes // 60)
+            line = f"  {arrivals.clock(minutes)}  {shoppers:5d} in store"
+            if hour < len(by_hour["customers"]):
+                line += (f"  {by_hour['customers'][hour]:5d} at checkout, mean wait {by_hour['mean_wait'][hour]:5.1f} min, "
+                         f"longest line {by_hour['max_queue_length'][hour]}")
+            print(line)
+
+    if args.journeys:
+        store = JourneyStore(args.journeys, sections=simulator.sections,
+                             personas=list(simulator.persona_data.keys()))
+        store.append_many(results)
+        print(f"Appended to journey store {args.journeys} ({len(store)} records)")
+
+    if args.trajectories:
+        state = registry.get(simulator.store_id).state
+        with open(args.trajectories, "wb") as f:
+            count = export_trajectories(results, state, f, smooth=not args.raw)
+        print(f"Wrote {count} trajectories to {args.trajectories} ({os.path.getsize(args.trajectories)} bytes)")
+
+if __name__ == "__main__":
+    main()
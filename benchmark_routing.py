@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the routing engines on the store's aisle cost grid
+"""
+
+import random
+import sys
+import time
+
+from simulation import kernels
+from simulation.pathfinding_cv import ROUTING_ENGINES, path_cost
+from simulation.store_registry import get_registry
+
+def benchmark_routing(store_id=None, pairs=10, seed=0):
+    """Route the same random section pairs with every engine; report time and path cost"""
+    assets = get_registry().get(store_id)
+    state = assets.state
+    rng = random.Random(seed)
+    sections = list(state.section_coords)
+    route_pairs = [tuple(rng.sample(sections, 2)) for _ in range(pairs)]
+    stops = [(state.snapped_point(a), state.snapped_point(b)) for a, b in route_pairs]
+
+    print(f"Grid: {state.grid.shape[1]}x{state.grid.shape[0]}, {len(route_pairs)} section pairs")
+    totals = {}
+    for name, engine in ROUTING_ENGINES.items():
+        elapsed = 0.0
+        cost = 0
+        failed = 0
+        for start, end in stops:
+            t0 = time.perf_counter()
+            path = engine(state.grid, start, end, labels=state.labels)
+            elapsed += time.perf_counter() - t0
+            if path is None:
+                failed += 1
+            else:
+                cost += path_cost(state.grid, path)
+        totals[name] = elapsed
+        print(f"  {name:6s} total {elapsed:7.2f}s  per route {elapsed / len(stops) * 1000:8.1f} ms  "
+              f"path cost {cost}  failed {failed}")
+    if "astar" in totals and "dial" in totals and totals["dial"] > 0:
+        print(f"Speedup dial vs astar: {totals['astar'] / totals['dial']:.1f}x")
+    if kernels.numba is not None:
+        compare_backends(state, stops)
+    else:
+        print("numba not installed: compiled kernels unavailable, routing uses the Python implementations")
+    return totals
+
+def compare_backends(state, stops):
+    """Time the compiled kernels against the Python implementations and check the paths are identical"""
+    t0 = time.perf_counter()
+    kernels.warmup()
+    print(f"Kernel warmup (compile or load from cache): {time.perf_counter() - t0:.2f}s")
+    for name, engine in ROUTING_ENGINES.items():
+        elapsed = {}
+        paths = {}
+        for backend in kernels.BACKENDS:
+            t0 = time.perf_counter()
+            paths[backend] = [engine(state.grid, start, end, labels=state.labels, backend=backend)
+                              for start, end in stops]
+            elapsed[backend] = time.perf_counter() - t0
+        identical = paths["python"] == paths["numba"]
+        print(f"  {name:6s} python {elapsed['python']:7.2f}s  numba {elapsed['numba']:7.3f}s  "
+              f"speedup {elapsed['python'] / max(elapsed['numba'], 1e-9):6.1f}x  identical paths: {identical}")
+
+if __name__ == "__main__":
+    benchmark_routing(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Script to compare worker start-up with private store assets against attaching shared memory
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+
+from simulation.shared_assets import SharedAssetPublisher, AttachedState
+from simulation.store_assets import load_store_state
+from simulation.store_registry import get_registry
+
+def private_memory() -> int:
+    """Bytes of memory only this process maps (USS), or its RSS where smaps is unavailable"""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith("Private_"))
+        return sum(int(v.split()[0]) for v in fields.values()) * 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def worker(mode, source, pairs, queue):
+    """Build (or attach) a worker's StoreState, route some pairs and report start-up cost"""
+    before = private_memory()
+    t0 = time.perf_counter()
+    attached = None
+    if mode == "shared":
+        attached = AttachedState(source)
+        state = attached.state
+    else:
+        state = load_store_state(source["layout"], source["mask"], source["map"])
+        # What the parent had precomputed: section labels and nearest walkable pixels
+        state.section_labels
+        state.nearest_walkable
+    startup = time.perf_counter() - t0
+    routes = [state.route(a, b) for a, b in pairs]
+    queue.put({"startup": startup, "memory": private_memory() - before,
+               "points": sum(len(r) for r in routes if r)})
+    if attached is not None:
+        attached.close()
+
+def run_workers(mode, source, pairs, workers, context):
+    queue = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, source, pairs, queue)) for _ in range(workers)]
+    t0 = time.perf_counter()
+    for p in processes:
+        p.start()
+    stats = [queue.get() for _ in processes]
+    wall = time.perf_counter() - t0
+    for p in processes:
+        p.join()
+    return stats, wall
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared-memory store assets for worker processes")
+    parser.add_argument("--store", default=None, help="Store id from data/stores.json")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes per mode")
+    parser.add_argument("--pairs", type=int, default=20, help="Cached section pairs each worker routes")
+    parser.add_argument("--start-method", default="spawn", choices=multiprocessing.get_all_start_methods(),
+                        help="Process start method")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for section pairs")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    paths = registry.paths(args.store)
+    state = registry.get(args.store).state
+    rng = random.Random(args.seed)
+    pairs = [tuple(rng.sample(state.section_names, 2)) for _ in range(args.pairs)]
+    # Routes the parent has cached, so shared workers read them instead of searching
+    for a, b in pairs:
+        state.route(a, b)
+    context = multiprocessing.get_context(args.start_method)
+
+    t0 = time.perf_counter()
+    with SharedAssetPublisher(state) as publisher:
+        publish = time.perf_counter() - t0
+        print(f"Grid: {state.grid.shape[1]}x{state.grid.shape[0]}, published {publisher.nbytes / 1e6:.1f} MB "
+              f"in {publish * 1000:.0f} ms")
+        results = {"private": run_workers("private", paths, pairs, args.workers, context),
+                   "shared": run_workers("shared", publisher.manifest, pairs, args.workers, context)}
+
+    for mode, (stats, wall) in results.items():
+        startup = sum(s["startup"] for s in stats) / len(stats)
+        memory = sum(s["memory"] for s in stats) / len(stats)
+        print(f"  {mode:7s} start-up per worker {startup * 1000:8.1f} ms  private memory per worker "
+              f"{memory / 1e6:7.1f} MB  wall {wall:6.2f}s")
+    points = {s["points"] for stats, _ in results.values() for s in stats}
+    print(f"Identical routes in every worker: {len(points) == 1}")
+    private, shared = ([s for s in results[m][0]] for m in ("private", "shared"))
+    saved = sum(s["memory"] for s in private) - sum(s["memory"] for s in shared)
+    speedup = sum(s["startup"] for s in private) / max(sum(s["startup"] for s in shared), 1e-9)
+    print(f"Memory saved across {args.workers} workers: {saved / 1e6:.1f} MB, start-up {speedup:.0f}x faster")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Script to calibrate persona parameters against observed journeys
+"""
+
+import argparse
+import logging
+
+from simulation.calibration import PersonaCalibrator, load_observed, write_persona_file
+from simulation.logic import CustomerSimulator
+from simulation.store_registry import get_registry
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit ShopTwin persona parameters to observed journeys")
+    parser.add_argument("observed", help="JSON lines file of observed journey records (see ingest_trajectories.py)")
+    parser.add_argument("--persona", action="append", required=True,
+                        help="Persona to calibrate (repeatable); matched to records with the same persona, "
+                             "or to all records when calibrating a single persona none of them carry")
+    parser.add_argument("--out", required=True, help="Calibrated persona file to write (merged if it exists)")
+    parser.add_argument("--store", default=None, help="Store id from data/stores.json")
+    parser.add_argument("--samples", type=int, default=400, help="Simulated journeys per candidate")
+    parser.add_argument("--iterations", type=int, default=20, help="Maximum search steps per persona")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--verbose", action="store_true", help="Log every search step")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    registry = get_registry()
+    store_id = registry.resolve(args.store)
+    simulator = CustomerSimulator(store_id=store_id, registry=registry)
+    observed = load_observed(args.observed)
+    results = {}
+    for persona in args.persona:
+        matched = [r for r in observed if r.get("persona") == persona]
+        if not matched and len(args.persona) == 1:
+            matched = observed
+        if not matched:
+            print(f"Skipping {persona}: no observed journeys carry this persona")
+            continue
+        calibrator = PersonaCalibrator(simulator, persona, matched, samples=args.samples,
+                                       workers=args.workers, seed=args.seed)
+        result = calibrator.run(iterations=args.iterations)
+        results[persona] = result
+        print(f"{persona}: loss {result['initial_loss']:.4f} -> {result['final_loss']:.4f} "
+              f"after {result['iterations']} steps ({result['elapsed_seconds']:.1f}s, {len(matched)} observed journeys)")
+        params = result["params"]
+        print(f"  path_style={params['path_style']} dwell_time_multiplier={params['dwell_time_multiplier']}")
+        print(f"  preferred={params['preferred_sections']}")
+        print(f"  avoided={params['avoided_sections']}")
+
+    if results:
+        write_persona_file(args.out, results, {"store_id": store_id, "observed": args.observed})
+        print(f"Wrote {args.out}; load it with CustomerSimulator(persona_file=...) "
+              f"or a \"personas\" entry for the store in data/stores.json")
+
+if __name__ == "__main__":
+    main()
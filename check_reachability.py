@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script to report which store sections are unreachable on the aisle mask
+"""
+
+import sys
+
+from simulation.store_registry import get_registry
+
+def check_reachability(store_id=None):
+    """Print per-section reachability diagnostics; returns False if any section is cut off"""
+    registry = get_registry()
+    assets = registry.get(store_id)
+    report = assets.state.reachability()
+    components = sorted({r["component"] for r in report.values()})
+    print(f"Store: {registry.resolve(store_id)}")
+    print(f"Sections: {len(report)}, walkable components touched: {len(components)}")
+
+    unreachable = {name: r for name, r in report.items() if not r["reachable"]}
+    for name, r in sorted(report.items(), key=lambda item: -item[1]["snap_distance"]):
+        status = "OK" if r["reachable"] else "UNREACHABLE"
+        print(f"  {status:11s} {name:25s} snapped {r['position']} -> {r['snapped']} "
+              f"({r['snap_distance']:.0f}px, component {r['component']} of {r['component_size']} px)")
+
+    if unreachable:
+        print(f"{len(unreachable)} section(s) are not connected to the main aisle network: "
+              f"{', '.join(sorted(unreachable))}")
+        return False
+    print("All sections are reachable.")
+    return True
+
+if __name__ == "__main__":
+    ok = check_reachability(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.exit(0 if ok else 1)
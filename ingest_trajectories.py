@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script to convert observed shopper position logs (CSV/JSONL) into journey records
+"""
+
+import argparse
+import json
+import time
+
+from simulation.ingest import (ingest_trajectories, DEFAULT_CHUNK_POINTS, STOP_SPEED, MIN_STOP,
+                               SESSION_GAP)
+from simulation.store_assets import POSITION_UNITS
+from simulation.store_registry import get_registry
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest observed shopper trajectories into ShopTwin journey records")
+    parser.add_argument("path", help="CSV or JSONL file of journey_id, timestamp, x, y points")
+    parser.add_argument("--out", default=None, help="Write records as JSON lines to this file")
+    parser.add_argument("--store", default=None, help="Store id from data/stores.json")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="Input format (default: from extension)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK_POINTS, help="Points per chunk")
+    parser.add_argument("--sorted-by", choices=["journey", "time"], default="journey",
+                        help="Input order: contiguous per journey, or interleaved by time")
+    parser.add_argument("--session-gap", type=float, default=SESSION_GAP,
+                        help="Seconds without points after which a time-ordered journey is closed")
+    parser.add_argument("--stop-speed", type=float, default=STOP_SPEED, help="Stop speed threshold (pixels/s)")
+    parser.add_argument("--min-stop", type=float, default=MIN_STOP, help="Minimum stop duration (s)")
+    parser.add_argument("--units", choices=POSITION_UNITS, default="auto",
+                        help="x, y as image fractions or pixels (default: decided from the first chunk)")
+    parser.add_argument("--persona", default="Observed", help="Persona label for the records")
+    parser.add_argument("--journey-col", default="journey_id")
+    parser.add_argument("--time-col", default="timestamp")
+    parser.add_argument("--x-col", default="x")
+    parser.add_argument("--y-col", default="y")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    store_id = registry.resolve(args.store)
+    state = registry.get(store_id).state
+    columns = {"journey": args.journey_col, "time": args.time_col, "x": args.x_col, "y": args.y_col}
+    records = ingest_trajectories(args.path, state, fmt=args.format, columns=columns, chunk_points=args.chunk,
+                                  store_id=store_id, persona=args.persona, stop_speed=args.stop_speed,
+                                  min_stop=args.min_stop, sorted_by=args.sorted_by, session_gap=args.session_gap,
+                                  units=args.units)
+    start = time.perf_counter()
+    count = 0
+    stops = 0
+    out = open(args.out, "w") if args.out else None
+    try:
+        for record in records:
+            count += 1
+            stops += len(record["dwell_time"])
+            if out:
+                out.write(json.dumps(record) + "\n")
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {count} journeys ({stops} stops) in {elapsed:.2f}s")
+    if args.out:
+        print(f"Wrote records to {args.out}")
+
+if __name__ == "__main__":
+    main()
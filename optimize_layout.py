@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Script to search section moves that cut walking distance or raise target exposure
+"""
+
+import argparse
+import json
+
+from simulation.layout_optimizer import LayoutOptimizer, apply_layout, DEFAULT_POPULATION, EXPOSURE_DETOUR_M
+from simulation.logic import CustomerSimulator
+from simulation.store_registry import get_registry
+
+def main():
+    parser = argparse.ArgumentParser(description="What-if store layout optimizer")
+    parser.add_argument("--store", default=None, help="Store id from data/stores.json")
+    parser.add_argument("--population", type=int, default=DEFAULT_POPULATION, help="Simulated journeys to score against")
+    parser.add_argument("--iterations", type=int, default=20000, help="Swaps tried per annealing run")
+    parser.add_argument("--restarts", type=int, default=5, help="Independent annealing runs")
+    parser.add_argument("--top", type=int, default=5, help="Proposals to report")
+    parser.add_argument("--max-moves", type=int, default=None, help="Most sections a proposal may relocate")
+    parser.add_argument("--target", action="append", default=[], help="Section whose exposure to raise (repeatable)")
+    parser.add_argument("--targets-persona", default=None,
+                        help="Use a persona's preferred sections as targets, e.g. \"Impulse Buyer\"")
+    parser.add_argument("--exposure-weight", type=float, default=0.0,
+                        help="Walking meters one extra target exposure per journey is worth")
+    parser.add_argument("--detour", type=float, default=EXPOSURE_DETOUR_M,
+                        help="Detour (m) within which a leg counts as passing a section")
+    parser.add_argument("--pin", action="append", default=[], help="Section that must not move (repeatable)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--out", default=None, help="Write the best proposal as a store layout JSON")
+    parser.add_argument("--report", default=None, help="Write all proposals as JSON")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    simulator = CustomerSimulator(store_id=args.store, registry=registry)
+    targets = list(args.target)
+    if args.targets_persona:
+        targets += simulator.persona_data[args.targets_persona]["preferred_sections"]
+    if targets and args.exposure_weight == 0:
+        print("Note: targets have no effect with --exposure-weight 0")
+    optimizer = LayoutOptimizer(simulator, population=args.population, targets=targets,
+                                exposure_weight=args.exposure_weight, detour=args.detour, pinned=args.pin,
+                                seed=args.seed)
+    base = optimizer.baseline_report()
+    print(f"Current layout: {base['walk_m_per_journey']:.0f} m walked per journey, "
+          f"{base['exposure_per_journey']:.2f} target exposures per journey")
+    proposals = optimizer.optimize(iterations=args.iterations, restarts=args.restarts, top=args.top,
+                                   max_moves=args.max_moves, seed=args.seed)
+    print(f"Evaluated {optimizer.swaps_evaluated} swaps ({optimizer.swaps_per_second:.0f} per second)")
+    for proposal in proposals:
+        print(f"#{proposal['rank']}: {proposal['walk_m_per_journey']:.0f} m per journey "
+              f"({proposal['walk_change_pct']:+.1f}%), exposure {proposal['exposure_change_pct']:+.1f}%, "
+              f"{len(proposal['moves'])} sections moved")
+        for move in proposal['moves']:
+            print(f"    {move['section']} -> position of {move['to_slot_of']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"baseline": base, "proposals": proposals}, f, indent=2)
+        print(f"Wrote proposals to {args.report}")
+    if args.out and proposals:
+        layout = apply_layout(registry.layout(simulator.store_id), proposals[0]["assignment"])
+        with open(args.out, "w") as f:
+            json.dump(layout, f, indent=2)
+        print(f"Wrote best layout to {args.out}")
+
+if __name__ == "__main__":
+    main()
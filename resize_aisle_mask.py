@@ -50,7 +50,7 @@ def resize_aisle_mask():
         try:
             from simulation.pathfinding_cv import load_aisle_mask
             walkable, _ = load_aisle_mask(output_path)
-            print(f"Mask loaded successfully. Walkable area: {np.sum(walkable)} pixels")
+            print(f"Mask loaded successfully. Walkable area: {np.count_nonzero(walkable)} pixels")
             return True
         except Exception as e:
             print(f"Warning: Mask loaded but pathfinding test failed: {e}")
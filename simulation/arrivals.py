@@ -0,0 +1,197 @@
+import json
+import logging
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+from simulation.checkout_queue import CheckoutQueueResult, simulate_checkout_day
+from simulation.travel import journey_total_time
+
+# Time-of-day arrivals. A profile gives hourly arrival rates per persona, split over
+# the store's entrances by entrance share; within the day the rate is interpolated
+# linearly between hour midpoints. A day is drawn in one vectorized pass by thinning:
+# every (persona, entrance) stream proposes a homogeneous Poisson process at its
+# peak rate and keeps each proposal with probability rate(t) / peak rate.
+
+DEFAULT_OPEN_HOUR = 8
+# Customers per hour from opening (8:00) to closing (22:00): lunch and after-work peaks
+DEFAULT_PERSONA_CURVES = {
+    "Eco-Conscious Millennial": [4, 6, 8, 10, 14, 12, 10, 12, 16, 22, 24, 18, 12, 6],
+    "Budget Shopper": [14, 20, 26, 28, 30, 28, 26, 24, 24, 26, 22, 16, 10, 6],
+    "Convenience Seeker": [10, 8, 8, 14, 30, 16, 10, 14, 30, 40, 32, 20, 14, 10],
+    "Health Enthusiast": [18, 16, 12, 10, 12, 10, 8, 10, 14, 18, 16, 10, 6, 4],
+    "Family Planner": [8, 16, 24, 26, 22, 20, 22, 26, 28, 26, 18, 10, 4, 2],
+    "Impulse Buyer": [4, 6, 8, 10, 14, 12, 12, 14, 18, 24, 28, 26, 20, 12],
+}
+
+
+class ArrivalProfile:
+    """
+    Hourly arrival rates (customers per hour) per persona, and each entrance's share
+    of arrivals (default: an even split over the entrances)
+    """
+
+    def __init__(self, persona_curves: Dict[str, Sequence[float]], entrance_shares: Dict[str, float],
+                 open_hour: float = DEFAULT_OPEN_HOUR, smooth: bool = True):
+        lengths = {len(curve) for curve in persona_curves.values()}
+        if len(lengths) != 1:
+            raise ValueError("Every persona curve must cover the same number of hours")
+        rates = np.array(list(persona_curves.values()), dtype=np.float64)
+        shares = np.array(list(entrance_shares.values()), dtype=np.float64)
+        if (rates < 0).any() or (shares < 0).any() or shares.sum() <= 0:
+            raise ValueError("Arrival rates and entrance shares must be non-negative")
+        self.personas = list(persona_curves)
+        self.entrances = list(entrance_shares)
+        self.rates = rates
+        self.shares = shares / shares.sum()
+        self.open_hour = open_hour
+        self.smooth = smooth
+        self.hours = rates.shape[1]
+
+    @property
+    def open_minutes(self) -> float:
+        return self.hours * 60.0
+
+    @property
+    def expected_total(self) -> float:
+        """Expected arrivals over the day (exact for step curves, close for smoothed ones)"""
+        return float(self.rates.sum())
+
+    def stream_rates(self) -> np.ndarray:
+        """(persona * entrance, hours) rates; stream k is persona k // entrances, entrance k % entrances"""
+        return (self.rates[:, None, :] * self.shares[None, :, None]).reshape(-1, self.hours)
+
+    def intensity(self, minutes: np.ndarray, streams: np.ndarray) -> np.ndarray:
+        """Arrivals per minute of each stream at minutes since opening"""
+        rates = self.stream_rates() / 60.0
+        if not self.smooth:
+            hour = np.clip((minutes // 60).astype(np.int64), 0, self.hours - 1)
+            return rates[streams, hour]
+        position = np.clip(minutes / 60.0 - 0.5, 0, self.hours - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, self.hours - 1)
+        frac = position - low
+        return rates[streams, low] * (1 - frac) + rates[streams, high] * frac
+
+    def scaled(self, total: float) -> "ArrivalProfile":
+        """Same shape with expected_total arrivals per day"""
+        factor = total / self.expected_total if self.expected_total > 0 else 0.0
+        curves = {p: (row * factor).tolist() for p, row in zip(self.personas, self.rates)}
+        return ArrivalProfile(curves, dict(zip(self.entrances, self.shares)), self.open_hour, self.smooth)
+
+    def for_entrances(self, entrances: List[str]) -> "ArrivalProfile":
+        """Profile restricted to a layout's entrances; shares of unknown entrances are dropped"""
+        shares = {e: s for e, s in zip(self.entrances, self.shares) if e in entrances}
+        unknown = [e for e in self.entrances if e not in entrances]
+        if unknown:
+            logging.warning(f"Arrival profile entrances not in the layout: {', '.join(unknown)}")
+        if not shares or sum(shares.values()) <= 0:
+            shares = {e: 1.0 for e in entrances}
+        curves = dict(zip(self.personas, self.rates.tolist()))
+        return ArrivalProfile(curves, shares, self.open_hour, self.smooth)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], entrances: List[str]) -> "ArrivalProfile":
+        shares = data.get("entrances") or {e: 1.0 for e in entrances}
+        profile = cls(data["personas"], shares, data.get("open_hour", DEFAULT_OPEN_HOUR), data.get("smooth", True))
+        return profile.for_entrances(entrances)
+
+    @classmethod
+    def default(cls, entrances: List[str]) -> "ArrivalProfile":
+        return cls(DEFAULT_PERSONA_CURVES, {e: 1.0 for e in entrances})
+
+
+def load_arrival_profile(path: str, entrances: List[str]) -> ArrivalProfile:
+    """Profile from JSON: {"open_hour": 8, "personas": {name: [hourly rates]}, "entrances": {name: share}}"""
+    with open(path, "r") as f:
+        return ArrivalProfile.from_dict(json.load(f), entrances)
+
+
+class Arrivals:
+    """One day's arrivals in time order: minutes since opening, persona and entrance of each"""
+
+    def __init__(self, times: np.ndarray, persona_codes: np.ndarray, entrance_codes: np.ndarray,
+                 profile: ArrivalProfile):
+        self.times = times
+        self.persona_codes = persona_codes
+        self.entrance_codes = entrance_codes
+        self.profile = profile
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def personas(self) -> List[str]:
+        return [self.profile.personas[i] for i in self.persona_codes.tolist()]
+
+    @property
+    def entrances(self) -> List[str]:
+        return [self.profile.entrances[i] for i in self.entrance_codes.tolist()]
+
+    def clock(self, minutes: float) -> str:
+        """Wall-clock HH:MM of minutes since opening"""
+        total = int(self.profile.open_hour * 60 + minutes)
+        return f"{total // 60 % 24:02d}:{total % 60:02d}"
+
+    def hourly_counts(self) -> Dict[str, List[int]]:
+        """Arrivals per opening hour for each persona"""
+        hour = np.minimum((self.times // 60).astype(np.int64), self.profile.hours - 1)
+        counts = np.zeros((len(self.profile.personas), self.profile.hours), dtype=np.int64)
+        np.add.at(counts, (self.persona_codes, hour), 1)
+        return {p: row.tolist() for p, row in zip(self.profile.personas, counts)}
+
+
+def generate_arrivals(profile: ArrivalProfile, rng: np.random.Generator = None) -> Arrivals:
+    """Draw a day of arrivals from the profile by thinning, all streams in one pass"""
+    rng = rng or np.random.default_rng()
+    peak = profile.stream_rates().max(axis=1) / 60.0
+    proposals = rng.poisson(peak * profile.open_minutes)
+    streams = np.repeat(np.arange(len(peak)), proposals)
+    times = rng.uniform(0, profile.open_minutes, len(streams))
+    keep = rng.random(len(streams)) * peak[streams] < profile.intensity(times, streams)
+    times, streams = times[keep], streams[keep]
+    order = np.argsort(times, kind="stable")
+    times, streams = times[order], streams[order]
+    n_entrances = len(profile.entrances)
+    return Arrivals(times, streams // n_entrances, streams % n_entrances, profile)
+
+
+def occupancy(entry_times: np.ndarray, durations: np.ndarray, horizon: float,
+              step: float = 15.0) -> Dict[str, List[float]]:
+    """Shoppers in the store every `step` minutes: entered by then minus already left"""
+    entry_times = np.sort(np.asarray(entry_times, dtype=np.float64))
+    exits = np.sort(entry_times + np.asarray(durations, dtype=np.float64)) if len(durations) else entry_times
+    at = np.arange(0, horizon + step, step)
+    inside = np.searchsorted(entry_times, at, side="right") - np.searchsorted(exits, at, side="right")
+    return {"minutes": at.tolist(), "shoppers": inside.tolist()}
+
+
+def checkout_by_hour(queue: CheckoutQueueResult, hours: int) -> Dict[str, List[float]]:
+    """Checkout arrivals, mean wait and longest line per hour since opening (later arrivals in the last hour)"""
+    hour = np.minimum((queue.arrivals // 60).astype(np.int64), hours - 1)
+    customers = np.bincount(hour, minlength=hours)
+    waits = np.bincount(hour, weights=queue.waits, minlength=hours)
+    longest = np.zeros(hours, dtype=np.int64)
+    if len(queue):
+        np.maximum.at(longest, hour, queue.queue_lengths())
+    return {
+        "customers": customers.tolist(),
+        "mean_wait": np.divide(waits, customers, out=np.zeros(hours), where=customers > 0).tolist(),
+        "max_queue_length": longest.tolist(),
+    }
+
+
+def simulate_day_load(results_list: List[Dict[str, Any]], arrivals: Arrivals, n_lanes: int,
+                      service=None, seed: Optional[int] = None, step: float = 15.0) -> Dict[str, Any]:
+    """
+    Occupancy and checkout load over the day for journeys simulated one per arrival
+    (see batch.simulate_arrivals)
+    """
+    durations = np.array([journey_total_time(r) for r in results_list], dtype=np.float64)
+    horizon = arrivals.profile.open_minutes + (durations.max() if len(durations) else 0.0)
+    queue = simulate_checkout_day(results_list, n_lanes, service=service, entry_times=arrivals.times, seed=seed)
+    return {
+        "occupancy": occupancy(arrivals.times, durations, horizon, step=step),
+        "checkout": queue.summary(),
+        "checkout_by_hour": checkout_by_hour(queue, arrivals.profile.hours),
+    }
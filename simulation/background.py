@@ -0,0 +1,160 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional
+
+from simulation.travel import TravelModel
+
+# Background simulation jobs for the Streamlit app. Each browser session has at most
+# one live job; submitting a new one (or changing parameters) cancels the old one.
+# Jobs publish progress and partial routes that reruns of the script can render.
+# A finished job is dropped once its session collects it; finished jobs of sessions
+# that never come back are swept after DEFAULT_FINISHED_TTL seconds.
+
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+DEFAULT_FINISHED_TTL = 600.0
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class SimulationJob:
+    """Progress, partial output and cancellation flag of one background run"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = next(self._ids)
+        self.params = params
+        self.status = RUNNING
+        self.error: Optional[str] = None
+        self.results: Optional[Dict[str, Any]] = None
+        self.snapped_stops: List = []
+        self.path_segments: List = []
+        self.failed_pairs: List = []
+        self.done_steps = 0
+        self.total_steps = 0
+        self.recorded = False
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.status == RUNNING
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job was cancelled; call between units of work"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def route_snapshot(self):
+        """Consistent copy of the routed-so-far output for rendering"""
+        with self._lock:
+            return list(self.snapped_stops), list(self.path_segments), list(self.failed_pairs)
+
+
+class JobManager:
+    """Runs SimulationJobs on a shared thread pool, keyed per session"""
+
+    def __init__(self, max_workers: int = 4, finished_ttl: float = DEFAULT_FINISHED_TTL):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shoptwin-job")
+        self._jobs: Dict[str, SimulationJob] = {}
+        self._lock = threading.Lock()
+        self.finished_ttl = finished_ttl
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def get(self, session_key: str) -> Optional[SimulationJob]:
+        with self._lock:
+            return self._jobs.get(session_key)
+
+    def cancel(self, session_key: str):
+        job = self.get(session_key)
+        if job is not None and job.running:
+            job.cancel()
+
+    def collect(self, session_key: str, job: SimulationJob):
+        """Forget a finished job once its session has taken its output (a newer job is kept)"""
+        with self._lock:
+            if not job.running and self._jobs.get(session_key) is job:
+                del self._jobs[session_key]
+
+    def _sweep(self):
+        # Finished jobs of sessions that went away; call with the lock held
+        cutoff = time.monotonic() - self.finished_ttl
+        for key in [k for k, j in self._jobs.items() if j.finished_at is not None and j.finished_at < cutoff]:
+            del self._jobs[key]
+
+    def submit(self, session_key: str, params: Dict[str, Any], work: Callable[[SimulationJob], None]) -> SimulationJob:
+        """Start work(job) in the background, cancelling this session's previous job"""
+        job = SimulationJob(params)
+        with self._lock:
+            previous = self._jobs.get(session_key)
+            if previous is not None and previous.running:
+                previous.cancel()
+            self._jobs[session_key] = job
+            self._sweep()
+        self._executor.submit(self._run, job, work)
+        return job
+
+    @staticmethod
+    def _run(job: SimulationJob, work: Callable[[SimulationJob], None]):
+        try:
+            work(job)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            logging.exception("Background simulation failed")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.monotonic()
+
+
+def journey_job(simulator, state, smooth: bool = True) -> Callable[[SimulationJob], None]:
+    """
+    Work function that simulates one journey and routes it segment by segment on a
+    StoreState, publishing results first and each routed segment as it finishes.
+    """
+    def work(job: SimulationJob):
+        params = job.params
+        results = simulator.simulate_journey(
+            persona=params['persona'],
+            budget_sensitivity=params['budget_sensitivity'],
+            preferences=params['preferences'],
+            entrance=params.get('entrance', ""),
+            exit=params.get('exit', "")
+        )
+        sections = [s for s in dict.fromkeys(results['path']) if s in state.section_coords]
+        with job._lock:
+            job.results = results
+            job.total_steps = max(0, len(sections) - 1)
+            job.snapped_stops = [state.snapped_point(s) for s in sections]
+        route = state.smoothed_route if smooth else state.route
+        for i in range(len(sections) - 1):
+            job.check_cancelled()
+            segment = route(sections[i], sections[i + 1])
+            with job._lock:
+                if segment is None:
+                    job.failed_pairs.append((job.snapped_stops[i], job.snapped_stops[i + 1]))
+                else:
+                    job.path_segments.append(segment)
+                job.done_steps = i + 1
+        # Walking distances and times per leg (distance rows are cached on the state)
+        travel = TravelModel(state).apply(dict(results))
+        with job._lock:
+            results.update(travel)
+    return work
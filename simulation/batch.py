@@ -0,0 +1,96 @@
+import random
+from typing import Dict, List, Any, Iterator, Optional, BinaryIO
+
+from simulation.logic import CustomerSimulator
+from simulation.trajectory_codec import TrajectoryWriter
+
+PREFERENCE_FLAGS = ["eco_preference", "time_constraint", "health_focus", "convenience_priority"]
+
+
+def random_preferences(rng: random.Random, probability: float = 0.3) -> Dict[str, bool]:
+    return {flag: rng.random() < probability for flag in PREFERENCE_FLAGS}
+
+
+def _simulate_with(simulator: CustomerSimulator, journey_rng: Optional[random.Random], **kwargs) -> Dict[str, Any]:
+    """simulate_journey drawing from journey_rng (if given) instead of the simulator's own stream"""
+    if journey_rng is None:
+        return simulator.simulate_journey(**kwargs)
+    saved_rng, simulator.rng = simulator.rng, journey_rng
+    try:
+        return simulator.simulate_journey(**kwargs)
+    finally:
+        simulator.rng = saved_rng
+
+
+def simulate_batch(n: int, simulator: CustomerSimulator = None, personas: List[str] = None,
+                   seed: Optional[int] = None, entrance: str = "", exit: str = "") -> Iterator[Dict[str, Any]]:
+    """Yield n simulated journeys with random persona, budget level and preference flags"""
+    simulator = simulator or CustomerSimulator()
+    personas = personas or list(simulator.persona_data.keys())
+    rng = random.Random(seed)
+    journey_rng = random.Random(seed + 1) if seed is not None else None
+    for _ in range(n):
+        yield _simulate_with(
+            simulator, journey_rng,
+            persona=rng.choice(personas),
+            budget_sensitivity=rng.randint(1, 5),
+            preferences=random_preferences(rng),
+            entrance=entrance,
+            exit=exit
+        )
+
+
+def simulate_arrivals(arrivals, simulator: CustomerSimulator = None, seed: Optional[int] = None,
+                      exit: str = "") -> Iterator[Dict[str, Any]]:
+    """
+    Yield one journey per arrival (see arrivals.generate_arrivals) with its persona and
+    entrance, random budget level and preference flags, and arrival_time in minutes
+    since opening
+    """
+    simulator = simulator or CustomerSimulator()
+    unknown = set(arrivals.profile.personas) - set(simulator.persona_data)
+    if unknown:
+        raise ValueError(f"Arrival profile personas not known to the simulator: {', '.join(sorted(unknown))}")
+    rng = random.Random(seed)
+    # Seeded runs swap in their own journey stream per call, leaving global random untouched
+    journey_rng = random.Random(seed + 1) if seed is not None else None
+    for time, persona, entrance in zip(arrivals.times.tolist(), arrivals.personas, arrivals.entrances):
+        results = _simulate_with(
+            simulator, journey_rng,
+            persona=persona,
+            budget_sensitivity=rng.randint(1, 5),
+            preferences=random_preferences(rng),
+            entrance=entrance,
+            exit=exit
+        )
+        results['arrival_time'] = round(time, 2)
+        yield results
+
+
+def journey_meta(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata stored next to each exported trajectory"""
+    return {
+        "persona": results.get("persona"),
+        "budget_sensitivity": results.get("budget_sensitivity"),
+        "store_id": results.get("store_id"),
+        "path": results.get("path", []),
+        "walk_distance_m": results.get("walk_distance_m"),
+        "total_time": results.get("total_time"),
+        "arrival_time": results.get("arrival_time"),
+    }
+
+
+def export_trajectories(results_iter, state, fileobj: BinaryIO, smooth: bool = True,
+                        chunk_journeys: int = 1024) -> int:
+    """
+    Route each journey on a StoreState and stream it into the compressed trajectory
+    format. Returns the number of journeys written.
+    """
+    count = 0
+    with TrajectoryWriter(fileobj, chunk_journeys=chunk_journeys) as writer:
+        for results in results_iter:
+            sections = list(dict.fromkeys(results.get("path", [])))
+            _, segments, _ = state.route_sections(sections, smooth=smooth)
+            writer.add(segments, journey_meta(results))
+            count += 1
+    return count
@@ -0,0 +1,259 @@
+import copy
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+from simulation.logic import CustomerSimulator
+from simulation.summary import SPECIAL_TYPES
+
+# Fits persona parameters (dwell multiplier, path style, preferred/avoided sections)
+# so simulated journeys match an observed dataset. Each optimization step proposes a
+# set of neighbouring parameter sets and simulates a batch for every candidate with
+# the same random seed (common random numbers), so differences in loss come from the
+# parameters rather than sampling noise. Candidates are evaluated in parallel processes.
+
+PATH_STYLES = ("quick", "efficient", "purposeful", "thorough", "comprehensive", "wandering")
+MAX_DWELL_BIN = 30
+LOSS_WEIGHTS = {"visit_rates": 1.0, "dwell": 1.0, "path_length": 1.0}
+
+
+def journey_stats(results_list: List[Dict[str, Any]], sections: List[str], max_path: int) -> Dict[str, np.ndarray]:
+    """Section visit rates, dwell-minute histogram and path-length histogram of a set of journeys"""
+    index = {s: i for i, s in enumerate(sections)}
+    n = max(len(results_list), 1)
+    visits = np.zeros(len(sections))
+    dwell = np.zeros(MAX_DWELL_BIN + 1)
+    lengths = np.zeros(max_path + 1)
+    for r in results_list:
+        for s in set(r.get('path', [])):
+            if s in index:
+                visits[index[s]] += 1
+        for minutes in r.get('dwell_time', {}).values():
+            dwell[min(int(minutes), MAX_DWELL_BIN)] += 1
+        lengths[min(len(r.get('path', [])), max_path)] += 1
+    return {
+        "visit_rates": visits / n,
+        "dwell": dwell / max(dwell.sum(), 1),
+        "path_length": lengths / n,
+    }
+
+
+def stats_loss(sim: Dict[str, np.ndarray], obs: Dict[str, np.ndarray], weights: Dict[str, float] = None) -> float:
+    """
+    Distance between simulated and observed stats: mean absolute visit-rate error,
+    total variation between dwell histograms and earth mover's distance between
+    path-length distributions (in sections, scaled by the longest path).
+    """
+    weights = dict(LOSS_WEIGHTS, **(weights or {}))
+    visit = float(np.mean(np.abs(sim["visit_rates"] - obs["visit_rates"])))
+    dwell = float(np.abs(sim["dwell"] - obs["dwell"]).sum() / 2)
+    emd = float(np.abs(np.cumsum(sim["path_length"] - obs["path_length"])).sum() / max(len(obs["path_length"]) - 1, 1))
+    return weights["visit_rates"] * visit + weights["dwell"] * dwell + weights["path_length"] * emd
+
+
+# One simulator per (store, persona file) in each worker process, reused across candidates
+_worker_simulators: Dict[Tuple[str, str], CustomerSimulator] = {}
+
+
+def simulate_candidate(store_id: str, persona: str, params: Dict[str, Any], n: int, seed: int,
+                       budget_sensitivity: int, preferences: Dict[str, bool],
+                       persona_file: str = None) -> List[Dict[str, Any]]:
+    """n journeys for one persona parameter set, drawn from a fresh stream seeded with seed"""
+    simulator = _worker_simulators.get((store_id, persona_file))
+    if simulator is None:
+        simulator = CustomerSimulator(store_id=store_id, persona_file=persona_file)
+        _worker_simulators[(store_id, persona_file)] = simulator
+    simulator.persona_data[persona] = params
+    simulator.rng = random.Random(seed)
+    return [simulator.simulate_journey(persona, budget_sensitivity, preferences) for _ in range(n)]
+
+
+def evaluate_candidate(task: Dict[str, Any]) -> float:
+    """Loss of one candidate (runs in a worker process)"""
+    try:
+        results = simulate_candidate(task["store_id"], task["persona"], task["params"], task["n"], task["seed"],
+                                     task["budget_sensitivity"], task["preferences"], task.get("persona_file"))
+    except ValueError:
+        # e.g. a path style asking for more sections than the lists leave available
+        return float("inf")
+    stats = journey_stats(results, task["sections"], task["max_path"])
+    return stats_loss(stats, task["target"], task.get("weights"))
+
+
+class PersonaCalibrator:
+    """Local search over one persona's parameters against observed journeys"""
+
+    def __init__(self, simulator: CustomerSimulator, persona: str, observed: List[Dict[str, Any]],
+                 samples: int = 400, workers: int = None, seed: int = 0, budget_sensitivity: int = None,
+                 preferences: Dict[str, bool] = None, weights: Dict[str, float] = None, edits_per_step: int = 2):
+        if persona not in simulator.persona_data:
+            raise ValueError(f"Unknown persona: {persona}")
+        if not observed:
+            raise ValueError("No observed journeys to calibrate against")
+        self.simulator = simulator
+        self.persona = persona
+        self.samples = samples
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.params = copy.deepcopy(simulator.persona_data[persona])
+        self.budget_sensitivity = budget_sensitivity or self.params.get("budget_sensitivity", 3)
+        self.preferences = preferences or {}
+        self.weights = weights
+        self.edits_per_step = edits_per_step
+        store_data = simulator.registry.layout(simulator.store_id)
+        special = {s['name'] for s in store_data['sections'] if s.get('type') in SPECIAL_TYPES}
+        self.sections = simulator.sections
+        self.regular = [s for s in self.sections if s not in special]
+        self.max_path = max(len(self.sections), max(len(r.get('path', [])) for r in observed))
+        self.target = journey_stats(observed, self.sections, self.max_path)
+        self.history: List[Dict[str, Any]] = []
+
+    def _task(self, params: Dict[str, Any], seed: int) -> Dict[str, Any]:
+        return {
+            "store_id": self.simulator.store_id, "persona_file": self.simulator.persona_file,
+            "persona": self.persona, "params": params,
+            "n": self.samples, "seed": seed, "budget_sensitivity": self.budget_sensitivity,
+            "preferences": self.preferences, "sections": self.sections, "max_path": self.max_path,
+            "target": self.target, "weights": self.weights,
+        }
+
+    def evaluate(self, candidates: List[Dict[str, Any]], seed: int, executor=None) -> List[float]:
+        """Losses of all candidates on the same random stream"""
+        tasks = [self._task(c, seed) for c in candidates]
+        if executor is None:
+            return [evaluate_candidate(t) for t in tasks]
+        return list(executor.map(evaluate_candidate, tasks))
+
+    def neighbours(self, params: Dict[str, Any], seed: int, step: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Candidate edits of params, guided by where simulated visit rates and dwell miss the
+        target. If params can't be simulated only the unguided dwell and style steps are proposed.
+        """
+        try:
+            sim = journey_stats(simulate_candidate(self.simulator.store_id, self.persona, params, self.samples, seed,
+                                                   self.budget_sensitivity, self.preferences,
+                                                   self.simulator.persona_file),
+                                self.sections, self.max_path)
+        except ValueError:
+            # Same failure evaluate_candidate scores as an infinite loss
+            sim = None
+        candidates = []
+
+        def candidate(label, **changes):
+            c = copy.deepcopy(params)
+            c.update(changes)
+            candidates.append((label, c))
+
+        # Dwell: rescale by the ratio of mean observed to simulated dwell, plus a plain step either way
+        bins = np.arange(MAX_DWELL_BIN + 1)
+        sim_mean = float(sim["dwell"] @ bins) if sim is not None else 0.0
+        obs_mean = float(self.target["dwell"] @ bins)
+        multiplier = params["dwell_time_multiplier"]
+        if sim is not None and sim_mean > 0 and obs_mean > 0:
+            candidate("dwell ratio", dwell_time_multiplier=round(multiplier * obs_mean / sim_mean, 3))
+        candidate("dwell up", dwell_time_multiplier=round(multiplier * (1 + step), 3))
+        candidate("dwell down", dwell_time_multiplier=round(multiplier * (1 - step), 3))
+        for style in PATH_STYLES:
+            if style != params["path_style"]:
+                candidate(f"style {style}", path_style=style)
+        if sim is None:
+            return candidates
+
+        # Section lists: follow the largest visit-rate gaps
+        index = {s: i for i, s in enumerate(self.sections)}
+        gap = {s: self.target["visit_rates"][index[s]] - sim["visit_rates"][index[s]] for s in self.regular}
+        preferred, avoided = params["preferred_sections"], params["avoided_sections"]
+        under = sorted((s for s in self.regular if s not in preferred), key=lambda s: -gap[s])
+        over_preferred = sorted(preferred, key=lambda s: gap.get(s, 0))
+        over_other = sorted((s for s in self.regular if s not in preferred and s not in avoided), key=lambda s: gap[s])
+        under_avoided = sorted(avoided, key=lambda s: -gap.get(s, 0))
+        k = self.edits_per_step
+        for s in [s for s in under if gap[s] > 0][:k]:
+            candidate(f"prefer {s}", preferred_sections=preferred + [s],
+                      avoided_sections=[a for a in avoided if a != s])
+        for s in [s for s in over_preferred if gap.get(s, 0) < 0][:k]:
+            candidate(f"unprefer {s}", preferred_sections=[p for p in preferred if p != s])
+        for s in [s for s in over_other if gap[s] < 0][:k]:
+            candidate(f"avoid {s}", avoided_sections=avoided + [s])
+        for s in [s for s in under_avoided if gap.get(s, 0) > 0][:k]:
+            candidate(f"unavoid {s}", avoided_sections=[a for a in avoided if a != s])
+        return candidates
+
+    def run(self, iterations: int = 20, patience: int = 4, step: float = 0.2) -> Dict[str, Any]:
+        """Greedy local search; returns the best parameters with before/after losses"""
+        rng = random.Random(self.seed)
+        best = copy.deepcopy(self.params)
+        start = time.perf_counter()
+        initial_loss = None
+        stale = 0
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            for it in range(iterations):
+                # A fresh common stream per step: the incumbent is re-scored on it with every candidate
+                seed = rng.randrange(1 << 30)
+                proposals = self.neighbours(best, seed, step)
+                losses = self.evaluate([best] + [c for _, c in proposals], seed, executor)
+                current, candidate_losses = losses[0], losses[1:]
+                if initial_loss is None:
+                    initial_loss = current
+                i = int(np.argmin(candidate_losses)) if candidate_losses else -1
+                improved = i >= 0 and candidate_losses[i] < current
+                self.history.append({
+                    "iteration": it, "loss": current, "candidates": len(proposals),
+                    "accepted": proposals[i][0] if improved else None,
+                    "best_candidate_loss": candidate_losses[i] if i >= 0 else None,
+                })
+                logging.info(f"Calibration {self.persona} step {it}: loss {current:.4f}, "
+                             f"{'accepted ' + proposals[i][0] if improved else 'no improvement'}")
+                if improved:
+                    best = proposals[i][1]
+                    stale = 0
+                else:
+                    stale += 1
+                    step /= 2
+                    if stale >= patience:
+                        break
+            # Final score of the incumbent on a held-out stream
+            final_seed = rng.randrange(1 << 30)
+            initial_final, final_loss = self.evaluate([self.params, best], final_seed, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return {
+            "persona": self.persona,
+            "params": best,
+            "initial_loss": initial_final,
+            "final_loss": final_loss,
+            "search_initial_loss": initial_loss,
+            "iterations": len(self.history),
+            "elapsed_seconds": time.perf_counter() - start,
+            "history": self.history,
+        }
+
+
+def load_observed(path: str) -> List[Dict[str, Any]]:
+    """Observed journey records from a JSON lines file (e.g. written by ingest_trajectories.py)"""
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_persona_file(path: str, calibrated: Dict[str, Dict[str, Any]], meta: Dict[str, Any] = None):
+    """Write (or merge into) a persona file that CustomerSimulator(persona_file=...) loads"""
+    data = {"personas": {}, "calibration": {}}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            data = json.load(f)
+    for persona, result in calibrated.items():
+        data["personas"][persona] = result["params"]
+        data.setdefault("calibration", {})[persona] = dict(
+            {k: v for k, v in result.items() if k not in ("params", "history", "persona")}, **(meta or {}))
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
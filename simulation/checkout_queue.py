@@ -0,0 +1,167 @@
+import heapq
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+# Event-driven multi-server queue for checkout lanes. Customers reach checkout at
+# store-entry time + shopping time, join a single FCFS line and are served by the
+# first free lane. Lane free times live in a heap, so a day of arrivals costs
+# O(n log lanes) and waits, lane loads and queue lengths fall out of the event times.
+
+OPEN_MINUTES = 14 * 60
+
+
+class ServiceModel:
+    """Checkout service time distribution (minutes)"""
+
+    KINDS = ("fixed", "exponential", "lognormal", "gamma")
+
+    def __init__(self, kind: str = "lognormal", mean: float = 3.0, cv: float = 0.5):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown service distribution {kind!r}; expected one of {self.KINDS}")
+        if mean <= 0:
+            raise ValueError("Mean service time must be positive")
+        self.kind = kind
+        self.mean = mean
+        self.cv = cv
+
+    def sample(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        if self.kind == "fixed":
+            return np.full(n, self.mean)
+        if self.kind == "exponential":
+            return rng.exponential(self.mean, n)
+        if self.kind == "lognormal":
+            sigma2 = np.log1p(self.cv ** 2)
+            return rng.lognormal(np.log(self.mean) - sigma2 / 2, np.sqrt(sigma2), n)
+        shape = 1 / self.cv ** 2
+        return rng.gamma(shape, self.mean / shape, n)
+
+
+def poisson_entry_times(n: int, open_minutes: float = OPEN_MINUTES, rng: np.random.Generator = None) -> np.ndarray:
+    """n store-entry times of a homogeneous Poisson process over the opening hours (sorted)"""
+    rng = rng or np.random.default_rng()
+    return np.sort(rng.uniform(0, open_minutes, n))
+
+
+def shopping_minutes(results_list: List[Dict[str, Any]], checkout_sections: List[str] = ("Checkout",)) -> np.ndarray:
+    """Time each journey spends before reaching checkout (dwell outside checkout sections plus walking)"""
+    checkout_sections = set(checkout_sections)
+    return np.array([sum(t for s, t in r.get('dwell_time', {}).items() if s not in checkout_sections)
+                     + r.get('walk_time', 0.0) for r in results_list], dtype=np.float64)
+
+
+class CheckoutQueueResult:
+    """Per-customer event times of one checkout queue run, with summary statistics"""
+
+    def __init__(self, arrivals: np.ndarray, starts: np.ndarray, service: np.ndarray, lanes: np.ndarray,
+                 n_lanes: int):
+        self.arrivals = arrivals
+        self.starts = starts
+        self.service = service
+        self.ends = starts + service
+        self.lanes = lanes
+        self.n_lanes = n_lanes
+
+    def __len__(self) -> int:
+        return len(self.arrivals)
+
+    @property
+    def waits(self) -> np.ndarray:
+        return self.starts - self.arrivals
+
+    @property
+    def horizon(self) -> float:
+        """Time from first arrival to the last customer leaving"""
+        if len(self) == 0:
+            return 0.0
+        return float(self.ends.max() - self.arrivals.min())
+
+    def lane_utilization(self) -> np.ndarray:
+        busy = np.bincount(self.lanes, weights=self.service, minlength=self.n_lanes)
+        return busy / self.horizon if self.horizon > 0 else np.zeros(self.n_lanes)
+
+    def queue_lengths(self) -> np.ndarray:
+        """Customers already waiting in line when each customer arrives"""
+        # FCFS on a shared line: service starts are non-decreasing in arrival order
+        started = np.searchsorted(self.starts, self.arrivals, side="right")
+        return np.arange(len(self)) - np.minimum(started, np.arange(len(self)))
+
+    def summary(self) -> Dict[str, Any]:
+        if len(self) == 0:
+            return {"customers": 0, "lanes": self.n_lanes}
+        waits = self.waits
+        utilization = self.lane_utilization()
+        return {
+            "customers": len(self),
+            "lanes": self.n_lanes,
+            "mean_wait": float(waits.mean()),
+            "median_wait": float(np.median(waits)),
+            "p90_wait": float(np.percentile(waits, 90)),
+            "p99_wait": float(np.percentile(waits, 99)),
+            "max_wait": float(waits.max()),
+            "waited_share": float((waits > 1e-9).mean()),
+            "max_queue_length": int(self.queue_lengths().max()),
+            "mean_utilization": float(utilization.mean()),
+            "lane_utilization": utilization.tolist(),
+        }
+
+    def wait_histogram(self, bin_minutes: float = 1.0) -> Dict[str, List[float]]:
+        waits = self.waits
+        edges = np.arange(0, max(waits.max(), 0) + 2 * bin_minutes, bin_minutes) if len(self) else np.array([0.0])
+        counts, edges = np.histogram(waits, bins=edges)
+        return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+
+def simulate_checkout(arrivals: np.ndarray, n_lanes: int, service: ServiceModel = None,
+                      rng: np.random.Generator = None, service_times: np.ndarray = None) -> CheckoutQueueResult:
+    """
+    Run a shared-line FCFS queue over n_lanes checkout lanes. Arrival times are in
+    minutes; service times are drawn from the service model unless given explicitly.
+    """
+    if n_lanes < 1:
+        raise ValueError("At least one checkout lane is required")
+    rng = rng or np.random.default_rng()
+    order = np.argsort(arrivals, kind="stable")
+    arrivals = np.asarray(arrivals, dtype=np.float64)[order]
+    if service_times is None:
+        service_times = (service or ServiceModel()).sample(len(arrivals), rng)
+    else:
+        service_times = np.asarray(service_times, dtype=np.float64)[order]
+
+    starts = np.empty(len(arrivals))
+    lanes = np.empty(len(arrivals), dtype=np.int64)
+    # (time the lane becomes free, lane id); ties go to the lowest lane id
+    free = [(0.0, lane) for lane in range(n_lanes)]
+    heapq.heapify(free)
+    arrivals_list = arrivals.tolist()
+    service_list = service_times.tolist()
+    for i in range(len(arrivals_list)):
+        free_at, lane = free[0]
+        start = arrivals_list[i] if arrivals_list[i] > free_at else free_at
+        heapq.heapreplace(free, (start + service_list[i], lane))
+        starts[i] = start
+        lanes[i] = lane
+    return CheckoutQueueResult(arrivals, starts, service_times, lanes, n_lanes)
+
+
+def simulate_checkout_day(results_list: List[Dict[str, Any]], n_lanes: int, customers: Optional[int] = None,
+                          service: ServiceModel = None, open_minutes: float = OPEN_MINUTES,
+                          entry_times: np.ndarray = None, seed: Optional[int] = None,
+                          checkout_sections: List[str] = ("Checkout",)) -> CheckoutQueueResult:
+    """
+    Feed batch journeys through the checkout lanes for one day. Journeys are resampled
+    to `customers` shoppers (default: one per journey) with Poisson entry times unless
+    entry_times is given.
+    """
+    rng = np.random.default_rng(seed)
+    shopping = shopping_minutes(results_list, checkout_sections)
+    if entry_times is None:
+        customers = customers or len(shopping)
+        entry_times = poisson_entry_times(customers, open_minutes, rng)
+    else:
+        customers = len(entry_times)
+    if len(shopping) == 0:
+        shopping = np.zeros(1)
+    if customers != len(shopping):
+        shopping = rng.choice(shopping, customers)
+    return simulate_checkout(np.asarray(entry_times) + shopping, n_lanes, service=service, rng=rng)
@@ -1,5 +1,19 @@
 import random
-from typing import Dict, List, Any
+from collections import Counter
+from typing import Dict, List, Any, Union
+
+import numpy as np
+import pandas as pd
+
+from simulation.checkout_queue import CheckoutQueueResult, ServiceModel, simulate_checkout_day
+from simulation.history import JourneyHistory
+from simulation.journey_index import JourneyIndex, filter_results
+from simulation.replay import render_static_base, iter_replay_frames, write_replay_video
+from simulation.section_stats import SectionStatsIndex
+from simulation.similarity import (DEFAULT_THRESHOLD, compare_journeys, cluster_journeys, path_matrix_from_results,
+                                   path_matrix_from_store)
+from simulation.summary import JourneyColumns, columns_from_results, persona_summary
+from simulation.travel import journey_total_time
 
 class AnalyticsDashboard:
     """
@@ -40,10 +54,16 @@ class AnalyticsDashboard:
             "Consider health-focused product placement in {section} for wellness-oriented customers."
         ]
     
-    def generate_insights(self, results: Dict[str, Any], all_results: List[Dict[str, Any]] = None) -> List[Dict[str, str]]:
-        """Generate robust, contextual, and comparative AI-like insights from simulation results"""
-        if all_results is None:
-            all_results = []
+    def generate_insights(self, results: Dict[str, Any],
+                          all_results: Union[List[Dict[str, Any]], JourneyHistory] = None) -> List[Dict[str, str]]:
+        """
+        Generate robust, contextual, and comparative AI-like insights from simulation results.
+        all_results is the history to compare against: a JourneyHistory (O(1) per section)
+        or a plain list of results, which is aggregated once.
+        """
+        history = all_results
+        if isinstance(all_results, list):
+            history = JourneyHistory.from_results(all_results)
         insights = []
         # Dwell time insight
         if results['dwell_time']:
@@ -108,11 +128,11 @@ class AnalyticsDashboard:
                 "title": "Health Focus Influence",
                 "description": insight
             })
-        # Contextual insight (compare to average if all_results provided)
-        if all_results:
+        # Contextual insight (compare to the history's section averages)
+        if history is not None and len(history) > 0:
             for section in results['dwell_time']:
                 persona_time = results['dwell_time'][section]
-                avg_time = sum(r['dwell_time'].get(section, 0) for r in all_results) / len(all_results)
+                avg_time = history.section_average(section)
                 if avg_time > 0:
                     percent = int(100 * (persona_time - avg_time) / avg_time)
                     if abs(percent) > 20:
@@ -123,23 +143,22 @@ class AnalyticsDashboard:
                             "description": insight
                         })
                         break
-        # Comparative insight (compare to another persona if all_results provided)
-        if all_results and len(all_results) > 1:
-            for other in all_results:
-                if other['persona'] != persona:
-                    for section in results['dwell_time']:
-                        t1 = results['dwell_time'][section]
-                        t2 = other['dwell_time'].get(section, 0)
-                        if t2 > 0 and t1 / t2 > 1.5:
-                            factor = round(t1 / t2, 1)
-                            insight = self.comparative_template.format(
-                                other_persona=other['persona'], persona=persona, factor=factor, section=section)
-                            insights.append({
-                                "title": "Comparative Insight",
-                                "description": insight
-                            })
-                            break
-                    break
+        # Comparative insight (compare to the most common other persona's averages)
+        if history is not None and len(history) > 1:
+            other = history.most_common_other(persona)
+            if other is not None:
+                for section in results['dwell_time']:
+                    t1 = results['dwell_time'][section]
+                    t2 = history.persona_section_average(other, section)
+                    if t2 > 0 and t1 / t2 > 1.5:
+                        factor = round(t1 / t2, 1)
+                        insight = self.comparative_template.format(
+                            other_persona=other, persona=persona, factor=factor, section=section)
+                        insights.append({
+                            "title": "Comparative Insight",
+                            "description": insight
+                        })
+                        break
         return insights
     
     def generate_recommendations(self, results: Dict[str, Any]) -> List[str]:
@@ -211,7 +230,8 @@ class AnalyticsDashboard:
         skipped = results.get('skipped', [])
         
         analytics = {
-            "total_time": sum(dwell_time.values()),
+            "total_time": journey_total_time(results),
+            "walk_distance_m": results.get('walk_distance_m', 0.0),
             "average_dwell_time": sum(dwell_time.values()) / len(dwell_time) if dwell_time else 0,
             "path_length": len(path),
             "sections_skipped": len(skipped),
@@ -230,33 +250,17 @@ class AnalyticsDashboard:
         if not results_list:
             return {}
         
-        comparison = {
-            "personas": [],
-            "total_times": [],
-            "efficiency_scores": [],
-            "path_lengths": [],
-            "most_common_sections": []
-        }
-        
-        for results in results_list:
-            persona = results.get('persona', 'Unknown')
-            total_time = sum(results.get('dwell_time', {}).values())
-            path_length = len(results.get('path', []))
-            skipped_count = len(results.get('skipped', []))
-            efficiency = path_length / (path_length + skipped_count) if (path_length + skipped_count) > 0 else 0
-            
-            comparison["personas"].append(persona)
-            comparison["total_times"].append(total_time)
-            comparison["efficiency_scores"].append(efficiency)
-            comparison["path_lengths"].append(path_length)
-            comparison["most_common_sections"].extend(results.get('path', [])[1:-1])  # Exclude entrance/checkout
+        columns = columns_from_results(results_list)
+        # Most common sections across all personas, excluding entrance/checkout
+        section_counts = Counter(s for r in results_list for s in r.get('path', [])[1:-1])
         
-        # Find most common sections across all personas
-        from collections import Counter
-        section_counts = Counter(comparison["most_common_sections"])
-        comparison["most_common_sections"] = [section for section, count in section_counts.most_common(5)]
-        
-        return comparison
+        return {
+            "personas": [columns.personas[p] for p in columns.persona],
+            "total_times": columns.total_time.tolist(),
+            "efficiency_scores": columns.efficiency.tolist(),
+            "path_lengths": columns.path_len.astype(int).tolist(),
+            "most_common_sections": [section for section, count in section_counts.most_common(5)]
+        }
     
     def frequency_heatmap(self, all_results: List[Dict[str, Any]] = None):
         if all_results is None:
@@ -264,34 +268,159 @@ class AnalyticsDashboard:
         # TODO: Implement frequency heatmap for section visits
         pass
     
-    def path_comparison(self, results1: Dict[str, Any], results2: Dict[str, Any]):
-        # TODO: Implement side-by-side path comparison
-        pass
+    def path_comparison(self, results1: Dict[str, Any], results2: Dict[str, Any]) -> Dict[str, Any]:
+        """Side-by-side comparison: path edit distance, dwell-weighted overlap and section differences"""
+        return compare_journeys(results1, results2)
+
+    def shopper_archetypes(self, all_results: List[Dict[str, Any]] = None, store=None, sections: List[str] = None,
+                           top: int = 10, min_size: int = 2, threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+        """
+        Largest clusters of similar journeys (MinHash/LSH over section shingles) with their
+        representative path and dominant persona; pass a JourneyStore for large histories
+        """
+        if store is not None:
+            records = store.records()
+            paths, live = path_matrix_from_store(store, records)
+            sections = store.sections
+            persona_codes = np.asarray(records["persona"][live], dtype=np.int64)
+            persona_names = store.personas
+        else:
+            if not all_results:
+                return pd.DataFrame()
+            sections = sections or sorted({s for r in all_results for s in r.get('path', [])})
+            paths = path_matrix_from_results(all_results, sections)
+            persona_codes, persona_names = pd.factorize(pd.Series([r.get('persona', 'Unknown') for r in all_results]))
+        if len(paths) == 0:
+            return pd.DataFrame()
+        clusters = cluster_journeys(paths, len(sections), threshold=threshold)
+        rows = []
+        for k in range(min(top, len(clusters))):
+            if clusters.sizes[k] < min_size:
+                break
+            members = clusters.members(k)
+            counts = np.bincount(persona_codes[members], minlength=len(persona_names))
+            rep = paths[clusters.representatives[k]]
+            rows.append({
+                "Archetype": k + 1,
+                "Journeys": int(clusters.sizes[k]),
+                "Share (%)": round(100 * clusters.sizes[k] / len(paths), 1),
+                "Top Persona": persona_names[counts.argmax()],
+                "Persona Share (%)": round(100 * counts.max() / clusters.sizes[k], 1),
+                "Representative Path": " → ".join(sections[i] for i in rep[rep >= 0]),
+            })
+        return pd.DataFrame(rows).set_index("Archetype") if rows else pd.DataFrame()
     
-    def bottleneck_detection(self, all_results: List[Dict[str, Any]] = None):
+    def bottleneck_detection(self, all_results: List[Dict[str, Any]] = None, queue: CheckoutQueueResult = None,
+                             lanes: int = 8, customers: int = None, service: ServiceModel = None,
+                             dwell_threshold: float = 10, skip_threshold: float = 0.9,
+                             wait_threshold: float = 5.0, utilization_threshold: float = 0.85,
+                             seed: int = None) -> Dict[str, Any]:
+        """
+        Highlight sections with high dwell/skipped rates and checkout congestion. Checkout
+        waits come from the lane queue simulation (run on all_results unless a queue
+        result is passed) rather than from the fixed checkout dwell.
+        """
         if all_results is None:
             all_results = []
-        # TODO: Highlight sections with high dwell/skipped rates
-        pass
+        report = {"sections": [], "checkout": {}}
+        n = len(all_results)
+        if n:
+            visits = Counter(s for r in all_results for s in r['dwell_time'])
+            dwell_totals = Counter()
+            for r in all_results:
+                dwell_totals.update(r['dwell_time'])
+            skips = Counter(s for r in all_results for s in set(r.get('skipped', [])))
+            for section in sorted(set(visits) | set(skips)):
+                avg_dwell = dwell_totals[section] / visits[section] if visits[section] else 0.0
+                skip_rate = skips[section] / n
+                reasons = []
+                if avg_dwell > dwell_threshold and "Checkout" not in section:
+                    reasons.append("high dwell")
+                if skip_rate >= skip_threshold:
+                    reasons.append("rarely visited")
+                if reasons:
+                    report["sections"].append({
+                        "section": section,
+                        "visits": visits[section],
+                        "avg_dwell": avg_dwell,
+                        "skip_rate": skip_rate,
+                        "reasons": reasons,
+                    })
+        if queue is None and all_results:
+            queue = simulate_checkout_day(all_results, lanes, customers=customers, service=service, seed=seed)
+        if queue is not None and len(queue):
+            checkout = queue.summary()
+            checkout["congested"] = (checkout["p90_wait"] > wait_threshold
+                                     or checkout["mean_utilization"] > utilization_threshold)
+            report["checkout"] = checkout
+        return report
     
-    def persona_summary_table(self, all_results: List[Dict[str, Any]] = None):
-        if all_results is None:
-            all_results = []
-        # TODO: Tabular view of all personas with key stats
-        pass
+    def persona_summary_table(self, all_results: List[Dict[str, Any]] = None, columns: JourneyColumns = None,
+                              store_data: Dict[str, Any] = None, top_n: int = 3) -> pd.DataFrame:
+        """Tabular view of all personas with key stats; pass columns (e.g. from a journey store) for large batches"""
+        if columns is None:
+            if not all_results:
+                return pd.DataFrame()
+            columns = columns_from_results(all_results, store_data=store_data)
+        return persona_summary(columns, top_n=top_n)
     
-    def scenario_replay(self, results: Dict[str, Any]):
-        # TODO: Animate the customer's path step-by-step
-        pass
+    def scenario_replay(self, results: Dict[str, Any], base_img, snapped_stops, path_segments,
+                        output_path: str, frame_stride: int = 8, fps: int = 20, walkable_mask=None,
+                        codec: str = "VP80", scale: float = 1.0) -> int:
+        """Animate the customer's path step-by-step into a video file; returns the frame count"""
+        # Markers are rendered for the first visit of each section, matching the static view
+        unique_sections = list(dict.fromkeys(results.get('path', [])))[:len(snapped_stops)]
+        dwell_times = [results.get('dwell_time', {}).get(s, 0) for s in unique_sections]
+        base = render_static_base(base_img, snapped_stops, dwell_times, walkable_mask=walkable_mask,
+                                  section_names=unique_sections, visit_counts=Counter(results.get('path', [])))
+        frames = iter_replay_frames(base, path_segments, frame_stride=frame_stride)
+        return write_replay_video(frames, output_path, fps=fps, codec=codec, scale=scale)
     
-    def dynamic_filtering(self, all_results: List[Dict[str, Any]] = None, filters: Dict = None):
-        if all_results is None:
-            all_results = []
+    def dynamic_filtering(self, all_results: List[Dict[str, Any]] = None, filters: Dict = None,
+                          index: JourneyIndex = None) -> Dict[str, Any]:
+        """Filter analytics by persona, budget, preference flags or visited sections"""
         if filters is None:
             filters = {}
-        # TODO: Filter analytics by persona, budget, or preference
-        pass
+        if index is not None:
+            # Bitmap index over the journey store: bitwise ops instead of a Python scan
+            index.refresh()
+            return index.aggregate(filters)
+        if all_results is None:
+            all_results = []
+        matched = filter_results(all_results, filters)
+        summary = {
+            "count": len(matched),
+            "total_journeys": len(all_results),
+            "average_total_time": 0.0,
+            "average_sections": 0.0,
+            "section_visit_rates": {},
+            "top_sections": [],
+        }
+        if not matched:
+            return summary
+        summary["average_total_time"] = sum(journey_total_time(r) for r in matched) / len(matched)
+        summary["average_sections"] = sum(len(r['path']) for r in matched) / len(matched)
+        visit_counts = Counter(s for r in matched for s in set(r['path']))
+        summary["section_visit_rates"] = {s: c / len(matched) for s, c in visit_counts.items()}
+        summary["top_sections"] = [s for s, _ in visit_counts.most_common(5)]
+        return summary
     
-    def hover_details(self, section: str, results: Dict[str, Any]):
-        # TODO: Show detailed stats for each section on hover
-        pass
\ No newline at end of file
+    def hover_details(self, section: str, results: Dict[str, Any], index: SectionStatsIndex = None) -> Dict[str, Any]:
+        """
+        Tooltip stats for a section: this journey's visits and dwell, plus the section's
+        stats for the journey's persona and for all journeys from a prebuilt index
+        """
+        details = {
+            "section": section,
+            "journey": {
+                "visits": results.get('path', []).count(section),
+                "dwell": results.get('dwell_time', {}).get(section, 0),
+                "skipped": section in results.get('skipped', []),
+            },
+        }
+        if index is not None and section in index.section_ids:
+            details["all"] = index.details(section)
+            persona = results.get('persona')
+            if persona in index.persona_ids:
+                details["persona"] = index.details(section, persona)
+        return details
\ No newline at end of file
@@ -0,0 +1,97 @@
+import threading
+from collections import deque
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+# Bounded journey history with running aggregates. Only the fields the insights
+# need (persona and dwell minutes per section) are kept, in a fixed-capacity ring;
+# per-section and per-persona dwell sums are updated on append and on eviction, so
+# averages are O(1) lookups however long the history is and memory is capped by
+# the capacity.
+
+DEFAULT_SESSION_HISTORY = 200
+DEFAULT_GLOBAL_HISTORY = 5000
+
+
+class JourneyHistory:
+    """
+    Ring buffer of the last `capacity` journeys with incremental per-section and
+    per-persona dwell aggregates. Safe to share between sessions (appends lock).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SESSION_HISTORY):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self._entries: deque = deque()
+        self._section_dwell: Dict[str, float] = {}
+        self._persona_count: Dict[str, int] = {}
+        self._persona_dwell: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.total_appended = 0
+
+    @classmethod
+    def from_results(cls, results_list: List[Dict[str, Any]], capacity: int = None) -> "JourneyHistory":
+        """History over an existing list of results (keeps the newest `capacity`, default all)"""
+        history = cls(capacity or max(len(results_list), 1))
+        history.extend(results_list)
+        return history
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, results: Dict[str, Any]):
+        """Record one journey, evicting the oldest when full"""
+        entry = (results.get('persona', 'Unknown'), dict(results.get('dwell_time', {})))
+        with self._lock:
+            if len(self._entries) >= self.capacity:
+                self._apply(self._entries.popleft(), -1)
+            self._entries.append(entry)
+            self._apply(entry, 1)
+            self.total_appended += 1
+
+    def extend(self, results_list: Iterable[Dict[str, Any]]):
+        for results in results_list:
+            self.append(results)
+
+    def _apply(self, entry: Tuple[str, Dict[str, float]], sign: int):
+        persona, dwell = entry
+        count = self._persona_count.get(persona, 0) + sign
+        persona_dwell = self._persona_dwell.setdefault(persona, {})
+        for section, minutes in dwell.items():
+            self._section_dwell[section] = self._section_dwell.get(section, 0) + sign * minutes
+            persona_dwell[section] = persona_dwell.get(section, 0) + sign * minutes
+        if count > 0:
+            self._persona_count[persona] = count
+        else:
+            # Drop emptied personas so their float residue doesn't linger
+            self._persona_count.pop(persona, None)
+            self._persona_dwell.pop(persona, None)
+
+    def section_average(self, section: str) -> float:
+        """Mean dwell minutes in section over all journeys in the history (0 where not visited)"""
+        n = len(self._entries)
+        return self._section_dwell.get(section, 0) / n if n else 0.0
+
+    def persona_count(self, persona: str) -> int:
+        return self._persona_count.get(persona, 0)
+
+    def persona_section_average(self, persona: str, section: str) -> float:
+        """Mean dwell minutes in section over the persona's journeys in the history"""
+        n = self._persona_count.get(persona, 0)
+        return self._persona_dwell.get(persona, {}).get(section, 0) / n if n else 0.0
+
+    def personas(self) -> Dict[str, int]:
+        """Journey count per persona currently in the history"""
+        return dict(self._persona_count)
+
+    def most_common_other(self, persona: str) -> Optional[str]:
+        """The persona other than `persona` with the most journeys in the history"""
+        others = [(n, p) for p, n in self._persona_count.items() if p != persona]
+        return max(others)[1] if others else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._section_dwell.clear()
+            self._persona_count.clear()
+            self._persona_dwell.clear()
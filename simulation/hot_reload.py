@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Set, Optional
+
+import numpy as np
+
+from simulation.store_assets import StoreAssets, StoreState, load_store_state, ROUTE_TILE
+
+# Hot reload of store layout / aisle mask edits. A reload diffs the new files against
+# the snapshot being served, carries over every derived artifact the edit did not
+# touch, recomputes the rest in the background and then swaps snapshots atomically.
+
+SNAP_RADIUS = 50  # matches snap_to_aisle's default search radius
+
+
+def diff_layouts(old_layout: Dict[str, Any], new_layout: Dict[str, Any]) -> Set[str]:
+    """Names of sections that were moved, added, removed or retyped"""
+    old = {s['name']: s for s in old_layout.get('sections', [])}
+    new = {s['name']: s for s in new_layout.get('sections', [])}
+    changed = set(old) ^ set(new)
+    for name in set(old) & set(new):
+        if old[name].get('position') != new[name].get('position') or old[name].get('type') != new[name].get('type'):
+            changed.add(name)
+    return changed
+
+
+def diff_masks(old_grid: np.ndarray, new_grid: np.ndarray, tile: int = ROUTE_TILE):
+    """
+    Compare two aisle cost grids tile by tile.
+    Returns (tiles where pixels became blocked or more expensive, tiles where pixels
+    became walkable or cheaper) as boolean tile maps, or None if the grid shape changed.
+    """
+    if old_grid.shape != new_grid.shape:
+        return None
+    h, w = old_grid.shape
+    ty, tx = (h + tile - 1) // tile, (w + tile - 1) // tile
+    pad = ((0, ty * tile - h), (0, tx * tile - w))
+    old_g = np.pad(old_grid, pad).astype(np.int16)
+    new_g = np.pad(new_grid, pad).astype(np.int16)
+    worse = (old_g > 0) & ((new_g == 0) | (new_g > old_g))
+    better = (new_g > 0) & ((old_g == 0) | (new_g < old_g))
+    lost = worse.reshape(ty, tile, tx, tile).any(axis=(1, 3))
+    gained = better.reshape(ty, tile, tx, tile).any(axis=(1, 3))
+    return lost, gained
+
+
+def _tiles_in_box(tile_map: np.ndarray, y0: int, x0: int, y1: int, x1: int, tile: int = ROUTE_TILE) -> bool:
+    ty0, tx0 = max(0, y0 // tile), max(0, x0 // tile)
+    ty1, tx1 = y1 // tile + 1, x1 // tile + 1
+    return bool(tile_map[ty0:ty1, tx0:tx1].any())
+
+
+def carry_over(old: StoreState, new: StoreState) -> Dict[str, int]:
+    """
+    Copy snapped points and routes from old into new unless the edit invalidates them:
+      - snapped points of moved sections, or whose snap radius overlaps a repainted tile
+      - routes whose endpoints were re-snapped
+      - routes crossing tiles that lost walkable pixels or got more expensive
+      - every route once any tile gained walkable or cheaper pixels, since a new opening
+        anywhere can create a shortcut
+    Returns counts of kept and invalidated entries.
+    """
+    # Request threads keep filling the old snapshot's caches while this runs
+    with old._lock:
+        old_snapped = dict(old.snapped)
+        old_routes = dict(old.routes)
+        old_tile_ids = dict(old.route_tile_ids)
+    moved = diff_layouts(old.store_data, new.store_data)
+    masks = diff_masks(old.grid, new.grid)
+    if masks is None or (old.width, old.height) != (new.width, new.height):
+        return {"snapped_kept": 0, "snapped_invalidated": len(old_snapped),
+                "routes_kept": 0, "routes_invalidated": len(old_routes)}
+    lost, gained = masks
+    changed = lost | gained
+    lost_ids = np.flatnonzero(lost.ravel())
+    shortcut_possible = bool(gained.any())
+
+    stale_sections = set()
+    for section, point in old_snapped.items():
+        if section in moved or section not in new.section_coords:
+            stale_sections.add(section)
+            continue
+        y, x = new.section_coords[section]
+        if _tiles_in_box(changed, y - SNAP_RADIUS, x - SNAP_RADIUS, y + SNAP_RADIUS, x + SNAP_RADIUS):
+            stale_sections.add(section)
+            continue
+        new.snapped[section] = point
+
+    routes_kept = 0
+    for key, segment in old_routes.items():
+        if key[0] in stale_sections or key[1] in stale_sections or key[0] in moved or key[1] in moved:
+            continue
+        if segment is None:
+            # Unreachable pairs may have become reachable after any repaint
+            if changed.any():
+                continue
+        else:
+            if shortcut_possible or key not in old_tile_ids:
+                continue
+            if lost_ids.size and np.intersect1d(old_tile_ids[key], lost_ids).size:
+                continue
+            new.route_tile_ids[key] = old_tile_ids[key]
+        new.routes[key] = segment
+        routes_kept += 1
+    return {
+        "snapped_kept": len(new.snapped),
+        "snapped_invalidated": len(old_snapped) - len(new.snapped),
+        "routes_kept": routes_kept,
+        "routes_invalidated": len(old_routes) - routes_kept,
+    }
+
+
+class HotReloader:
+    """
+    Reloads a StoreAssets instance when its layout or mask file changes on disk.
+
+    The watcher thread polls file mtimes; reloads run on a background worker that
+    rebuilds the invalidated snapped points and previously cached routes before
+    swapping the new snapshot in, so callers keep being served the old data meanwhile.
+    """
+
+    def __init__(self, assets: StoreAssets, interval: float = 1.0, on_reload=None):
+        self.assets = assets
+        self.interval = interval
+        self.on_reload = on_reload
+        self.last_stats: Optional[Dict[str, int]] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-reload")
+        self._pending: Optional[Future] = None
+        self._failed_mtimes = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="store-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+        self._executor.shutdown(wait=False)
+
+    def _mtimes(self):
+        return os.path.getmtime(self.assets.layout_path), os.path.getmtime(self.assets.mask_path)
+
+    def _files_changed(self) -> bool:
+        state = self.assets.state
+        try:
+            mtimes = self._mtimes()
+        except OSError:
+            # File is mid-save (or briefly missing); try again on the next poll
+            return False
+        # Don't retry a broken edit until the files are saved again
+        return mtimes != (state.layout_mtime, state.mask_mtime) and mtimes != self._failed_mtimes
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            if self._files_changed() and (self._pending is None or self._pending.done()):
+                self.reload_async()
+
+    def reload_async(self) -> Future:
+        """Schedule a reload on the background worker"""
+        self._pending = self._executor.submit(self.reload)
+        return self._pending
+
+    def reload(self) -> Dict[str, int]:
+        """Diff the files against the served snapshot, rebuild what changed, then swap"""
+        old = self.assets.state
+        mtimes = None
+        try:
+            mtimes = self._mtimes()
+            new = load_store_state(self.assets.layout_path, self.assets.mask_path, self.assets.map_path)
+        except Exception as e:
+            self._failed_mtimes = mtimes
+            logging.error(f"Store reload failed, keeping previous layout/mask: {e}")
+            raise
+        stats = carry_over(old, new)
+        # Warm the new snapshot with everything the old one had cached
+        for section in old.snapped:
+            if section in new.section_coords:
+                new.snapped_point(section)
+        for start, end in old.routes:
+            if start in new.section_coords and end in new.section_coords:
+                new.route(start, end)
+        self.assets.state = new
+        self.last_stats = stats
+        logging.info(f"Store assets reloaded: {stats}")
+        if self.on_reload is not None:
+            self.on_reload(new, stats)
+        return stats
@@ -0,0 +1,211 @@
+import logging
+from typing import Dict, List, Any, Iterator, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from simulation.section_map import UNASSIGNED
+from simulation.store_assets import pixel_positions, position_units, POSITION_UNITS
+
+# Streaming ingest of observed shopper trajectories (timestamped x, y points) into
+# journey records shaped like CustomerSimulator.simulate_journey results. Files are
+# read in fixed-size chunks; each chunk is normalized, snapped to the aisle grid,
+# mapped to sections and split into stops vs transit with array operations only.
+# Only journeys that may continue into the next chunk are carried over, so memory
+# stays bounded by the chunk size plus the shoppers still in the store.
+
+DEFAULT_COLUMNS = {"journey": "journey_id", "time": "timestamp", "x": "x", "y": "y"}
+DEFAULT_CHUNK_POINTS = 1_000_000
+
+# Stop detection: slower than STOP_SPEED (pixels per second) for at least MIN_STOP seconds
+STOP_SPEED = 3.0
+MIN_STOP = 20.0
+# For time-ordered files: a shopper unseen for this long (seconds) has left the store
+SESSION_GAP = 1800.0
+
+
+def read_trajectory_chunks(path: str, fmt: str = None, columns: Dict[str, str] = None,
+                           chunk_points: int = DEFAULT_CHUNK_POINTS) -> Iterator[pd.DataFrame]:
+    """Yield chunks of a CSV or JSONL position log as frames with columns journey, time, x, y"""
+    columns = dict(DEFAULT_COLUMNS, **(columns or {}))
+    if fmt is None:
+        fmt = "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+    rename = {v: k for k, v in columns.items()}
+    if fmt == "csv":
+        reader = pd.read_csv(path, usecols=list(columns.values()), chunksize=chunk_points)
+    elif fmt == "jsonl":
+        reader = pd.read_json(path, lines=True, chunksize=chunk_points)
+    else:
+        raise ValueError(f"Unsupported trajectory format {fmt!r}; expected 'csv' or 'jsonl'")
+    with reader:
+        for chunk in reader:
+            chunk = chunk[list(columns.values())].rename(columns=rename)
+            if not pd.api.types.is_numeric_dtype(chunk["time"]):
+                # ISO timestamps -> seconds since the epoch
+                chunk["time"] = pd.to_datetime(chunk["time"], utc=True).astype("int64") / 1e9
+            yield chunk
+
+
+class TrajectoryIngestor:
+    """
+    Turns position logs into journey records on one StoreState snapshot.
+    sorted_by="journey" expects each shopper's points to be contiguous (any time order
+    within a journey); sorted_by="time" handles interleaved, time-ordered logs and closes
+    a journey after session_gap seconds without points. units says whether x, y are
+    image fractions or pixels; "auto" decides once, from the first block of points.
+    """
+
+    def __init__(self, state, store_id: str = None, persona: str = "Observed", stop_speed: float = STOP_SPEED,
+                 min_stop: float = MIN_STOP, sorted_by: str = "journey", session_gap: float = SESSION_GAP,
+                 units: str = "auto"):
+        if sorted_by not in ("journey", "time"):
+            raise ValueError("sorted_by must be 'journey' or 'time'")
+        if units not in POSITION_UNITS:
+            raise ValueError(f"units must be one of {', '.join(POSITION_UNITS)}")
+        self.state = state
+        self.store_id = store_id
+        self.persona = persona
+        self.stop_speed = stop_speed
+        self.min_stop = min_stop
+        self.sorted_by = sorted_by
+        self.session_gap = session_gap
+        self.units = units
+        self.sections = state.section_names
+        self._nearest = state.nearest_walkable.ravel()
+        self._section_of = state.section_labels.ravel()
+        self._pending: Optional[pd.DataFrame] = None
+        self.points_read = 0
+        self.journeys_emitted = 0
+
+    def ingest(self, chunks: Iterable[pd.DataFrame]) -> Iterator[Dict[str, Any]]:
+        """Stream records for every journey in the chunks (see read_trajectory_chunks)"""
+        for chunk in chunks:
+            self.points_read += len(chunk)
+            yield from self.feed(chunk)
+        yield from self.flush()
+
+    def feed(self, chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Add a chunk; returns records of the journeys it completed"""
+        block = chunk if self._pending is None else pd.concat([self._pending, chunk], ignore_index=True)
+        if len(block) == 0:
+            return []
+        if self.sorted_by == "journey":
+            # The last journey in the block may continue in the next chunk
+            last = block["journey"].iat[-1]
+            open_rows = (block["journey"] == last).to_numpy()
+        else:
+            last_seen = block.groupby("journey", sort=False)["time"].transform("max").to_numpy()
+            open_rows = last_seen > block["time"].max() - self.session_gap
+        self._pending = block[open_rows] if open_rows.any() else None
+        return self._process(block[~open_rows])
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Records for the journeys still held back (call at end of input)"""
+        block, self._pending = self._pending, None
+        return self._process(block) if block is not None else []
+
+    def _process(self, block: pd.DataFrame) -> List[Dict[str, Any]]:
+        if len(block) == 0:
+            return []
+        journey_codes, journey_names = pd.factorize(block["journey"], sort=False)
+        t = block["time"].to_numpy(dtype=np.float64)
+        order = np.lexsort((t, journey_codes))
+        journey = journey_codes[order]
+        t = t[order]
+
+        # Normalize like the layout positions, then snap to the aisles and look up sections
+        state = self.state
+        x, y = block["x"].to_numpy()[order], block["y"].to_numpy()[order]
+        if self.units == "auto":
+            # One decision for the whole file, so points near the origin keep the file's units
+            self.units = position_units(x, y)
+            logging.info(f"Trajectory coordinates read as {self.units}")
+        rows, cols = pixel_positions(x, y, state.width, state.height, units=self.units)
+        h, w = state.grid.shape
+        flat = np.clip(rows, 0, h - 1) * w + np.clip(cols, 0, w - 1)
+        snapped = self._nearest[flat]
+        section = self._section_of[snapped].astype(np.int64)
+        sy, sx = np.divmod(snapped, w)
+
+        # Speed to the next point of the same journey; a journey's last point closes its runs
+        n = len(t)
+        same_next = np.zeros(n, dtype=bool)
+        same_next[:-1] = journey[1:] == journey[:-1]
+        dt = np.zeros(n)
+        dt[:-1] = np.where(same_next[:-1], t[1:] - t[:-1], 0.0)
+        step = np.zeros(n)
+        step[:-1] = np.hypot(sy[1:] - sy[:-1], sx[1:] - sx[:-1])
+        speed = np.divide(step, dt, out=np.zeros(n), where=dt > 0)
+        stationary = (speed < self.stop_speed) & same_next
+
+        # Runs of consecutive stationary points per journey; long enough ones are stops
+        change = np.ones(n, dtype=bool)
+        change[1:] = (journey[1:] != journey[:-1]) | (stationary[1:] != stationary[:-1])
+        run_starts = np.flatnonzero(change)
+        run_lengths = np.diff(np.append(run_starts, n))
+        run_duration = np.add.reduceat(dt, run_starts)
+        is_stop = stationary[run_starts] & (run_duration >= self.min_stop)
+        stop_starts = run_starts[is_stop]
+        stop_section = section[stop_starts + run_lengths[is_stop] // 2]
+        stop_journey = journey[stop_starts]
+        stop_minutes = run_duration[is_stop] / 60.0
+
+        # Sections walked through (runs of one section label), for pass-through counts
+        section_change = np.ones(n, dtype=bool)
+        section_change[1:] = (journey[1:] != journey[:-1]) | (section[1:] != section[:-1])
+        visit_journey = journey[section_change]
+        visit_section = section[section_change]
+
+        journey_starts = np.flatnonzero(np.concatenate([[True], journey[1:] != journey[:-1]]))
+        journey_ends = np.append(journey_starts[1:], n) - 1
+        stop_bounds = np.searchsorted(stop_journey, np.arange(len(journey_names) + 1))
+        visit_bounds = np.searchsorted(visit_journey, np.arange(len(journey_names) + 1))
+        records = []
+        for first, last in zip(journey_starts, journey_ends):
+            code = journey[first]
+            stops = slice(stop_bounds[code], stop_bounds[code + 1])
+            visits = visit_section[visit_bounds[code]:visit_bounds[code + 1]]
+            records.append(self._record(journey_names[code], section[first], section[last],
+                                        stop_section[stops], stop_minutes[stops], visits,
+                                        t[last] - t[first]))
+        self.journeys_emitted += len(records)
+        return records
+
+    def _record(self, journey_id, entry, exit, stop_sections, stop_minutes, visits, duration) -> Dict[str, Any]:
+        """One journey in simulate_journey's shape: path of stops (plus entry/exit), dwell minutes, skipped"""
+        names = self.sections
+        path_ids = [entry] + stop_sections.tolist() + [exit]
+        path = []
+        for sid in path_ids:
+            if sid == UNASSIGNED:
+                continue
+            if not path or path[-1] != names[sid]:
+                path.append(names[sid])
+        dwell_time: Dict[str, int] = {}
+        for sid, minutes in zip(stop_sections.tolist(), stop_minutes.tolist()):
+            if sid != UNASSIGNED:
+                dwell_time[names[sid]] = dwell_time.get(names[sid], 0) + minutes
+        dwell_time = {s: max(1, int(round(m))) for s, m in dwell_time.items()}
+        visited = set(path)
+        walked = [names[sid] for sid in dict.fromkeys(visits.tolist()) if sid != UNASSIGNED]
+        if not dwell_time and path:
+            logging.debug(f"Observed journey {journey_id} has no stops")
+        return {
+            "path": path,
+            "dwell_time": dwell_time,
+            "skipped": [s for s in names if s not in visited],
+            "pass_through": [s for s in walked if s not in visited],
+            "persona": self.persona,
+            "preferences": {},
+            "store_id": self.store_id,
+            "journey_id": str(journey_id),
+            "observed": True,
+            "duration_minutes": float(duration) / 60.0,
+        }
+
+
+def ingest_trajectories(path: str, state, fmt: str = None, columns: Dict[str, str] = None,
+                        chunk_points: int = DEFAULT_CHUNK_POINTS, **options) -> Iterator[Dict[str, Any]]:
+    """Stream journey records from a CSV/JSONL position log (options go to TrajectoryIngestor)"""
+    ingestor = TrajectoryIngestor(state, **options)
+    return ingestor.ingest(read_trajectory_chunks(path, fmt=fmt, columns=columns, chunk_points=chunk_points))
@@ -0,0 +1,175 @@
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from simulation.journey_store import JourneyStore, FLAG_DELETED
+
+# Bitmaps are np.packbits arrays (little bit order) with one bit per stored journey.
+# Compound filters AND/OR the packed bytes directly, so a filter over 10M journeys
+# touches ~1.25 MB per predicate instead of 10M Python objects.
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bitmap: np.ndarray) -> int:
+    """Number of set bits in a packed bitmap"""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bitmap).sum(dtype=np.int64))
+    return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+def _pack(column: np.ndarray) -> np.ndarray:
+    return np.packbits(column, bitorder="little")
+
+
+class JourneyIndex:
+    """
+    Per-value bitmap indexes over a JourneyStore for interactive filtering
+    """
+
+    def __init__(self, store: JourneyStore):
+        self.store = store
+        self.count = 0
+        self.generation = None
+        self.live = np.zeros(0, dtype=np.uint8)
+        self.persona_bitmaps = {p: np.zeros(0, dtype=np.uint8) for p in store.personas}
+        self.budget_bitmaps = {b: np.zeros(0, dtype=np.uint8) for b in range(1, 6)}
+        self.preference_bitmaps = {p: np.zeros(0, dtype=np.uint8) for p in store.preferences}
+        self.visited_bitmaps = {s: np.zeros(0, dtype=np.uint8) for s in store.sections}
+        # Contiguous copies of the aggregated columns, so masked means don't stride over records
+        self.total_time = np.zeros(0, dtype=np.uint16)
+        self.path_len = np.zeros(0, dtype=np.uint8)
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Index journeys appended since the last refresh and re-read deletions; returns
+        how many journeys were added. A compaction (new store generation) re-indexes everything.
+        """
+        generation = self.store.generation()
+        records = self.store.records()
+        total = len(records)
+        if generation != self.generation or total < self.count:
+            # The store was compacted underneath us, so record positions changed
+            self.count = 0
+            self.generation = generation
+        if total == self.count:
+            # Tombstones are set in place, so the live bitmap is always re-packed from the flags
+            self.live = _pack((records["flags"] & FLAG_DELETED) == 0)
+            return 0
+        # Re-pack from the last byte boundary so a partially filled trailing byte is completed
+        start = (self.count // 8) * 8
+        tail = records[start:total]
+        byte_start = start // 8
+
+        def extend(bitmap: np.ndarray, column: np.ndarray) -> np.ndarray:
+            return np.concatenate([bitmap[:byte_start], _pack(column)])
+
+        self.live = _pack((records["flags"] & FLAG_DELETED) == 0)
+        personas = np.asarray(tail["persona"])
+        for i, name in enumerate(self.store.personas):
+            self.persona_bitmaps[name] = extend(self.persona_bitmaps[name], personas == i)
+        budgets = np.asarray(tail["budget"])
+        for level in self.budget_bitmaps:
+            self.budget_bitmaps[level] = extend(self.budget_bitmaps[level], budgets == level)
+        prefs = np.asarray(tail["preferences"])
+        for i, name in enumerate(self.store.preferences):
+            self.preference_bitmaps[name] = extend(self.preference_bitmaps[name], (prefs & (1 << i)) != 0)
+        dwell = np.asarray(tail["dwell"])
+        for i, name in enumerate(self.store.sections):
+            self.visited_bitmaps[name] = extend(self.visited_bitmaps[name], dwell[:, i] > 0)
+        self.total_time = np.concatenate([self.total_time[:start], tail["total_time"]])
+        self.path_len = np.concatenate([self.path_len[:start], tail["path_len"]])
+        added = total - self.count
+        self.count = total
+        return added
+
+    def _any_of(self, bitmaps: Dict, values) -> np.ndarray:
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        result = np.zeros_like(self.live)
+        for value in values:
+            if value not in bitmaps:
+                raise ValueError(f"Unknown filter value: {value}")
+            result |= bitmaps[value]
+        return result
+
+    def query(self, filters: Dict[str, Any] = None) -> np.ndarray:
+        """
+        Evaluate a compound filter to a packed bitmap of matching journeys.
+
+        filters keys (all optional, ANDed together):
+            persona: name or list of names (ORed)
+            budget: level or list of levels (ORed)
+            preferences: {flag_name: bool}
+            visited / not_visited: list of section names
+        """
+        filters = filters or {}
+        result = self.live.copy()
+        if filters.get("persona"):
+            result &= self._any_of(self.persona_bitmaps, filters["persona"])
+        if filters.get("budget"):
+            result &= self._any_of(self.budget_bitmaps, filters["budget"])
+        for name, wanted in filters.get("preferences", {}).items():
+            bitmap = self.preference_bitmaps[name]
+            result &= bitmap if wanted else ~bitmap
+        for section in filters.get("visited", []):
+            result &= self.visited_bitmaps[section]
+        for section in filters.get("not_visited", []):
+            result &= ~self.visited_bitmaps[section]
+        # Clear padding bits past the last journey (they can be set by the negations above)
+        if self.count % 8:
+            result[-1] &= (1 << (self.count % 8)) - 1
+        return result
+
+    def to_indices(self, bitmap: np.ndarray) -> np.ndarray:
+        """Record positions of the set bits in a packed bitmap"""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.count, bitorder="little"))
+
+    def aggregate(self, filters: Dict[str, Any] = None, top_n: int = 5) -> Dict[str, Any]:
+        """Summary statistics over the journeys matching filters"""
+        bitmap = self.query(filters)
+        matched = popcount(bitmap)
+        summary = {
+            "count": matched,
+            "total_journeys": popcount(self.live),
+            "average_total_time": 0.0,
+            "average_sections": 0.0,
+            "section_visit_rates": {},
+            "top_sections": [],
+        }
+        if matched == 0:
+            return summary
+        mask = np.unpackbits(bitmap, count=self.count, bitorder="little").view(bool)
+        summary["average_total_time"] = float(self.total_time[mask].mean())
+        summary["average_sections"] = float(self.path_len[mask].mean())
+        rates = {section: popcount(bitmap & visited) / matched
+                 for section, visited in self.visited_bitmaps.items()}
+        summary["section_visit_rates"] = rates
+        summary["top_sections"] = sorted(rates, key=rates.get, reverse=True)[:top_n]
+        return summary
+
+
+def filter_results(all_results: List[Dict[str, Any]], filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Plain-Python equivalent of JourneyIndex.query for small in-memory result lists"""
+    filters = filters or {}
+
+    def as_list(value):
+        return value if isinstance(value, (list, tuple, set)) else [value]
+
+    matched = []
+    for r in all_results:
+        if filters.get("persona") and r.get("persona") not in as_list(filters["persona"]):
+            continue
+        if filters.get("budget") and r.get("budget_sensitivity") not in as_list(filters["budget"]):
+            continue
+        prefs = r.get("preferences", {})
+        if any(bool(prefs.get(k, False)) != v for k, v in filters.get("preferences", {}).items()):
+            continue
+        visited = set(r.get("path", []))
+        if any(s not in visited for s in filters.get("visited", [])):
+            continue
+        if any(s in visited for s in filters.get("not_visited", [])):
+            continue
+        matched.append(r)
+    return matched
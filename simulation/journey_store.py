@@ -0,0 +1,272 @@
+import json
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterable, Optional
+
+import numpy as np
+
+from simulation.travel import journey_total_time
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked appends
+    fcntl = None
+
+# On-disk journey store: a fixed-size header followed by fixed-size binary records.
+#
+# Header layout (HEADER_SIZE bytes):
+#   8s  magic            b"SHOPTWJS"
+#   u2  schema version
+#   u2  generation       bumped by compact(), so readers can tell record positions changed
+#   u4  record size in bytes
+#   u4  length of the JSON vocabulary block that follows
+#   ... JSON {"sections": [...], "personas": [...], "preferences": [...], "max_path": N}
+#   zero padding up to HEADER_SIZE
+#
+# Records are numpy structured rows (see record_dtype), so readers can np.memmap the
+# whole file and scan columns without building Python dicts.
+
+MAGIC = b"SHOPTWJS"
+SCHEMA_VERSION = 1
+HEADER_SIZE = 16384
+MAX_PATH = 64
+PAD_ID = 255
+
+DEFAULT_PREFERENCES = ["eco_preference", "time_constraint", "health_focus", "convenience_priority"]
+
+FLAG_DELETED = 1
+_HEADER_FIXED = [("magic", "S8"), ("version", "<u2"), ("generation", "<u2"),
+                 ("record_size", "<u4"), ("vocab_len", "<u4")]
+_GENERATION_OFFSET = 10
+
+
+def record_dtype(n_sections: int, max_path: int = MAX_PATH) -> np.dtype:
+    """Structured dtype of one journey record for a store with n_sections sections"""
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("persona", "u1"),
+        ("budget", "u1"),
+        ("preferences", "u1"),   # bitmask over the header's preference list
+        ("flags", "u1"),         # FLAG_DELETED marks a tombstone removed on compaction
+        ("path_len", "u1"),
+        ("skipped_count", "u1"),
+        ("total_time", "<u2"),
+        ("path", "u1", (max_path,)),         # section ids in visit order, PAD_ID padded
+        ("dwell", "<u2", (n_sections,)),     # minutes per section id, 0 = not visited
+    ])
+
+
+class JourneyStore:
+    """
+    Append-only binary store of simulated journeys with memory-mapped reads
+    """
+
+    def __init__(self, path: str, sections: List[str] = None, personas: List[str] = None,
+                 preferences: List[str] = None, max_path: int = MAX_PATH):
+        self.path = path
+        self.lock_path = path + ".lock"
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._read_header()
+        else:
+            if not sections or not personas:
+                raise ValueError("sections and personas are required to create a new journey store")
+            self.sections = list(sections)
+            self.personas = list(personas)
+            self.preferences = list(preferences or DEFAULT_PREFERENCES)
+            self.max_path = max_path
+            if len(self.sections) >= PAD_ID or len(self.personas) > 255 or len(self.preferences) > 8:
+                raise ValueError("Vocabulary too large for the journey record format")
+            self.dtype = record_dtype(len(self.sections), self.max_path)
+            self._write_new_file(self.path)
+        self.section_ids = {name: i for i, name in enumerate(self.sections)}
+        self.persona_ids = {name: i for i, name in enumerate(self.personas)}
+
+    def _header_bytes(self, generation: int = 0) -> bytes:
+        vocab = json.dumps({
+            "sections": self.sections,
+            "personas": self.personas,
+            "preferences": self.preferences,
+            "max_path": self.max_path,
+        }).encode("utf-8")
+        fixed = np.array([(MAGIC, SCHEMA_VERSION, generation, self.dtype.itemsize, len(vocab))],
+                         dtype=_HEADER_FIXED).tobytes()
+        header = fixed + vocab
+        if len(header) > HEADER_SIZE:
+            raise ValueError("Journey store vocabulary does not fit in the header")
+        return header + b"\0" * (HEADER_SIZE - len(header))
+
+    def _write_new_file(self, path: str, generation: int = 0):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self._header_bytes(generation))
+
+    def _read_header(self):
+        with open(self.path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+            raise ValueError(f"Not a journey store file: {self.path}")
+        fixed = np.frombuffer(raw[:20], dtype=_HEADER_FIXED)[0]
+        version = int(fixed["version"])
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported journey store schema version {version} "
+                             f"(expected {SCHEMA_VERSION}): {self.path}")
+        vocab = json.loads(raw[20:20 + int(fixed["vocab_len"])].decode("utf-8"))
+        self.sections = vocab["sections"]
+        self.personas = vocab["personas"]
+        self.preferences = vocab["preferences"]
+        self.max_path = vocab["max_path"]
+        self.dtype = record_dtype(len(self.sections), self.max_path)
+        if self.dtype.itemsize != int(fixed["record_size"]):
+            raise ValueError(f"Record size mismatch in journey store header: {self.path}")
+
+    @contextmanager
+    def _lock(self, exclusive: bool):
+        """Appenders share the lock; compaction and deletes take it exclusively"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def encode(self, results: Dict[str, Any], timestamp: float = None) -> np.ndarray:
+        """Convert one simulate_journey result into a single structured record"""
+        rec = np.zeros(1, dtype=self.dtype)
+        rec["timestamp"] = time.time() if timestamp is None else timestamp
+        persona = results.get("persona", "")
+        if persona not in self.persona_ids:
+            raise ValueError(f"Unknown persona for journey store: {persona}")
+        rec["persona"] = self.persona_ids[persona]
+        rec["budget"] = results.get("budget_sensitivity", 3)
+        prefs = results.get("preferences", {})
+        rec["preferences"] = sum(1 << i for i, name in enumerate(self.preferences) if prefs.get(name, False))
+        path_ids = [self.section_ids[s] for s in results.get("path", []) if s in self.section_ids]
+        if len(path_ids) > self.max_path:
+            logging.warning(f"Journey path of {len(path_ids)} sections truncated to {self.max_path}")
+            path_ids = path_ids[:self.max_path]
+        rec["path"][0, :] = PAD_ID
+        rec["path"][0, :len(path_ids)] = path_ids
+        rec["path_len"] = len(path_ids)
+        for section, minutes in results.get("dwell_time", {}).items():
+            if section in self.section_ids:
+                rec["dwell"][0, self.section_ids[section]] = minutes
+        rec["total_time"] = min(int(round(journey_total_time(results))), 65535)
+        rec["skipped_count"] = min(len(results.get("skipped", [])), 255)
+        return rec
+
+    def append(self, results: Dict[str, Any], timestamp: float = None) -> None:
+        """Append one journey result"""
+        self.append_records(self.encode(results, timestamp))
+
+    def append_many(self, results_list: Iterable[Dict[str, Any]]) -> None:
+        """Append a batch of journey results with a single write"""
+        records = [self.encode(r) for r in results_list]
+        if records:
+            self.append_records(np.concatenate(records))
+
+    def append_records(self, records: np.ndarray) -> None:
+        """Append pre-encoded records; each call is one O_APPEND write so concurrent writers never interleave"""
+        data = np.ascontiguousarray(records, dtype=self.dtype).tobytes()
+        with self._lock(exclusive=False):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                written = 0
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+            finally:
+                os.close(fd)
+
+    def generation(self) -> int:
+        """Header counter that changes whenever compaction rewrites the file"""
+        with open(self.path, "rb") as f:
+            f.seek(_GENERATION_OFFSET)
+            return int(np.frombuffer(f.read(2), dtype="<u2")[0])
+
+    def delete(self, indices) -> None:
+        """Tombstone records in place; they are dropped by the next compact()"""
+        with self._lock(exclusive=True):
+            records = self._map("r+")
+            if records is not None:
+                records["flags"][np.asarray(indices)] |= FLAG_DELETED
+                records.flush()
+
+    def _map(self, mode: str = "r") -> Optional[np.memmap]:
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+        if count <= 0:
+            return None
+        # Trailing bytes of a record still being written are excluded by the floor division
+        return np.memmap(self.path, dtype=self.dtype, mode=mode, offset=HEADER_SIZE, shape=(count,))
+
+    def records(self) -> np.ndarray:
+        """Zero-copy read-only view of all records (tombstones included)"""
+        records = self._map("r")
+        return records if records is not None else np.zeros(0, dtype=self.dtype)
+
+    def live_mask(self, records: np.ndarray = None) -> np.ndarray:
+        if records is None:
+            records = self.records()
+        return (records["flags"] & FLAG_DELETED) == 0
+
+    def __len__(self) -> int:
+        return max(0, (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize)
+
+    def decode(self, record) -> Dict[str, Any]:
+        """Convert one record back into the simulate_journey result shape"""
+        path = [self.sections[i] for i in record["path"][:int(record["path_len"])]]
+        dwell = record["dwell"]
+        dwell_time = {s: int(dwell[self.section_ids[s]]) for s in dict.fromkeys(path)}
+        visited = set(path)
+        prefs = int(record["preferences"])
+        total_time = int(record["total_time"])
+        # Walking is not stored; it is the trip time not spent dwelling in path sections
+        walk_time = max(0, total_time - sum(dwell_time.values()))
+        return {
+            "path": path,
+            "dwell_time": dwell_time,
+            "skipped": [s for s in self.sections if s not in visited],
+            "persona": self.personas[int(record["persona"])],
+            "budget_sensitivity": int(record["budget"]),
+            "preferences": {name: bool(prefs & (1 << i)) for i, name in enumerate(self.preferences)},
+            "total_time": total_time,
+            "walk_time": walk_time,
+            "timestamp": float(record["timestamp"]),
+        }
+
+    def recent_results(self, limit: int = 500) -> List[Dict[str, Any]]:
+        """Decode the most recent live journeys, e.g. as all_results for generate_insights"""
+        records = self.records()
+        live = np.flatnonzero(self.live_mask(records))[-limit:]
+        return [self.decode(records[i]) for i in live]
+
+    def compact(self, max_records: int = None, older_than: float = None) -> int:
+        """
+        Rewrite the store without tombstones, optionally keeping only the newest
+        max_records and dropping journeys recorded before the older_than timestamp.
+        Returns the number of records removed.
+        """
+        with self._lock(exclusive=True):
+            records = self.records()
+            keep = self.live_mask(records)
+            if older_than is not None:
+                keep &= records["timestamp"] >= older_than
+            kept = np.flatnonzero(keep)
+            if max_records is not None:
+                kept = kept[-max_records:] if max_records > 0 else kept[:0]
+            tmp_path = self.path + ".compact"
+            self._write_new_file(tmp_path, generation=(self.generation() + 1) % 65536)
+            with open(tmp_path, "ab") as f:
+                # Copy in chunks so compaction of a huge store stays bounded in memory
+                for start in range(0, len(kept), 65536):
+                    f.write(np.ascontiguousarray(records[kept[start:start + 65536]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            removed = len(records) - len(kept)
+            del records
+            # Existing memmaps keep reading the old inode, so readers see a consistent snapshot
+            os.replace(tmp_path, self.path)
+        return removed
@@ -0,0 +1,394 @@
+import logging
+import math
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # optional: routing falls back to the pure-Python implementations
+    numba = None
+
+# Compiled routing kernels. Each kernel mirrors a pure-Python implementation in
+# pathfinding_cv / section_map step for step (same move order, same LIFO buckets,
+# same heapq sift rules and tie-breaking), so both backends return identical paths.
+# With numba installed the kernels are JIT-compiled with cache=True: machine code is
+# written next to this module (or to NUMBA_CACHE_DIR) and reused on later startups.
+#
+# Backend selection: SHOPTWIN_KERNELS=auto (default) | numba | python
+
+BACKENDS = ("python", "numba")
+
+
+def _select_backend() -> str:
+    requested = os.environ.get("SHOPTWIN_KERNELS", "auto").lower()
+    if requested == "python":
+        return "python"
+    if numba is None:
+        if requested == "numba":
+            logging.warning("SHOPTWIN_KERNELS=numba but numba is not installed; using Python kernels")
+        return "python"
+    return "numba"
+
+
+BACKEND = _select_backend()
+
+
+def _jit(fn):
+    return numba.njit(cache=True, nogil=True)(fn) if numba is not None else fn
+
+
+def use_compiled(backend: Optional[str] = None) -> bool:
+    """Whether a call should go to the compiled kernels (backend=None means the auto-selected one)"""
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend {backend!r}; expected one of {BACKENDS}")
+    return backend == "numba" and numba is not None
+
+
+# 8-connected (dy, dx) moves in the order dial_shortest_path and walking_voronoi scan them
+_MOVE_DY = np.array([-1, 1, 0, 0, -1, 1, -1, 1], dtype=np.int64)
+_MOVE_DX = np.array([0, 0, -1, 1, -1, 1, 1, -1], dtype=np.int64)
+
+
+@_jit
+def _grow(arr):
+    out = np.empty(arr.shape[0] * 2, dtype=arr.dtype)
+    out[:arr.shape[0]] = arr
+    return out
+
+
+@_jit
+def _trace(parent, node):
+    n = 0
+    cur = node
+    while cur != -1:
+        n += 1
+        cur = parent[cur]
+    path = np.empty(n, dtype=np.int64)
+    cur = node
+    for i in range(n - 1, -1, -1):
+        path[i] = cur
+        cur = parent[cur]
+    return path
+
+
+@_jit
+def _dial_kernel(costs, h, w, src, dst, move_dy, move_dx):
+    size = h * w
+    n_buckets = int(costs.max()) + 1
+    INF = 1 << 30
+    dist = np.full(size, INF, dtype=np.int64)
+    parent = np.full(size, -1, dtype=np.int64)
+    deltas = move_dy * w + move_dx
+    # Buckets are LIFO stacks kept as linked lists in flat arrays (like list.append/pop)
+    heads = np.full(n_buckets, -1, dtype=np.int64)
+    node_val = np.empty(1024, dtype=np.int64)
+    node_next = np.empty(1024, dtype=np.int64)
+    dist[src] = 0
+    node_val[0] = src
+    node_next[0] = -1
+    heads[0] = 0
+    n_nodes = 1
+    pending = 1
+    d = 0
+    while pending:
+        b = d % n_buckets
+        while heads[b] != -1:
+            node = heads[b]
+            cur = node_val[node]
+            heads[b] = node_next[node]
+            pending -= 1
+            if dist[cur] != d:
+                continue
+            if cur == dst:
+                return _trace(parent, cur)
+            cx = cur % w
+            for k in range(8):
+                nxt = cur + deltas[k]
+                if nxt < 0 or nxt >= size:
+                    continue
+                nx = cx + move_dx[k]
+                if nx < 0 or nx >= w:
+                    continue
+                c = costs[nxt]
+                if c == 0:
+                    continue
+                nd = d + c
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    parent[nxt] = cur
+                    if n_nodes == node_val.shape[0]:
+                        node_val = _grow(node_val)
+                        node_next = _grow(node_next)
+                    bb = nd % n_buckets
+                    node_val[n_nodes] = nxt
+                    node_next[n_nodes] = heads[bb]
+                    heads[bb] = n_nodes
+                    n_nodes += 1
+                    pending += 1
+        d += 1
+    return np.empty(0, dtype=np.int64)
+
+
+@_jit
+def _voronoi_kernel(walkable, h, w, seed_idx, orth_step, diag_step, move_dy, move_dx):
+    size = h * w
+    INF = 1 << 30
+    dist = np.full(size, INF, dtype=np.int64)
+    label = np.full(size, -1, dtype=np.int64)
+    deltas = move_dy * w + move_dx
+    steps = np.empty(8, dtype=np.int64)
+    for k in range(8):
+        steps[k] = orth_step if move_dy[k] == 0 or move_dx[k] == 0 else diag_step
+    n_buckets = diag_step + 1
+    heads = np.full(n_buckets, -1, dtype=np.int64)
+    node_val = np.empty(max(1024, 2 * seed_idx.shape[0]), dtype=np.int64)
+    node_next = np.empty(node_val.shape[0], dtype=np.int64)
+    n_nodes = 0
+    pending = 0
+    for i in range(seed_idx.shape[0]):
+        idx = seed_idx[i]
+        if 0 <= idx < size and walkable[idx] and dist[idx] != 0:
+            dist[idx] = 0
+            label[idx] = i
+            node_val[n_nodes] = idx
+            node_next[n_nodes] = heads[0]
+            heads[0] = n_nodes
+            n_nodes += 1
+            pending += 1
+    d = 0
+    while pending:
+        b = d % n_buckets
+        while heads[b] != -1:
+            node = heads[b]
+            cur = node_val[node]
+            heads[b] = node_next[node]
+            pending -= 1
+            if dist[cur] != d:
+                continue
+            cx = cur % w
+            lab = label[cur]
+            for k in range(8):
+                nxt = cur + deltas[k]
+                if nxt < 0 or nxt >= size:
+                    continue
+                nx = cx + move_dx[k]
+                if nx < 0 or nx >= w or not walkable[nxt]:
+                    continue
+                nd = d + steps[k]
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    label[nxt] = lab
+                    if n_nodes == node_val.shape[0]:
+                        node_val = _grow(node_val)
+                        node_next = _grow(node_next)
+                    bb = nd % n_buckets
+                    node_val[n_nodes] = nxt
+                    node_next[n_nodes] = heads[bb]
+                    heads[bb] = n_nodes
+                    n_nodes += 1
+                    pending += 1
+        d += 1
+    return label, dist
+
+
+@_jit
+def _entry_less(a, b, e_f, e_g, e_node, e_parent):
+    """heapq's tuple order on (f, g, (y, x), path) for heap entries a and b"""
+    if e_f[a] != e_f[b]:
+        return e_f[a] < e_f[b]
+    if e_g[a] != e_g[b]:
+        return e_g[a] < e_g[b]
+    if e_node[a] != e_node[b]:
+        # (y, x) tuples order like flat indices
+        return e_node[a] < e_node[b]
+    # Same pixel at the same cost: Python falls back to comparing the path lists
+    pa = _trace(e_parent, a)
+    pb = _trace(e_parent, b)
+    for i in range(min(pa.shape[0], pb.shape[0])):
+        if e_node[pa[i]] != e_node[pb[i]]:
+            return e_node[pa[i]] < e_node[pb[i]]
+    return pa.shape[0] < pb.shape[0]
+
+
+@_jit
+def _sift_down(heap, startpos, pos, e_f, e_g, e_node, e_parent):
+    newitem = heap[pos]
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        parent = heap[parentpos]
+        if _entry_less(newitem, parent, e_f, e_g, e_node, e_parent):
+            heap[pos] = parent
+            pos = parentpos
+            continue
+        break
+    heap[pos] = newitem
+
+
+@_jit
+def _sift_up(heap, pos, endpos, e_f, e_g, e_node, e_parent):
+    startpos = pos
+    newitem = heap[pos]
+    childpos = 2 * pos + 1
+    while childpos < endpos:
+        rightpos = childpos + 1
+        if rightpos < endpos and not _entry_less(heap[childpos], heap[rightpos], e_f, e_g, e_node, e_parent):
+            childpos = rightpos
+        heap[pos] = heap[childpos]
+        pos = childpos
+        childpos = 2 * pos + 1
+    heap[pos] = newitem
+    _sift_down(heap, startpos, pos, e_f, e_g, e_node, e_parent)
+
+
+@_jit
+def _astar_kernel(costs, h, w, src, dst, move_dy, move_dx):
+    gy = dst // w
+    gx = dst % w
+    cap = 1024
+    # Heap entries: f, g, pixel and the entry it was expanded from (its path is the parent chain)
+    e_f = np.empty(cap, dtype=np.float64)
+    e_g = np.empty(cap, dtype=np.int64)
+    e_node = np.empty(cap, dtype=np.int64)
+    e_parent = np.empty(cap, dtype=np.int64)
+    heap = np.empty(cap, dtype=np.int64)
+    visited = np.zeros(h * w, dtype=np.bool_)
+    sy = src // w
+    sx = src % w
+    e_f[0] = 0 + math.sqrt(float((sy - gy) ** 2 + (sx - gx) ** 2))
+    e_g[0] = 0
+    e_node[0] = src
+    e_parent[0] = -1
+    heap[0] = 0
+    n_entries = 1
+    n_heap = 1
+    while n_heap:
+        # heappop
+        n_heap -= 1
+        last = heap[n_heap]
+        if n_heap:
+            entry = heap[0]
+            heap[0] = last
+            _sift_up(heap, 0, n_heap, e_f, e_g, e_node, e_parent)
+        else:
+            entry = last
+        current = e_node[entry]
+        if current == dst:
+            return e_node[_trace(e_parent, entry)]
+        if visited[current]:
+            continue
+        visited[current] = True
+        cy = current // w
+        cx = current % w
+        cost = e_g[entry]
+        for k in range(8):
+            ny = cy + move_dy[k]
+            nx = cx + move_dx[k]
+            if 0 <= ny < h and 0 <= nx < w and costs[ny * w + nx] > 0:
+                g = cost + costs[ny * w + nx]
+                if n_entries == e_f.shape[0]:
+                    e_f = _grow(e_f)
+                    e_g = _grow(e_g)
+                    e_node = _grow(e_node)
+                    e_parent = _grow(e_parent)
+                if n_heap == heap.shape[0]:
+                    heap = _grow(heap)
+                e_f[n_entries] = g + math.sqrt(float((ny - gy) ** 2 + (nx - gx) ** 2))
+                e_g[n_entries] = g
+                e_node[n_entries] = ny * w + nx
+                e_parent[n_entries] = entry
+                # heappush
+                heap[n_heap] = n_entries
+                n_heap += 1
+                _sift_down(heap, 0, n_heap - 1, e_f, e_g, e_node, e_parent)
+                n_entries += 1
+    return np.empty(0, dtype=np.int64)
+
+
+@_jit
+def _snap_kernel(walkable, h, w, y, x, max_radius):
+    """(y, x, status): status 0 on the aisle, 1 found within max_radius, 2 global fallback, 3 no walkable pixel"""
+    y = min(max(y, 0), h - 1)
+    x = min(max(x, 0), w - 1)
+    if walkable[y, x]:
+        return y, x, 0
+    for r in range(1, max_radius + 1):
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                ny = y + dy
+                nx = x + dx
+                if 0 <= ny < h and 0 <= nx < w and walkable[ny, nx]:
+                    return ny, nx, 1
+    best = -1
+    by = y
+    bx = x
+    for ny in range(h):
+        for nx in range(w):
+            if walkable[ny, nx]:
+                d2 = (ny - y) ** 2 + (nx - x) ** 2
+                if best < 0 or d2 < best:
+                    best = d2
+                    by = ny
+                    bx = nx
+    if best < 0:
+        return y, x, 3
+    return by, bx, 2
+
+
+def _to_points(flat: np.ndarray, w: int) -> Optional[List[Tuple[int, int]]]:
+    if flat.shape[0] == 0:
+        return None
+    return list(zip((flat // w).tolist(), (flat % w).tolist()))
+
+
+def dial_path(grid: np.ndarray, start, goal) -> Optional[List[Tuple[int, int]]]:
+    """Compiled dial_shortest_path; None if the goal is unreachable"""
+    h, w = grid.shape
+    costs = np.ascontiguousarray(grid, dtype=np.uint8).ravel()
+    flat = _dial_kernel(costs, h, w, int(start[0]) * w + int(start[1]), int(goal[0]) * w + int(goal[1]),
+                        _MOVE_DY, _MOVE_DX)
+    return _to_points(flat, w)
+
+
+def astar_path(grid: np.ndarray, start, goal) -> Optional[List[Tuple[int, int]]]:
+    """Compiled astar; None if the goal is unreachable"""
+    h, w = grid.shape
+    costs = np.ascontiguousarray(grid, dtype=np.uint8).ravel()
+    # A* scans neighbours as (dx, dy) pairs: (-1,0),(1,0),(0,-1),(0,1),(-1,-1),(1,1),(-1,1),(1,-1)
+    move_dx = np.array([-1, 1, 0, 0, -1, 1, -1, 1], dtype=np.int64)
+    move_dy = np.array([0, 0, -1, 1, -1, 1, 1, -1], dtype=np.int64)
+    flat = _astar_kernel(costs, h, w, int(start[0]) * w + int(start[1]), int(goal[0]) * w + int(goal[1]),
+                         move_dy, move_dx)
+    return _to_points(flat, w)
+
+
+def voronoi_labels(grid: np.ndarray, seeds, orth_step: int, diag_step: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Compiled multi-source walking-distance search; same outputs as section_map.walking_voronoi"""
+    h, w = grid.shape
+    walkable = np.ascontiguousarray(grid > 0).ravel()
+    seed_idx = np.array([int(y) * w + int(x) for y, x in seeds], dtype=np.int64)
+    label, dist = _voronoi_kernel(walkable, h, w, seed_idx, orth_step, diag_step, _MOVE_DY, _MOVE_DX)
+    labels = label.astype(np.int16).reshape(h, w)
+    dist_img = dist.astype(np.int32).reshape(h, w)
+    dist_img[labels == -1] = -1
+    return labels, dist_img
+
+
+def snap_point(grid: np.ndarray, point, max_radius: int) -> Tuple[int, int, int]:
+    """Compiled snap_to_aisle search; returns (y, x, status) so the caller can log fallbacks"""
+    h, w = grid.shape
+    y, x, status = _snap_kernel(np.ascontiguousarray(grid > 0), h, w, int(point[0]), int(point[1]), max_radius)
+    return int(y), int(x), int(status)
+
+
+def warmup():
+    """Compile (or load from the on-disk cache) every kernel on a tiny grid"""
+    if numba is None:
+        return
+    grid = np.ones((4, 4), dtype=np.uint8)
+    dial_path(grid, (0, 0), (3, 3))
+    astar_path(grid, (0, 0), (3, 3))
+    voronoi_labels(grid, [(0, 0), (3, 3)], 2, 3)
+    snap_point(grid, (1, 1), 2)
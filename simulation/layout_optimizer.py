@@ -0,0 +1,271 @@
+import copy
+import heapq
+import math
+import random
+import time
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+from simulation.batch import random_preferences
+from simulation.logic import CustomerSimulator
+from simulation.summary import SPECIAL_TYPES
+from simulation.travel import TravelModel
+
+# What-if layout search. Every section's current position is a slot; a candidate
+# layout assigns sections to slots (entrances, exits, checkouts and pinned sections
+# stay put). Simulated paths do not depend on section coordinates, so a population
+# simulated once is reused for every layout: it reduces to leg counts W[a, b]
+# between sections, and a layout's walking total is sum W[a, b] * D[slot a, slot b]
+# over the precomputed slot-to-slot walking matrix D. Exposure of target sections
+# (legs that pass a target's slot without visiting it) has the same form with one
+# layer per target. A swap of two sections only changes the terms in their rows and
+# columns, so it is scored in O(layers * sections) without re-simulating or re-routing.
+
+DEFAULT_POPULATION = 2000
+# A slot counts as passed on a leg when stopping there costs at most this detour (meters)
+EXPOSURE_DETOUR_M = 5.0
+
+
+def passes_slot(distances: np.ndarray, detour: float = EXPOSURE_DETOUR_M) -> np.ndarray:
+    """passes[i, j, k]: slot k lies within `detour` meters of the shortest walk from slot i to slot j"""
+    via = distances[:, None, :] + distances.T[None, :, :]  # D[i, k] + D[k, j] at [i, j, k]
+    passes = via <= distances[:, :, None] + detour
+    idx = np.arange(len(distances))
+    passes[idx, :, idx] = False
+    passes[:, idx, idx] = False
+    return passes
+
+
+def simulate_population(simulator: CustomerSimulator, n: int, persona_mix: Dict[str, float] = None,
+                        seed: int = 0) -> List[Dict[str, Any]]:
+    """n journeys with personas drawn from persona_mix (weights; default: uniform)"""
+    persona_mix = persona_mix or {p: 1.0 for p in simulator.persona_data}
+    personas, weights = list(persona_mix), list(persona_mix.values())
+    rng = random.Random(seed)
+    saved_rng, simulator.rng = simulator.rng, random.Random(seed + 1)
+    try:
+        return [simulator.simulate_journey(rng.choices(personas, weights)[0], rng.randint(1, 5),
+                                           random_preferences(rng))
+                for _ in range(n)]
+    finally:
+        simulator.rng = saved_rng
+
+
+def apply_layout(store_data: Dict[str, Any], assignment: Dict[str, str]) -> Dict[str, Any]:
+    """Copy of a store layout with each section moved to the position of its assigned slot section"""
+    layout = copy.deepcopy(store_data)
+    positions = {s['name']: s['position'] for s in store_data['sections']}
+    for section in layout['sections']:
+        slot = assignment.get(section['name'])
+        if slot is not None and slot != section['name']:
+            section['position'] = dict(positions[slot])
+    return layout
+
+
+class LayoutOptimizer:
+    """
+    Simulated annealing over section-to-slot assignments, scored against a fixed
+    simulated population. Lower scores are better: mean walking meters per journey,
+    minus exposure_weight meters for each target exposure per journey.
+    """
+
+    def __init__(self, simulator: CustomerSimulator, state=None, population: int = DEFAULT_POPULATION,
+                 persona_mix: Dict[str, float] = None, targets: List[str] = None, exposure_weight: float = 0.0,
+                 detour: float = EXPOSURE_DETOUR_M, pinned: List[str] = None, seed: int = 0,
+                 results: List[Dict[str, Any]] = None):
+        state = state or simulator.registry.get(simulator.store_id).state
+        self.state = state
+        self.travel = TravelModel(state)
+        self.sections = state.section_names
+        n = len(self.sections)
+        index = self.travel.index
+        special = {s['name'] for s in state.store_data['sections'] if s.get('type') in SPECIAL_TYPES}
+        pinned = set(pinned or [])
+        self.movable = [i for i, s in enumerate(self.sections) if s not in special and s not in pinned]
+        if len(self.movable) < 2:
+            raise ValueError("At least two movable sections are needed")
+        self.distances = self.travel.distances()
+
+        if results is None:
+            results = simulate_population(simulator, population, persona_mix, seed)
+        self.population = len(results)
+        self.targets = [index[t] for t in (targets or []) if t in index]
+        src, dst, journey = self.travel.legs(results)
+        visited = np.zeros((len(results), n), dtype=bool)
+        if len(src):
+            visited[journey, src] = True
+            visited[journey, dst] = True
+
+        # Layer 0 is walking; layer 1 + i is exposure of target i from journeys that skip it
+        layers = 1 + len(self.targets)
+        self.W = np.zeros((layers, n, n))
+        self.W[0] = np.bincount(src * n + dst, minlength=n * n).reshape(n, n)
+        for layer, t in enumerate(self.targets, start=1):
+            keep = ~visited[journey, t]
+            self.W[layer] = np.bincount(src[keep] * n + dst[keep], minlength=n * n).reshape(n, n)
+        self.coef = np.full(layers, -exposure_weight / max(self.population, 1))
+        self.coef[0] = 1.0 / max(self.population, 1)
+        self.passes = passes_slot(self.distances, detour).astype(np.float64) if self.targets else None
+
+        self.identity = np.arange(n)
+        self.baseline = self.layer_totals(self.identity)
+        self.swaps_evaluated = 0
+        self.elapsed = 0.0
+
+    def _matrices(self, p: np.ndarray) -> np.ndarray:
+        """Per-layer slot matrices for assignment p: walking distances, then each target's pass matrix"""
+        M = np.empty(self.W.shape)
+        M[0] = self.distances
+        for layer, t in enumerate(self.targets, start=1):
+            M[layer] = self.passes[:, :, p[t]]
+        return M
+
+    def layer_totals(self, p: np.ndarray, M: np.ndarray = None) -> np.ndarray:
+        """Full per-layer totals sum W[a, b] * M[slot a, slot b] (walking meters, exposures)"""
+        M = self._matrices(p) if M is None else M
+        return np.einsum('lab,lab->l', self.W, M[:, p][:, :, p])
+
+    def _touching(self, p: np.ndarray, M: np.ndarray, u: int, v: int) -> np.ndarray:
+        """Per-layer sum of the terms for legs that start or end at section u or v"""
+        W = self.W
+        total = np.zeros(len(W))
+        for a in (u, v):
+            total += np.einsum('lk,lk->l', W[:, a, :], M[:, p[a], :][:, p])
+            total += np.einsum('lk,lk->l', W[:, :, a], M[:, :, p[a]][:, p])
+        for a in (u, v):
+            for b in (u, v):
+                total -= W[:, a, b] * M[:, p[a], p[b]]
+        return total
+
+    def swap_delta(self, p: np.ndarray, M: np.ndarray, totals: np.ndarray, u: int, v: int):
+        """Per-layer change of swapping the slots of sections u and v: (delta, new p, new M)"""
+        q = p.copy()
+        q[u], q[v] = p[v], p[u]
+        delta = self._touching(q, M, u, v) - self._touching(p, M, u, v)
+        moved = [layer for layer, t in enumerate(self.targets, start=1) if t in (u, v)]
+        if moved:
+            # A moved target changes its whole pass matrix: rescore those layers in full
+            M = M.copy()
+            for layer in moved:
+                M[layer] = self.passes[:, :, q[self.targets[layer - 1]]]
+                delta[layer] = np.einsum('ab,ab->', self.W[layer], M[layer][q][:, q]) - totals[layer]
+        self.swaps_evaluated += 1
+        return delta, q, M
+
+    def score(self, totals: np.ndarray) -> float:
+        return float(self.coef @ totals)
+
+    def anneal(self, iterations: int = 20000, seed: int = 0, top: int = 10, start: np.ndarray = None,
+               max_moves: int = None, t_start: float = None, t_end: float = None) -> List[Tuple[float, np.ndarray]]:
+        """
+        One annealing run from start (default: current layout), keeping at most max_moves
+        sections away from their current slot; returns the best distinct (score, p), best first
+        """
+        rng = random.Random(seed)
+        started = time.perf_counter()
+        identity = self.identity
+        p = identity.copy() if start is None else np.array(start)
+        M = self._matrices(p)
+        totals = self.layer_totals(p, M)
+        current = self.score(totals)
+        displaced = int((p != identity).sum())
+        max_moves = len(p) if max_moves is None else max_moves
+        movable = self.movable
+        if t_start is None:
+            # Typical uphill step: accepted with probability ~1/e at the start
+            probes = [abs(self.coef @ self.swap_delta(p, M, totals, *rng.sample(movable, 2))[0]) for _ in range(100)]
+            t_start = float(np.median(probes)) or 1.0
+        t_end = t_end or t_start * 1e-3
+        cooling = (t_end / t_start) ** (1.0 / max(iterations - 1, 1))
+        temperature = t_start
+        best: List[Tuple[float, bytes, np.ndarray]] = []  # max-heap on score via negation
+        seen = set()
+
+        def remember(score, p):
+            key = p.tobytes()
+            if key in seen:
+                return
+            if len(best) < top:
+                heapq.heappush(best, (-score, key, p.copy()))
+                seen.add(key)
+            elif score < -best[0][0]:
+                _, dropped, _ = heapq.heappushpop(best, (-score, key, p.copy()))
+                seen.discard(dropped)
+                seen.add(key)
+
+        remember(current, p)
+        off = np.flatnonzero(p != identity).tolist()
+        evaluated = attempts = 0
+        # Swaps that would exceed max_moves are skipped without counting towards the schedule
+        while evaluated < iterations and attempts < 50 * iterations:
+            attempts += 1
+            if off and displaced + 2 > max_moves and rng.random() < 0.5:
+                # Near the move limit: rearrange sections that have already moved
+                u = rng.choice(off)
+                v = rng.choice(movable)
+                if u == v:
+                    continue
+            else:
+                u, v = rng.sample(movable, 2)
+            moved = displaced - (p[u] != u) - (p[v] != v) + (p[v] != u) + (p[u] != v)
+            if moved > max_moves:
+                continue
+            evaluated += 1
+            temperature *= cooling
+            delta, q, M2 = self.swap_delta(p, M, totals, u, v)
+            change = float(self.coef @ delta)
+            if change <= 0 or rng.random() < math.exp(-change / temperature):
+                p, M = q, M2
+                totals = totals + delta
+                current += change
+                displaced = int(moved)
+                off = np.flatnonzero(p != identity).tolist()
+                if len(best) < top or current < -best[0][0]:
+                    remember(current, p)
+        self.elapsed += time.perf_counter() - started
+        return sorted(((-s, p) for s, _, p in best), key=lambda c: c[0])
+
+    def optimize(self, iterations: int = 20000, restarts: int = 5, top: int = 10, max_moves: int = None,
+                 min_difference: int = 3, seed: int = 0) -> List[Dict[str, Any]]:
+        """
+        Ranked proposals from several annealing runs, best first. A proposal is skipped when
+        it places fewer than min_difference sections differently from a better one, so the
+        list is not filled with near-copies of the same layout.
+        """
+        candidates: Dict[bytes, Tuple[float, np.ndarray]] = {}
+        for run in range(restarts):
+            for score, p in self.anneal(iterations, seed=seed + run, top=top, max_moves=max_moves):
+                candidates.setdefault(p.tobytes(), (score, p))
+        chosen: List[np.ndarray] = []
+        for _, p in sorted(candidates.values(), key=lambda c: c[0]):
+            if all((p != other).sum() >= min_difference for other in chosen):
+                chosen.append(p)
+                if len(chosen) == top:
+                    break
+        # Rescored in full, so float drift from the incremental updates never reaches the report
+        return [dict(self.describe(p), rank=rank) for rank, p in enumerate(chosen, start=1)]
+
+    @property
+    def swaps_per_second(self) -> float:
+        return self.swaps_evaluated / self.elapsed if self.elapsed > 0 else 0.0
+
+    def describe(self, p: np.ndarray) -> Dict[str, Any]:
+        """Metrics and moves of one assignment relative to the current layout"""
+        totals = self.layer_totals(p)
+        n = max(self.population, 1)
+        walk, base_walk = totals[0] / n, self.baseline[0] / n
+        exposure, base_exposure = totals[1:].sum() / n, self.baseline[1:].sum() / n
+        return {
+            "score": self.score(totals),
+            "walk_m_per_journey": float(walk),
+            "walk_change_pct": float(100 * (walk - base_walk) / base_walk) if base_walk else 0.0,
+            "exposure_per_journey": float(exposure),
+            "exposure_change_pct": float(100 * (exposure - base_exposure) / base_exposure) if base_exposure else 0.0,
+            "moves": [{"section": self.sections[s], "to_slot_of": self.sections[p[s]]}
+                      for s in range(len(p)) if p[s] != s],
+            "assignment": {self.sections[s]: self.sections[p[s]] for s in range(len(p))},
+        }
+
+    def baseline_report(self) -> Dict[str, Any]:
+        return self.describe(self.identity)
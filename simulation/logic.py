@@ -4,22 +4,34 @@ from typing import Dict, List, Any
 from sklearn.tree import DecisionTreeClassifier
 import numpy as np
 import os
+from simulation.store_registry import get_registry
+
+def load_persona_file(path: str) -> Dict[str, Dict]:
+    """Persona parameters from a calibrated persona file ({"personas": {name: params}})"""
+    with open(path, "r") as f:
+        return json.load(f)["personas"]
 
 class CustomerSimulator:
     """
     Simulates customer shopping behavior based on persona and preferences
     """
     
-    def __init__(self):
-        # Load section names and coordinates from store_layout.json
-        with open(os.path.join("data", "store_layout.json"), "r") as f:
-            store_data = json.load(f)
+    def __init__(self, store_id: str = None, registry=None, persona_file: str = None, rng: random.Random = None):
+        # Load section names and coordinates from the store's layout (shared via the store registry)
+        self.registry = registry or get_registry()
+        self.store_id = self.registry.resolve(store_id)
+        # Source of randomness; pass a seeded random.Random for reproducible (common random number) runs
+        self.rng = rng or random
+        store_data = self.registry.layout(self.store_id)
         self.sections = [s['name'] for s in store_data['sections']]
         self.section_coords = {s['name']: (s['position']['x'], s['position']['y']) for s in store_data['sections']}
         self.entrances = [s['name'] for s in store_data['sections'] if s.get('type') == 'entry']
         self.checkout = [s['name'] for s in store_data['sections'] if s.get('type') == 'checkout']
-        # Persona data with new section names
+        # Persona data with new section names, overridden by a calibrated persona file if configured
         self.persona_data = self._load_persona_data()
+        self.persona_file = persona_file or self.registry.paths(self.store_id).get("personas")
+        if self.persona_file:
+            self.persona_data.update(load_persona_file(self.persona_file))
     
     def _load_persona_data(self) -> Dict[str, Dict]:
         """Load persona behavior patterns for new layout"""
@@ -80,11 +92,12 @@ class CustomerSimulator:
             "skipped": skipped,
             "persona": persona,
             "budget_sensitivity": budget_sensitivity,
-            "preferences": preferences
+            "preferences": preferences,
+            "store_id": self.store_id
         }
     def _generate_path(self, persona_info: Dict, preferences: Dict, budget_sensitivity: int, entrance: str = "", exit: str = "") -> List[str]:
         # Use selected entrance/exit if provided
-        start_entrance = entrance if entrance in self.entrances else random.choice(self.entrances)
+        start_entrance = entrance if entrance in self.entrances else self.rng.choice(self.entrances)
         end_exit = exit if exit in self.checkout or exit in self.sections else self.checkout[0]
         
         # Create a more realistic path that follows store layout
@@ -137,22 +150,22 @@ class CustomerSimulator:
         """Plan sections to visit based on path style"""
         if path_style == "quick":
             # Quick path: minimal sections, mostly preferred
-            sections_to_visit = random.sample(preferred, min(3, len(preferred)))
+            sections_to_visit = self.rng.sample(preferred, min(3, len(preferred)))
         elif path_style == "efficient":
             # Efficient path: preferred sections + a few others
-            sections_to_visit = preferred[:5] + random.sample([s for s in available_sections if s not in preferred and s not in avoided], 2)
+            sections_to_visit = preferred[:5] + self.rng.sample([s for s in available_sections if s not in preferred and s not in avoided], 2)
         elif path_style == "purposeful":
             # Purposeful path: focused on preferred sections
-            sections_to_visit = preferred[:random.randint(4, 6)]
+            sections_to_visit = preferred[:self.rng.randint(4, 6)]
         elif path_style == "thorough":
             # Thorough path: preferred + some exploration
-            sections_to_visit = preferred + random.sample([s for s in available_sections if s not in preferred and s not in avoided], 3)
+            sections_to_visit = preferred + self.rng.sample([s for s in available_sections if s not in preferred and s not in avoided], 3)
         elif path_style == "comprehensive":
             # Comprehensive path: visit most sections except avoided
             sections_to_visit = [s for s in available_sections if s not in avoided]
         else:  # wandering
             # Wandering path: random selection
-            sections_to_visit = random.sample([s for s in available_sections if s not in avoided], random.randint(5, 10))
+            sections_to_visit = self.rng.sample([s for s in available_sections if s not in avoided], self.rng.randint(5, 10))
         
         return sections_to_visit
     
@@ -229,7 +242,7 @@ class CustomerSimulator:
             if preferences.get('eco_preference', False) and ("Eco" in section or "Produce" in section):
                 time = int(time * 1.3)
             # Randomness
-            time += random.randint(-2, 2)
+            time += self.rng.randint(-2, 2)
             time = max(1, time)
             dwell_times[section] = time
         return dwell_times
@@ -0,0 +1,140 @@
+import random
+import time
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from simulation.logic import CustomerSimulator
+from simulation.summary import SPECIAL_TYPES
+from simulation.travel import TravelModel, journey_total_time
+
+# Adaptive Monte Carlo estimation of journey metrics. Journeys are simulated in
+# batches; running means and variances are merged per batch (Chan et al.) and the
+# run stops as soon as every tracked metric's confidence interval is narrower than
+# its target width, instead of always paying for a fixed number of runs.
+
+METRICS = ("total_time", "coverage", "dwell")
+
+# Full CI widths: minutes for total time (dwell plus walking, see travel.TravelModel) and
+# per-section dwell, a fraction for coverage
+DEFAULT_TARGET_WIDTHS = {"total_time": 2.0, "coverage": 0.02, "dwell": 1.0}
+
+
+class RunningStats:
+    """Per-column mean and variance updated one batch at a time"""
+
+    def __init__(self, k: int):
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+
+    def update(self, batch: np.ndarray):
+        nb = len(batch)
+        if nb == 0:
+            return
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+        n = self.n + nb
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * nb / n
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.n * nb / n
+        self.n = n
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / (self.n - 1) if self.n > 1 else np.full_like(self.m2, np.inf)
+
+    def ci_width(self, z: float) -> np.ndarray:
+        """Full width of the normal-approximation confidence interval of the mean"""
+        return 2 * z * np.sqrt(self.variance / max(self.n, 1))
+
+
+def journey_metrics(results: Dict[str, Any], regular_sections: List[str], dwell_sections: List[str]) -> np.ndarray:
+    """Metric vector of one journey: total time (with walking once costed), coverage, then dwell per section"""
+    dwell = results.get('dwell_time', {})
+    visited = set(results.get('path', []))
+    coverage = sum(1 for s in regular_sections if s in visited) / max(len(regular_sections), 1)
+    return np.array([journey_total_time(results), coverage] + [dwell.get(s, 0) for s in dwell_sections], dtype=np.float64)
+
+
+def adaptive_estimate(simulator: CustomerSimulator, persona: str, budget_sensitivity: int,
+                      preferences: Dict[str, bool], metrics: List[str] = METRICS,
+                      target_widths: Dict[str, float] = None, confidence: float = 0.95,
+                      batch_size: int = 50, min_samples: int = 100, max_samples: int = 5000,
+                      fixed_n: int = None, seed: Optional[int] = None,
+                      entrance: str = "", exit: str = "") -> Dict[str, Any]:
+    """
+    Simulate journeys for one persona/parameter set in batches until the confidence
+    intervals of all requested metrics are narrower than their target widths (or
+    max_samples is reached). Per-section dwell means include zero for unvisited sections.
+    Savings are reported against a fixed-N run of fixed_n journeys (default max_samples).
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {sorted(unknown)}")
+    targets = dict(DEFAULT_TARGET_WIDTHS, **(target_widths or {}))
+    fixed_n = fixed_n or max_samples
+
+    store_data = simulator.registry.layout(simulator.store_id)
+    special = {s['name'] for s in store_data['sections'] if s.get('type') in SPECIAL_TYPES}
+    regular = [s for s in simulator.sections if s not in special]
+    dwell_sections = regular if "dwell" in metrics else []
+    names = ["total_time", "coverage"] + [f"dwell:{s}" for s in dwell_sections]
+    tracked = np.array([("total_time" in metrics), ("coverage" in metrics)] + [True] * len(dwell_sections))
+    target = np.array([targets["total_time"], targets["coverage"]] + [targets["dwell"]] * len(dwell_sections))
+
+    # Walking is added per batch so total_time matches the rest of the app; distance rows are cached
+    travel = TravelModel(simulator.registry.get(simulator.store_id).state)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    stats = RunningStats(len(names))
+    started = time.perf_counter()
+    converged = False
+    batches = 0
+    # Seeded runs draw from their own stream, restored afterwards (global random is left alone)
+    saved_rng = simulator.rng
+    if seed is not None:
+        simulator.rng = random.Random(seed)
+    try:
+        while stats.n < max_samples:
+            size = min(batch_size, max_samples - stats.n)
+            journeys = travel.apply_batch([
+                simulator.simulate_journey(persona, budget_sensitivity, preferences, entrance, exit)
+                for _ in range(size)
+            ])
+            batch = np.stack([journey_metrics(r, regular, dwell_sections) for r in journeys])
+            stats.update(batch)
+            batches += 1
+            if stats.n >= min_samples and np.all(stats.ci_width(z)[tracked] <= target[tracked]):
+                converged = True
+                break
+    finally:
+        simulator.rng = saved_rng
+    elapsed = time.perf_counter() - started
+
+    widths = stats.ci_width(z)
+    estimates = {}
+    for i, name in enumerate(names):
+        if not tracked[i]:
+            continue
+        estimates[name] = {
+            "mean": float(stats.mean[i]),
+            "low": float(stats.mean[i] - widths[i] / 2),
+            "high": float(stats.mean[i] + widths[i] / 2),
+            "width": float(widths[i]),
+            "target": float(target[i]),
+        }
+    seconds_per_run = elapsed / max(stats.n, 1)
+    return {
+        "persona": persona,
+        "converged": converged,
+        "samples": stats.n,
+        "batches": batches,
+        "confidence": confidence,
+        "fixed_n": fixed_n,
+        "saved_runs": max(fixed_n - stats.n, 0),
+        "saved_fraction": max(fixed_n - stats.n, 0) / fixed_n if fixed_n else 0.0,
+        "elapsed_seconds": elapsed,
+        "fixed_n_seconds": seconds_per_run * fixed_n,
+        "estimates": estimates,
+    }
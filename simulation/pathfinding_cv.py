@@ -3,9 +3,15 @@ import numpy as np
 import heapq
 import logging
 
-# Use a binary aisle mask (white=walkable, black=not) as the walkable grid
+from simulation import kernels
+
+# Use a colour-coded aisle mask (yellow=main aisle, purple=secondary aisle) as the walkable grid
 # Place your mask at assets/aisle_mask.png, same size as the store map
 
+# Per-pixel move costs stored in the grid; any value > 0 is walkable
+MAIN_AISLE_COST = 1
+SECONDARY_AISLE_COST = 2
+
 def load_aisle_mask(mask_path):
     print(f"[DEBUG] Loading aisle mask from: {mask_path}")
     mask = cv2.imread(mask_path)
@@ -20,16 +26,36 @@ def load_aisle_mask(mask_path):
     purple_lower = np.array([120, 50, 50])
     purple_upper = np.array([160, 255, 255])
     mask_purple = cv2.inRange(hsv, purple_lower, purple_upper)
-    # Walkable: yellow or purple
-    walkable = ((mask_yellow > 0) | (mask_purple > 0)).astype(np.uint8)
+    # Cost grid: 0 = not walkable, MAIN_AISLE_COST for yellow, SECONDARY_AISLE_COST for purple
+    walkable = np.zeros(mask_yellow.shape, dtype=np.uint8)
+    walkable[mask_purple > 0] = SECONDARY_AISLE_COST
+    walkable[mask_yellow > 0] = MAIN_AISLE_COST
     return walkable, mask
 
 def heuristic(a, b):
     return np.linalg.norm(np.array(a) - np.array(b))
 
+def label_components(grid):
+    """Label 8-connected walkable regions once per mask; 0 = not walkable"""
+    _, labels = cv2.connectedComponents((grid > 0).astype(np.uint8), connectivity=8)
+    return labels
+
+def same_component(labels, a, b):
+    """O(1) check that two pixels lie in the same walkable region"""
+    return labels[a[0], a[1]] != 0 and labels[a[0], a[1]] == labels[b[0], b[1]]
+
 # Modified astar to support different costs for primary/secondary aisles
-def astar(grid, start, goal):
+def astar(grid, start, goal, labels=None, backend=None):
     h, w = grid.shape
+    if labels is not None and not same_component(labels, start, goal):
+        # Unreachable: fail fast instead of flooding the whole start component
+        logging.error(f"A* skipped, stops are in disconnected aisle regions: {start} -> {goal}")
+        return None
+    if kernels.use_compiled(backend):
+        path = kernels.astar_path(grid, start, goal)
+        if path is None:
+            logging.error(f"A* failed to find path: {start} -> {goal}")
+        return path
     open_set = []
     heapq.heappush(open_set, (0 + heuristic(start, goal), 0, start, [start]))
     visited = set()
@@ -43,35 +69,214 @@ def astar(grid, start, goal):
         for dx, dy in [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(1,1),(-1,1),(1,-1)]:
             ny, nx = current[0]+dy, current[1]+dx
             if 0 <= ny < h and 0 <= nx < w and grid[ny, nx] > 0:
-                # Cost: 1 for primary, 2 for secondary
-                move_cost = 1 if grid[ny, nx] == 1 else 2
+                # Cost: 1 for primary, 2 for secondary (the grid value)
+                move_cost = int(grid[ny, nx])
                 heapq.heappush(open_set, (cost+move_cost+heuristic((ny,nx), goal), cost+move_cost, (ny,nx), path+[(ny,nx)]))
     logging.error(f"A* failed to find path: {start} -> {goal}")
     return None
 
+def dial_shortest_path(grid, start, goal, labels=None, backend=None):
+    """
+    Minimum-cost 8-connected path over a small-integer cost grid using Dial's bucket queue.
+    Every move costs the grid value of the pixel entered, so the path prefers main aisles.
+    Buckets are indexed by distance modulo (max cost + 1), giving O(1) push/pop instead of
+    a binary heap's O(log n) with tuple comparisons.
+    """
+    h, w = grid.shape
+    if labels is not None and not same_component(labels, start, goal):
+        logging.error(f"Dial skipped, stops are in disconnected aisle regions: {start} -> {goal}")
+        return None
+    if kernels.use_compiled(backend):
+        path = kernels.dial_path(grid, start, goal)
+        if path is None:
+            logging.error(f"Dial failed to find path: {start} -> {goal}")
+        return path
+    costs = grid.ravel().tolist()
+    n_buckets = int(grid.max()) + 1
+    buckets = [[] for _ in range(n_buckets)]
+    INF = 1 << 30
+    dist = [INF] * (h * w)
+    parent = [-1] * (h * w)
+    src = start[0] * w + start[1]
+    dst = goal[0] * w + goal[1]
+    dist[src] = 0
+    buckets[0].append(src)
+    pending = 1
+    d = 0
+    # Column deltas let the inner loop reject moves that would wrap around a row edge
+    moves = [(-w, 0), (w, 0), (-1, -1), (1, 1), (-w-1, -1), (w+1, 1), (-w+1, 1), (w-1, -1)]
+    size = h * w
+    while pending:
+        bucket = buckets[d % n_buckets]
+        while bucket:
+            cur = bucket.pop()
+            pending -= 1
+            if dist[cur] != d:
+                continue  # stale entry, already settled at a lower distance
+            if cur == dst:
+                path = []
+                while cur != -1:
+                    path.append((cur // w, cur % w))
+                    cur = parent[cur]
+                return path[::-1]
+            cx = cur % w
+            for delta, dx in moves:
+                nxt = cur + delta
+                if nxt < 0 or nxt >= size:
+                    continue
+                nx = cx + dx
+                if nx < 0 or nx >= w:
+                    continue
+                c = costs[nxt]
+                if c == 0:
+                    continue
+                nd = d + c
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    parent[nxt] = cur
+                    buckets[nd % n_buckets].append(nxt)
+                    pending += 1
+        d += 1
+    logging.error(f"Dial failed to find path: {start} -> {goal}")
+    return None
+
+def path_cost(grid, path):
+    """Total move cost of a routed path (grid value of every pixel entered)"""
+    if not path or len(path) < 2:
+        return 0
+    pts = np.asarray(path[1:])
+    return int(grid[pts[:, 0], pts[:, 1]].sum())
+
+def line_of_sight(grid, a, b):
+    """True if the straight segment a -> b only crosses walkable pixels"""
+    n = max(abs(b[0] - a[0]), abs(b[1] - a[1])) + 1
+    ys = np.rint(np.linspace(a[0], b[0], n)).astype(np.intp)
+    xs = np.rint(np.linspace(a[1], b[1], n)).astype(np.intp)
+    return bool((grid[ys, xs] > 0).all())
+
+def smooth_path(grid, path):
+    """
+    Any-angle post-processing of a pixel path by line-of-sight string pulling:
+    from each kept vertex, jump to the farthest later vertex still in sight.
+    Reach is found by galloping then bisecting, so long straight runs cost
+    O(log n) visibility checks instead of one per pixel.
+    """
+    if path is None or len(path) < 3:
+        return path
+    smoothed = [path[0]]
+    i = 0
+    last = len(path) - 1
+    while i < last:
+        # Gallop: double the step while the target stays visible
+        step = 1
+        while i + step * 2 <= last and line_of_sight(grid, path[i], path[i + step * 2]):
+            step *= 2
+        lo, hi = i + step, min(i + step * 2, last + 1)
+        # Bisect between the last visible vertex and the first one known (or assumed) hidden
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if line_of_sight(grid, path[i], path[mid]):
+                lo = mid
+            else:
+                hi = mid
+        i = lo
+        smoothed.append(path[i])
+    return smoothed
+
+def polyline_length(path):
+    """Euclidean length of a (y, x) polyline in pixels"""
+    if path is None or len(path) < 2:
+        return 0.0
+    pts = np.asarray(path, dtype=np.float64)
+    return float(np.hypot(*np.diff(pts, axis=0).T).sum())
+
+def resample_polyline(path, spacing=1.0):
+    """Evenly spaced (y, x) integer points along a polyline, e.g. to animate a smoothed route"""
+    if path is None or len(path) < 2:
+        return path
+    pts = np.asarray(path, dtype=np.float64)
+    seg = np.hypot(*np.diff(pts, axis=0).T)
+    dist = np.concatenate([[0.0], np.cumsum(seg)])
+    samples = np.append(np.arange(0.0, dist[-1], spacing), dist[-1])
+    ys = np.interp(samples, dist, pts[:, 0])
+    xs = np.interp(samples, dist, pts[:, 1])
+    return [(int(y), int(x)) for y, x in zip(np.rint(ys), np.rint(xs))]
+
+ROUTING_ENGINES = {
+    "astar": astar,
+    "dial": dial_shortest_path,
+}
+
 # Update snap_to_aisle to snap to any walkable aisle (primary or secondary)
-def snap_to_aisle(grid, point, max_radius=50):
+def snap_to_aisle(grid, point, max_radius=50, backend=None):
+    if kernels.use_compiled(backend):
+        y, x, status = kernels.snap_point(grid, point, max_radius)
+        if status == 2:
+            logging.warning(f"No walkable pixel found near {point}, fallback to closest {(y, x)}")
+        elif status == 3:
+            logging.warning(f"No walkable pixel found near {point}, grid has no walkable pixels")
+        return (y, x)
     y, x = point
     h, w = grid.shape
     y = min(max(y, 0), h-1)
     x = min(max(x, 0), w-1)
-    if grid[y, x] == 1:
+    if grid[y, x] > 0:
         return (y, x)
     # Search in increasing radius
     for r in range(1, max_radius+1):
         for dy in range(-r, r+1):
             for dx in range(-r, r+1):
                 ny, nx = y+dy, x+dx
-                if 0 <= ny < h and 0 <= nx < w and grid[ny, nx] == 1:
+                if 0 <= ny < h and 0 <= nx < w and grid[ny, nx] > 0:
                     return (ny, nx)
-    # Fallback: use distance transform to find closest walkable pixel
-    import cv2
-    walkable = (grid == 1).astype(np.uint8)
-    dist_transform = cv2.distanceTransform(1-walkable, cv2.DIST_L2, 5)
-    min_idx = np.unravel_index(np.argmin(dist_transform + ((walkable==0)*1e6)), dist_transform.shape)
+    # Fallback: closest walkable pixel anywhere on the grid
+    walkable = np.argwhere(grid > 0)
+    if len(walkable) == 0:
+        logging.warning(f"No walkable pixel found near {point}, grid has no walkable pixels")
+        return (y, x)
+    d2 = (walkable[:, 0] - y) ** 2 + (walkable[:, 1] - x) ** 2
+    min_idx = tuple(int(v) for v in walkable[np.argmin(d2)])
     logging.warning(f"No walkable pixel found near {point}, fallback to closest {min_idx}")
     return min_idx
 
+def snap_to_component(labels, point, component):
+    """Nearest pixel to point inside the given walkable component"""
+    pixels = np.argwhere(labels == component)
+    d2 = (pixels[:, 0] - point[0]) ** 2 + (pixels[:, 1] - point[1]) ** 2
+    return tuple(int(v) for v in pixels[np.argmin(d2)])
+
+def reachability_report(grid, labels, section_coords):
+    """Per-section snapped point and walkable component, flagging sections cut off from the main aisle network.
+    Use offline to find mask defects (gaps in painted aisles) before they show up as failed routes."""
+    sizes = np.bincount(labels.ravel())
+    sizes[0] = 0
+    main = int(np.argmax(sizes)) if len(sizes) > 1 else 0
+    report = {}
+    for name, pt in section_coords.items():
+        snapped = tuple(int(v) for v in snap_to_aisle(grid, pt))
+        comp = int(labels[snapped])
+        report[name] = {
+            "position": tuple(int(v) for v in pt),
+            "snapped": snapped,
+            "snap_distance": float(np.hypot(snapped[0] - pt[0], snapped[1] - pt[1])),
+            "component": comp,
+            "component_size": int(sizes[comp]) if comp else 0,
+            "reachable": comp == main and comp != 0,
+        }
+    return report
+
+def nearest_walkable_index(grid):
+    """Flat index of the nearest walkable pixel for every pixel (itself if walkable): snaps whole
+    point arrays with one lookup. Distances use OpenCV's 5x5 L2 approximation."""
+    walkable = grid > 0
+    if not walkable.any():
+        return np.arange(grid.size, dtype=np.int64).reshape(grid.shape)
+    _, nearest = cv2.distanceTransformWithLabels((~walkable).astype(np.uint8), cv2.DIST_L2, 5,
+                                                 labelType=cv2.DIST_LABEL_PIXEL)
+    lut = np.zeros(int(nearest.max()) + 1, dtype=np.int64)
+    lut[nearest[walkable]] = np.flatnonzero(walkable.ravel())
+    return lut[nearest]
+
 # Debug: Overlay mask on map for visual inspection
 
 def overlay_mask_on_map(map_img, mask_img, alpha=0.4):
@@ -101,7 +306,7 @@ def overlay_points_and_paths(img, snapped_stops, path_segments, failed_pairs, dw
     label_offset = 16
     # Draw entrance and exit with outlined, modern markers
     for idx, pt in enumerate(snapped_stops):
-        is_walkable = walkable_mask[pt[0], pt[1]] == 1 if walkable_mask is not None else True
+        is_walkable = walkable_mask[pt[0], pt[1]] > 0 if walkable_mask is not None else True
         walkability.append(is_walkable)
         if idx == 0:  # Entrance
             color = (60, 220, 60)  # Softer green
@@ -158,8 +363,10 @@ def overlay_points_and_paths(img, snapped_stops, path_segments, failed_pairs, dw
         cv2.line(img, (start[1], start[0]), (end[1], end[0]), (0,255,255), 2, lineType=cv2.LINE_AA)
     return img, walkability
 
-def compute_full_path(grid, stops):
+def compute_full_path(grid, stops, labels=None):
     h, w = grid.shape
+    if labels is None:
+        labels = label_components(grid)
     full_path = []
     snapped_stops = []
     for pt in stops:
@@ -172,7 +379,7 @@ def compute_full_path(grid, stops):
         if not (0 <= start[0] < h and 0 <= start[1] < w and 0 <= end[0] < h and 0 <= end[1] < w):
             logging.error(f"Invalid coordinates for astar: {start} -> {end} (grid shape: {h}, {w})")
             continue
-        segment = astar(grid, start, end)
+        segment = astar(grid, start, end, labels=labels)
         if segment is None:
             logging.error(f"A* failed to find path: {start} -> {end}")
             continue
@@ -181,6 +388,23 @@ def compute_full_path(grid, stops):
         full_path.extend(segment)
     return full_path
 
+def route_stops(grid, stops, labels=None):
+    """Snap (y, x) stops to the aisle grid and route consecutive pairs.
+    Returns snapped stops, the routed segments and the (start, end) pairs A* could not connect."""
+    if labels is None:
+        labels = label_components(grid)
+    snapped_stops = [snap_to_aisle(grid, pt) for pt in stops]
+    path_segments = []
+    failed_pairs = []
+    for i in range(len(snapped_stops)-1):
+        start, end = snapped_stops[i], snapped_stops[i+1]
+        segment = astar(grid, start, end, labels=labels)
+        if segment is None:
+            failed_pairs.append((start, end))
+            continue
+        path_segments.append(segment)
+    return snapped_stops, path_segments, failed_pairs
+
 def draw_path_on_image(img, path, color=(0,0,255), thickness=3):
     for i in range(len(path)-1):
         cv2.line(img, (path[i][1], path[i][0]), (path[i+1][1], path[i+1][0]), color, thickness)
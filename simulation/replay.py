@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+from typing import Iterator, List, Tuple
+
+from simulation.pathfinding_cv import overlay_points_and_paths, resample_polyline
+
+# Incremental journey replay: the map and stop markers are rendered once into a
+# persistent buffer, then each frame only draws the next slice of the routed path.
+
+PATH_COLOR = (255, 80, 80)
+CURSOR_COLOR = (60, 60, 220)
+
+
+def render_static_base(img, snapped_stops, dwell_times=None, walkable_mask=None, section_names=None, visit_counts=None):
+    """Draw stop markers and labels once; no path segments"""
+    base, _ = overlay_points_and_paths(img.copy(), snapped_stops, [], [], dwell_times,
+                                       walkable_mask=walkable_mask, section_names=section_names,
+                                       visit_counts=visit_counts)
+    return base
+
+
+def iter_replay_frames(base_img, path_segments: List[List[Tuple[int, int]]], frame_stride: int = 8,
+                       thickness: int = 3, show_cursor: bool = True) -> Iterator[np.ndarray]:
+    """
+    Yield animation frames, advancing frame_stride pixels of walking per frame.
+    Segments are resampled at 1px spacing, so smoothed (any-angle) routes animate
+    at the same pace as raw pixel routes.
+
+    Frames share one persistent buffer, so memory stays bounded regardless of
+    journey length; copy a frame if it has to outlive the next iteration.
+    """
+    frame_stride = max(1, int(frame_stride))
+    buffer = base_img.copy()
+    yield buffer
+    for segment in path_segments:
+        segment = resample_polyline(segment)
+        for start in range(0, len(segment) - 1, frame_stride):
+            chunk = segment[start:start + frame_stride + 1]
+            pts = np.array([(x, y) for y, x in chunk], dtype=np.int32)
+            cv2.polylines(buffer, [pts], False, PATH_COLOR, thickness, lineType=cv2.LINE_AA)
+            if show_cursor:
+                frame = buffer.copy()
+                cv2.circle(frame, tuple(int(v) for v in pts[-1]), 6, CURSOR_COLOR, -1, lineType=cv2.LINE_AA)
+                yield frame
+            else:
+                yield buffer
+
+
+def write_replay_video(frames: Iterator[np.ndarray], output_path: str, fps: int = 20,
+                       codec: str = "VP80", scale: float = 1.0) -> int:
+    """
+    Encode frames to a video file as they are produced; returns the frame count.
+
+    The default VP8/WebM output plays directly in browsers (st.video); use
+    codec="mp4v" with an .mp4 path for desktop players.
+    """
+    writer = None
+    count = 0
+    try:
+        for frame in frames:
+            if scale != 1.0:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*codec), fps, (w, h))
+                if not writer.isOpened():
+                    raise RuntimeError(f"Could not open video writer for {output_path} with codec {codec}")
+            writer.write(frame)
+            count += 1
+    finally:
+        if writer is not None:
+            writer.release()
+    return count
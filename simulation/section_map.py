@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from simulation import kernels
+from simulation.pathfinding_cv import resample_polyline
+
+# Pixel -> section lookup. Every walkable pixel is labelled with the section whose
+# snapped point is nearest by walking distance through the aisles (a geodesic Voronoi
+# partition), so a wall between two aisles never assigns a pixel to the section on
+# the other side. Trajectories then map to sections with one fancy-indexing lookup.
+
+# Chamfer 2-3 steps: orthogonal moves cost 2, diagonal moves 3 (≈ 2·√2), a close
+# integer approximation of Euclidean walking distance that Dial's buckets can handle
+ORTHOGONAL_STEP = 2
+DIAGONAL_STEP = 3
+
+UNASSIGNED = -1
+
+
+def walking_voronoi(grid: np.ndarray, seeds: List[Tuple[int, int]], backend: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Multi-source Dial search from all seed pixels at once over walkable (> 0) pixels.
+    Returns (labels, dist): labels[y, x] is the index of the nearest seed (UNASSIGNED for
+    blocked or unreachable pixels), dist the chamfer walking distance to it.
+    """
+    if kernels.use_compiled(backend):
+        return kernels.voronoi_labels(grid, seeds, ORTHOGONAL_STEP, DIAGONAL_STEP)
+    h, w = grid.shape
+    walkable = (grid > 0).ravel().tolist()
+    size = h * w
+    INF = 1 << 30
+    dist = [INF] * size
+    label = [UNASSIGNED] * size
+    n_buckets = DIAGONAL_STEP + 1
+    buckets = [[] for _ in range(n_buckets)]
+    pending = 0
+    for i, (y, x) in enumerate(seeds):
+        idx = int(y) * w + int(x)
+        if 0 <= idx < size and walkable[idx] and dist[idx] != 0:
+            dist[idx] = 0
+            label[idx] = i
+            buckets[0].append(idx)
+            pending += 1
+    moves = [(-w, 0, ORTHOGONAL_STEP), (w, 0, ORTHOGONAL_STEP), (-1, -1, ORTHOGONAL_STEP), (1, 1, ORTHOGONAL_STEP),
+             (-w-1, -1, DIAGONAL_STEP), (w+1, 1, DIAGONAL_STEP), (-w+1, 1, DIAGONAL_STEP), (w-1, -1, DIAGONAL_STEP)]
+    d = 0
+    while pending:
+        bucket = buckets[d % n_buckets]
+        while bucket:
+            cur = bucket.pop()
+            pending -= 1
+            if dist[cur] != d:
+                continue  # stale entry, already settled at a lower distance
+            cx = cur % w
+            lab = label[cur]
+            for delta, dx, step in moves:
+                nxt = cur + delta
+                if nxt < 0 or nxt >= size:
+                    continue
+                nx = cx + dx
+                if nx < 0 or nx >= w or not walkable[nxt]:
+                    continue
+                nd = d + step
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    label[nxt] = lab
+                    buckets[nd % n_buckets].append(nxt)
+                    pending += 1
+        d += 1
+    labels = np.array(label, dtype=np.int16).reshape(h, w)
+    dist_img = np.array(dist, dtype=np.int32).reshape(h, w)
+    dist_img[labels == UNASSIGNED] = -1
+    return labels, dist_img
+
+
+def walking_distances(grid: np.ndarray, source: Tuple[int, int], targets: List[Tuple[int, int]],
+                      backend: str = None) -> np.ndarray:
+    """
+    Walking distance in pixels from source to each target point along the aisles (chamfer
+    distance over ORTHOGONAL_STEP); NaN for targets not reachable from source
+    """
+    _, dist = walking_voronoi(grid, [source], backend=backend)
+    ys = np.array([int(t[0]) for t in targets], dtype=np.int64)
+    xs = np.array([int(t[1]) for t in targets], dtype=np.int64)
+    found = dist[ys, xs].astype(np.float64)
+    found[found < 0] = np.nan
+    return found / ORTHOGONAL_STEP
+
+
+def trajectory_points(segments: List[List[Tuple[int, int]]], spacing: float = 1.0) -> np.ndarray:
+    """Concatenate routed segments into one (n, 2) pixel array, densifying any-angle polylines"""
+    parts = [np.asarray(resample_polyline(seg, spacing), dtype=np.int64).reshape(-1, 2)
+             for seg in segments if seg is not None and len(seg)]
+    return np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.int64)
+
+
+def attribute_trajectory(section_labels: np.ndarray, points: np.ndarray, n_sections: int,
+                         times: Optional[np.ndarray] = None, min_stop: float = 1.0,
+                         journey_ids: Optional[np.ndarray] = None, n_journeys: int = None) -> Dict[str, np.ndarray]:
+    """
+    Map pixel trajectories onto sections. points is (n, 2) (y, x); times are per-point
+    timestamps (without them every point counts as one time unit, i.e. roughly distance).
+    Each maximal run of consecutive points in one section is a visit; visits shorter than
+    min_stop count as pass-throughs rather than stops.
+    Many journeys can be attributed in the same pass by concatenating their points and
+    passing journey_ids (non-decreasing); arrays are then (n_journeys, n_sections).
+    Returns per-section arrays: dwell, visits, stops and pass_through.
+    """
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    batched = journey_ids is not None
+    if batched:
+        journey_ids = np.asarray(journey_ids, dtype=np.int64)
+        n_journeys = n_journeys if n_journeys is not None else (int(journey_ids.max()) + 1 if len(journey_ids) else 0)
+    else:
+        journey_ids = np.zeros(len(points), dtype=np.int64)
+        n_journeys = 1
+    shape = (n_journeys, n_sections)
+    h, w = section_labels.shape
+    ys = np.clip(points[:, 0], 0, h - 1)
+    xs = np.clip(points[:, 1], 0, w - 1)
+    labels = section_labels[ys, xs].astype(np.int64)
+    if times is None:
+        dt = np.ones(len(points))
+    else:
+        times = np.asarray(times, dtype=np.float64)
+        dt = np.diff(times, append=times[-1:]) if len(times) else times
+        # The last point of each journey has no successor within the journey
+        dt[np.flatnonzero(np.diff(journey_ids) != 0)] = 0
+    known = labels != UNASSIGNED
+    labels, dt, journey_ids = labels[known], dt[known], journey_ids[known]
+    size = n_journeys * n_sections
+    cells = journey_ids * n_sections + labels
+    # Run-length encode each journey's label sequence: one run per section visit
+    if len(cells):
+        run_starts = np.flatnonzero(np.concatenate([[True], cells[1:] != cells[:-1]]))
+        run_cells = cells[run_starts]
+        run_dwell = np.add.reduceat(dt, run_starts)
+    else:
+        run_cells = cells
+        run_dwell = dt
+    stopped = run_dwell >= min_stop
+    attribution = {
+        "dwell": np.bincount(cells, weights=dt, minlength=size),
+        "visits": np.bincount(run_cells, minlength=size).astype(np.float64),
+        "stops": np.bincount(run_cells[stopped], minlength=size).astype(np.float64),
+        "pass_through": np.bincount(run_cells[~stopped], minlength=size).astype(np.float64),
+    }
+    return {k: v.reshape(shape) if batched else v for k, v in attribution.items()}
+
+
+def attribution_by_section(attribution: Dict[str, np.ndarray], sections: List[str]) -> Dict[str, Dict[str, float]]:
+    """{section: {dwell, visits, stops, pass_through}} for sections the trajectory touched"""
+    return {
+        name: {k: float(v[i]) for k, v in attribution.items()}
+        for i, name in enumerate(sections) if attribution["visits"][i] > 0
+    }
@@ -0,0 +1,129 @@
+import warnings
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Per-section statistics index. A batch of journeys (result dicts or the journey
+# store's memmap) is reduced once to (persona, section) tables of visits, dwell
+# percentiles among visitors and skip rates, with an "All" row for the whole batch.
+# Hover tooltips and persona filters then only index into these tables.
+
+ALL_PERSONAS = "All"
+DWELL_PERCENTILES = (50, 90)
+DEFAULT_CHUNK_RECORDS = 65536
+
+
+class SectionStatsIndex:
+    """
+    (persona, section) statistics of one batch of journeys. Row 0 of every table is
+    ALL_PERSONAS, then one row per persona; columns follow sections.
+    """
+
+    def __init__(self, sections: List[str], personas: List[str], persona: np.ndarray, dwell: np.ndarray,
+                 visits: np.ndarray):
+        self.sections = list(sections)
+        self.personas = [ALL_PERSONAS] + list(personas)
+        self.section_ids = {s: i for i, s in enumerate(self.sections)}
+        self.persona_ids = {p: i for i, p in enumerate(self.personas)}
+        groups = [np.arange(len(persona))] + [np.flatnonzero(persona == i) for i in range(len(personas))]
+        rows, cols = len(groups), len(self.sections)
+        self.journeys = np.array([len(g) for g in groups], dtype=np.int64)
+        self.visitors = np.zeros((rows, cols), dtype=np.int64)
+        self.visits = np.zeros((rows, cols), dtype=np.int64)
+        self.dwell_mean = np.zeros((rows, cols))
+        self.dwell_percentiles = np.zeros((len(DWELL_PERCENTILES), rows, cols))
+        for row, members in enumerate(groups):
+            if len(members) == 0:
+                continue
+            visited = visits[members] > 0
+            self.visitors[row] = visited.sum(axis=0)
+            self.visits[row] = visits[members].sum(axis=0)
+            # Dwell distributions over the journeys that visited the section
+            among_visitors = np.where(visited, dwell[members], np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.dwell_mean[row] = np.nan_to_num(np.nanmean(among_visitors, axis=0))
+                self.dwell_percentiles[:, row] = np.nan_to_num(
+                    np.nanpercentile(among_visitors, DWELL_PERCENTILES, axis=0))
+        self.visit_rate = self.visitors / np.maximum(self.journeys, 1)[:, None]
+        # A journey skips every section it does not visit (see CustomerSimulator._get_skipped_sections)
+        self.skip_rate = np.where(self.journeys[:, None] > 0, 1.0 - self.visit_rate, 0.0)
+
+    def __len__(self) -> int:
+        return int(self.journeys[0])
+
+    def details(self, section: str, persona: Optional[str] = None) -> Dict[str, Any]:
+        """Statistics of one section for a persona (default: all journeys)"""
+        row = self.persona_ids[persona or ALL_PERSONAS]
+        col = self.section_ids[section]
+        details = {
+            "section": section,
+            "persona": self.personas[row],
+            "journeys": int(self.journeys[row]),
+            "visitors": int(self.visitors[row, col]),
+            "visits": int(self.visits[row, col]),
+            "visit_rate": float(self.visit_rate[row, col]),
+            "skip_rate": float(self.skip_rate[row, col]),
+            "dwell_mean": float(self.dwell_mean[row, col]),
+        }
+        for q, values in zip(DWELL_PERCENTILES, self.dwell_percentiles):
+            details[f"dwell_p{q}"] = float(values[row, col])
+        return details
+
+    def frame(self, persona: Optional[str] = None) -> pd.DataFrame:
+        """One row per section for a persona (default: all journeys)"""
+        row = self.persona_ids[persona or ALL_PERSONAS]
+        frame = pd.DataFrame({
+            "section": self.sections,
+            "visitors": self.visitors[row],
+            "visits": self.visits[row],
+            "visit_rate": self.visit_rate[row],
+            "skip_rate": self.skip_rate[row],
+            "dwell_mean": self.dwell_mean[row],
+        })
+        for q, values in zip(DWELL_PERCENTILES, self.dwell_percentiles):
+            frame[f"dwell_p{q}"] = values[row]
+        return frame
+
+    @classmethod
+    def from_results(cls, results_list: List[Dict[str, Any]], sections: List[str],
+                     personas: List[str] = None) -> "SectionStatsIndex":
+        """Index of in-memory simulate_journey results over a store's sections"""
+        personas = personas or list(dict.fromkeys(r.get('persona', 'Unknown') for r in results_list))
+        persona_ids = {p: i for i, p in enumerate(personas)}
+        section_ids = {s: i for i, s in enumerate(sections)}
+        n = len(results_list)
+        dwell = np.zeros((n, len(sections)))
+        visits = np.zeros((n, len(sections)), dtype=np.int64)
+        for j, r in enumerate(results_list):
+            for s in r.get('path', []):
+                if s in section_ids:
+                    visits[j, section_ids[s]] += 1
+            for s, minutes in r.get('dwell_time', {}).items():
+                if s in section_ids:
+                    dwell[j, section_ids[s]] = minutes
+        persona = np.array([persona_ids.get(r.get('persona'), -1) for r in results_list], dtype=np.int64)
+        return cls(sections, personas, persona, dwell, visits)
+
+    @classmethod
+    def from_store(cls, store, records: np.ndarray = None,
+                   chunk_records: int = DEFAULT_CHUNK_RECORDS) -> "SectionStatsIndex":
+        """
+        Index of a JourneyStore's live journeys, read column-wise from the memmap. Paths
+        are counted chunk by chunk in their stored dtype, so only visited entries are widened.
+        """
+        if records is None:
+            records = store.records()
+        ids = np.flatnonzero(store.live_mask(records))
+        n, n_sections = len(ids), len(store.sections)
+        # At most max_path (< 256) visits per journey and section
+        visits = np.zeros((n, n_sections), dtype=np.uint8)
+        steps = np.arange(records.dtype["path"].shape[0])
+        for start in range(0, n, chunk_records):
+            chunk = records[ids[start:start + chunk_records]]
+            on_path = steps[None, :] < chunk["path_len"][:, None]
+            journey = np.nonzero(on_path)[0]
+            counts = np.bincount(journey * n_sections + chunk["path"][on_path], minlength=len(chunk) * n_sections)
+            visits[start:start + len(chunk)] = counts.reshape(len(chunk), n_sections)
+        return cls(store.sections, store.personas, records["persona"][ids], records["dwell"][ids], visits)
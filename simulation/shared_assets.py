@@ -0,0 +1,223 @@
+import atexit
+import uuid
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from simulation.store_assets import StoreState
+
+# Shared-memory copies of a StoreState for worker processes. The parent publishes
+# the walkable grid, decoded mask, component and section label maps, the
+# nearest-walkable lookup, computed walking-distance rows and the route caches once
+# into named shared-memory blocks. It passes workers a small picklable manifest.
+# Workers attach read-only NumPy views by name, so no worker re-decodes the mask
+# or receives a pickled copy of the arrays. Routes are packed into one point array
+# plus offsets and become Python lists only when a worker actually uses one.
+
+_ROUTE_TABLES = ("routes", "smoothed_routes")
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Python 3.13+: attaching must not register the block for cleanup by this process
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedRouteTable(MutableMapping):
+    """
+    Route cache backed by packed shared arrays: key -> list of (y, x) points (or None
+    for an unreachable pair). Shared routes are converted on first use; routes added
+    by the worker stay local to it.
+    """
+
+    def __init__(self, keys: List[Tuple], points: np.ndarray, offsets: np.ndarray, missing: np.ndarray):
+        self._index = {key: i for i, key in enumerate(keys)}
+        self._points = points
+        self._offsets = offsets
+        self._missing = missing
+        self._local: Dict[Tuple, Any] = {}
+
+    def __getitem__(self, key):
+        if key in self._local:
+            return self._local[key]
+        i = self._index[key]
+        route = None
+        if not self._missing[i]:
+            route = [tuple(p) for p in self._points[self._offsets[i]:self._offsets[i + 1]].tolist()]
+        self._local[key] = route
+        return route
+
+    def __setitem__(self, key, value):
+        self._local[key] = value
+
+    def __delitem__(self, key):
+        # Shared entries can't be dropped from the block; hide them instead
+        self._local.pop(key, None)
+        self._index.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._local or key in self._index
+
+    def __iter__(self):
+        yield from self._local
+        for key in self._index:
+            if key not in self._local:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._local) + sum(1 for key in self._index if key not in self._local)
+
+    def values(self):
+        # Only the converted routes cost this process memory (see StoreState.nbytes)
+        return self._local.values()
+
+
+def _pack_routes(routes: Dict[Tuple, Any]) -> Tuple[List[Tuple], np.ndarray, np.ndarray, np.ndarray]:
+    keys = list(routes)
+    lengths = np.array([len(routes[k]) if routes[k] is not None else 0 for k in keys], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    points = np.zeros((int(offsets[-1]), 2), dtype=np.int32)
+    for key, start, end in zip(keys, offsets[:-1], offsets[1:]):
+        if end > start:
+            points[start:end] = np.asarray(routes[key], dtype=np.int32).reshape(-1, 2)
+    missing = np.array([routes[k] is None for k in keys], dtype=bool)
+    return keys, points, offsets, missing
+
+
+class SharedAssetPublisher:
+    """
+    Publishes one StoreState into shared memory. Use as a context manager (or call
+    close()) so the blocks are unlinked when the parent is done; they are also
+    unlinked at interpreter exit as a fallback.
+    """
+
+    def __init__(self, state: StoreState, routes: bool = True, precompute: bool = True):
+        self.prefix = f"shoptwin_{uuid.uuid4().hex[:12]}"
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.manifest: Dict[str, Any] = {}
+        if precompute:
+            # Built once here instead of once per worker
+            state.section_labels
+            state.nearest_walkable
+        self._publish(state, routes)
+        atexit.register(self.close)
+
+    def _put(self, key: str, array: np.ndarray) -> Dict[str, Any]:
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(name=f"{self.prefix}_{key}", create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        self._blocks[key] = block
+        return {"name": block.name, "shape": array.shape, "dtype": array.dtype.str}
+
+    def _publish(self, state: StoreState, routes: bool):
+        arrays = {"grid": state.grid, "mask": state.mask, "labels": state.labels}
+        if state._section_labels is not None:
+            arrays["section_labels"] = state._section_labels
+        if state._nearest_walkable is not None:
+            arrays["nearest_walkable"] = state._nearest_walkable
+        if state._distance_rows:
+            n = len(state.section_names)
+            matrix = np.full((n, n), np.nan)
+            for i, row in state._distance_rows.items():
+                matrix[i] = row
+            arrays["distance_rows"] = matrix
+        route_keys = {}
+        if routes:
+            for table in _ROUTE_TABLES:
+                keys, points, offsets, missing = _pack_routes(dict(getattr(state, table)))
+                route_keys[table] = keys
+                arrays.update({f"{table}_points": points, f"{table}_offsets": offsets, f"{table}_missing": missing})
+        self.manifest = {
+            "store_data": state.store_data,
+            "size": (state.width, state.height),
+            "layout_mtime": state.layout_mtime,
+            "mask_mtime": state.mask_mtime,
+            "engine": state.engine,
+            "snapped": dict(state.snapped),
+            "distance_rows": sorted(state._distance_rows),
+            "route_keys": route_keys,
+            "arrays": {key: self._put(key, array) for key, array in arrays.items()},
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in shared memory"""
+        return sum(block.size for block in self._blocks.values())
+
+    def close(self):
+        for block in self._blocks.values():
+            try:
+                block.close()
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AttachedState:
+    """A worker's read-only StoreState over published shared memory (keep it alive while used)"""
+
+    def __init__(self, manifest: Dict[str, Any]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        views = {key: self._view(spec) for key, spec in manifest["arrays"].items()}
+        state = StoreState(manifest["store_data"], views["grid"], views["mask"], manifest["size"],
+                           layout_mtime=manifest["layout_mtime"], mask_mtime=manifest["mask_mtime"],
+                           engine=manifest["engine"], labels=views["labels"])
+        state.snapped.update(manifest["snapped"])
+        state._section_labels = views.get("section_labels")
+        state._nearest_walkable = views.get("nearest_walkable")
+        for i in manifest["distance_rows"]:
+            state._distance_rows[i] = views["distance_rows"][i]
+        for table, keys in manifest["route_keys"].items():
+            setattr(state, table, SharedRouteTable(keys, views[f"{table}_points"], views[f"{table}_offsets"],
+                                                   views[f"{table}_missing"]))
+        self.state = state
+
+    def _view(self, spec: Dict[str, Any]) -> np.ndarray:
+        block = _attach_block(spec["name"])
+        self._blocks.append(block)
+        view = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=block.buf)
+        view.flags.writeable = False
+        return view
+
+    def close(self):
+        # Views must not be used after this
+        self.state = None
+        for block in self._blocks:
+            block.close()
+        self._blocks.clear()
+
+
+# Per-process attachment made by the pool initializer
+_worker_assets: Optional[AttachedState] = None
+
+
+def _init_worker(manifest: Dict[str, Any]):
+    global _worker_assets
+    _worker_assets = AttachedState(manifest)
+    atexit.register(_worker_assets.close)
+
+
+def worker_state() -> StoreState:
+    """The StoreState attached in this worker process (see shared_worker_pool)"""
+    if _worker_assets is None:
+        raise RuntimeError("No shared store assets attached in this process")
+    return _worker_assets.state
+
+
+def shared_worker_pool(publisher: SharedAssetPublisher, max_workers: int = None, mp_context=None) -> ProcessPoolExecutor:
+    """Process pool whose workers attach the published assets once at startup"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=_init_worker,
+                               initargs=(publisher.manifest,))
@@ -0,0 +1,233 @@
+from typing import Dict, List, Any, Sequence, Tuple
+
+import numpy as np
+
+from simulation.journey_store import PAD_ID
+
+# Journey similarity. Two journeys are compared directly with a sequence edit
+# distance over their section paths plus a dwell-weighted overlap. For large sets,
+# each path becomes a set of shingles (sections and consecutive section pairs) that
+# is summarized by a MinHash signature; LSH bands of the signatures put similar
+# journeys in shared buckets, and bucket links whose estimated Jaccard similarity
+# clears a threshold are merged into clusters. Every step is a vectorized pass over
+# the journeys, so clustering scales roughly linearly with their number.
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.6
+# Near-duplicates: almost every shingle shared
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
+PAD = -1
+_PRIME = (1 << 31) - 1
+_NO_SHINGLE = np.iinfo(np.uint32).max
+
+
+def edit_distance(a: Sequence, b: Sequence) -> int:
+    """Levenshtein distance between two section sequences (insert, delete, substitute)"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, start=1):
+        current = [i]
+        for j, y in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+def dwell_overlap(dwell1: Dict[str, float], dwell2: Dict[str, float]) -> float:
+    """Weighted Jaccard similarity of two dwell profiles: sum of minima over sum of maxima"""
+    sections = set(dwell1) | set(dwell2)
+    high = sum(max(dwell1.get(s, 0), dwell2.get(s, 0)) for s in sections)
+    low = sum(min(dwell1.get(s, 0), dwell2.get(s, 0)) for s in sections)
+    return low / high if high > 0 else 0.0
+
+
+def compare_journeys(results1: Dict[str, Any], results2: Dict[str, Any]) -> Dict[str, Any]:
+    """Side-by-side comparison of two journeys' paths and dwell times"""
+    path1, path2 = results1.get('path', []), results2.get('path', [])
+    dwell1, dwell2 = results1.get('dwell_time', {}), results2.get('dwell_time', {})
+    distance = edit_distance(path1, path2)
+    set1, set2 = set(path1), set(path2)
+    common = [s for s in dict.fromkeys(path1) if s in set2]
+    diverge_at = next((i for i, (x, y) in enumerate(zip(path1, path2)) if x != y), None)
+    if diverge_at is None and len(path1) != len(path2):
+        diverge_at = min(len(path1), len(path2))
+    return {
+        "edit_distance": distance,
+        "sequence_similarity": 1.0 - distance / max(len(path1), len(path2), 1),
+        "section_jaccard": len(set1 & set2) / len(set1 | set2) if set1 | set2 else 0.0,
+        "dwell_overlap": dwell_overlap(dwell1, dwell2),
+        "common_sections": common,
+        "only_first": [s for s in dict.fromkeys(path1) if s not in set2],
+        "only_second": [s for s in dict.fromkeys(path2) if s not in set1],
+        "dwell_difference": {s: dwell1.get(s, 0) - dwell2.get(s, 0) for s in common},
+        "diverge_at": diverge_at,
+    }
+
+
+def path_matrix(paths: List[Sequence[int]]) -> np.ndarray:
+    """Section-id paths as one PAD-padded (n, longest path) matrix"""
+    width = max((len(p) for p in paths), default=0)
+    matrix = np.full((len(paths), max(width, 1)), PAD, dtype=np.int32)
+    for i, p in enumerate(paths):
+        matrix[i, :len(p)] = p
+    return matrix
+
+
+def path_matrix_from_results(results_list: List[Dict[str, Any]], sections: List[str]) -> np.ndarray:
+    index = {s: i for i, s in enumerate(sections)}
+    return path_matrix([[index[s] for s in r.get('path', []) if s in index] for r in results_list])
+
+
+def path_matrix_from_store(store, records: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(path matrix, record positions) of a JourneyStore's live journeys, straight from the memmap"""
+    if records is None:
+        records = store.records()
+    live = np.flatnonzero(store.live_mask(records))
+    width = int(records["path_len"][live].max()) if len(live) else 1
+    matrix = np.asarray(records["path"][live, :max(width, 1)]).astype(np.int32)
+    matrix[matrix == PAD_ID] = PAD
+    return matrix, live
+
+
+class MinHasher:
+    """
+    MinHash signatures of section and section-pair shingles. Shingles come from a
+    small fixed vocabulary, so every hash of every shingle is tabulated once and a
+    signature is a gather plus a row minimum.
+    """
+
+    def __init__(self, n_sections: int, num_perm: int = DEFAULT_NUM_PERM, seed: int = 0):
+        self.n_sections = n_sections
+        self.num_perm = num_perm
+        universe = n_sections + n_sections * n_sections
+        rng = np.random.default_rng(seed)
+        a = rng.integers(1, _PRIME, num_perm, dtype=np.int64)
+        b = rng.integers(0, _PRIME, num_perm, dtype=np.int64)
+        x = np.arange(universe, dtype=np.int64)[:, None]
+        table = np.empty((universe + 1, num_perm), dtype=np.uint32)
+        table[:universe] = (a * x + b) % _PRIME
+        # Padding shingle: never the minimum
+        table[universe] = _NO_SHINGLE
+        self.table = table
+        self.universe = universe
+
+    def shingles(self, paths: np.ndarray) -> np.ndarray:
+        """(n, 2 * width - 1) shingle ids per journey: sections, then consecutive pairs (padding = universe)"""
+        n = self.n_sections
+        valid = paths >= 0
+        unigrams = np.where(valid, paths, self.universe)
+        pair_valid = valid[:, :-1] & valid[:, 1:]
+        bigrams = np.where(pair_valid, n + paths[:, :-1] * n + paths[:, 1:], self.universe)
+        return np.concatenate([unigrams, bigrams], axis=1)
+
+    def signatures(self, paths: np.ndarray, chunk: int = 2048) -> np.ndarray:
+        """(n, num_perm) signatures of a PAD-padded path matrix"""
+        signatures = np.empty((len(paths), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(paths), chunk):
+            shingles = self.shingles(paths[start:start + chunk])
+            signatures[start:start + chunk] = self.table[shingles].min(axis=1)
+        return signatures
+
+
+def estimated_similarity(signatures: np.ndarray, a: np.ndarray, b: np.ndarray, chunk: int = 1 << 18) -> np.ndarray:
+    """Estimated Jaccard similarity of journey pairs (a[i], b[i]) from their signatures"""
+    out = np.empty(len(a))
+    for start in range(0, len(a), chunk):
+        sa, sb = signatures[a[start:start + chunk]], signatures[b[start:start + chunk]]
+        out[start:start + chunk] = (sa == sb).mean(axis=1)
+    return out
+
+
+def _components(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Connected-component root (smallest member index) of every node, by min-label propagation"""
+    labels = np.arange(n)
+    while True:
+        lowest = np.minimum(labels[a], labels[b])
+        updated = labels.copy()
+        np.minimum.at(updated, a, lowest)
+        np.minimum.at(updated, b, lowest)
+        # Pointer jumping: a label is a member with a smaller label, so follow it
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+class JourneyClusters:
+    """Cluster labels of a journey set with sizes and representatives, largest cluster first"""
+
+    def __init__(self, labels: np.ndarray, representatives: np.ndarray, sizes: np.ndarray):
+        self.labels = labels
+        self.representatives = representatives
+        self.sizes = sizes
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def members(self, cluster: int) -> np.ndarray:
+        return np.flatnonzero(self.labels == cluster)
+
+    @property
+    def singletons(self) -> int:
+        return int((self.sizes == 1).sum())
+
+
+def lsh_clusters(signatures: np.ndarray, bands: int = DEFAULT_BANDS, threshold: float = DEFAULT_THRESHOLD,
+                 seed: int = 0) -> JourneyClusters:
+    """
+    Cluster journeys whose signatures share an LSH band bucket and agree on at least
+    `threshold` of their hashes (single linkage). Each bucket links its members to the
+    bucket's first journey; a cluster's representative is its most-linked journey.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    if rows < 1:
+        raise ValueError("More bands than signature hashes")
+    mix = np.random.default_rng(seed).integers(1, 1 << 62, rows, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+    everyone = np.arange(n)
+    links_a, links_b = [], []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        # Wrapping multiply-add hash of the band's hashes
+        keys = (block * mix).sum(axis=1, dtype=np.uint64)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        leader = first[inverse.ravel()]
+        member = np.flatnonzero(leader != everyone)
+        if len(member) == 0:
+            continue
+        similar = estimated_similarity(signatures, member, leader[member]) >= threshold
+        links_a.append(member[similar])
+        links_b.append(leader[member[similar]])
+    a = np.concatenate(links_a) if links_a else np.zeros(0, dtype=np.int64)
+    b = np.concatenate(links_b) if links_b else np.zeros(0, dtype=np.int64)
+    roots = _components(n, a, b) if len(a) else everyone
+    _, labels, sizes = np.unique(roots, return_inverse=True, return_counts=True)
+    labels = labels.ravel()
+
+    # Renumber clusters by size (largest first) and pick the most-linked member of each
+    order = np.argsort(-sizes, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    labels = rank[labels]
+    sizes = sizes[order]
+    degree = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    by_cluster = np.lexsort((-degree, labels))
+    starts = np.searchsorted(labels[by_cluster], np.arange(len(sizes)))
+    return JourneyClusters(labels, by_cluster[starts], sizes)
+
+
+def cluster_journeys(paths: np.ndarray, n_sections: int, num_perm: int = DEFAULT_NUM_PERM,
+                     bands: int = DEFAULT_BANDS, threshold: float = DEFAULT_THRESHOLD,
+                     seed: int = 0) -> JourneyClusters:
+    """MinHash + LSH clustering of a PAD-padded path matrix (see path_matrix_from_store)"""
+    signatures = MinHasher(n_sections, num_perm=num_perm, seed=seed).signatures(paths)
+    return lsh_clusters(signatures, bands=bands, threshold=threshold, seed=seed)
+
+
+def near_duplicates(paths: np.ndarray, n_sections: int, threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                    seed: int = 0) -> JourneyClusters:
+    """Groups of journeys with (almost) the same sections and transitions"""
+    return cluster_journeys(paths, n_sections, bands=8, threshold=threshold, seed=seed)
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Any, Tuple, Optional
+
+import cv2
+import numpy as np
+import PIL.Image
+
+from simulation.pathfinding_cv import (load_aisle_mask, snap_to_aisle, label_components, same_component,
+                                       snap_to_component, reachability_report, smooth_path, nearest_walkable_index,
+                                       ROUTING_ENGINES)
+from simulation.section_map import walking_voronoi, walking_distances, trajectory_points, attribute_trajectory
+
+# Tile edge (pixels) used to track which parts of the aisle grid a cached route crosses
+ROUTE_TILE = 32
+# How point coordinates are given: image fractions, pixels, or decided from the data
+POSITION_UNITS = ("auto", "fraction", "pixels")
+
+
+def load_store_layout(layout_path: str) -> Dict[str, Any]:
+    with open(layout_path, "r") as f:
+        return json.load(f)
+
+
+def section_pixel_coords(store_data: Dict[str, Any], width: int, height: int) -> Dict[str, Tuple[int, int]]:
+    """Section positions in (row, col) pixels; positions in [0, 1] are treated as fractions of the image"""
+    coords = {}
+    for s in store_data['sections']:
+        x, y = s['position']['x'], s['position']['y']
+        if 0 <= x <= 1 and 0 <= y <= 1:
+            px, py = int(x * width), int(y * height)
+        else:
+            px, py = int(x), int(y)
+        coords[s['name']] = (py, px)
+    return coords
+
+
+def position_units(x: np.ndarray, y: np.ndarray) -> str:
+    """'fraction' if every point lies in [0, 1] (as layout positions may), else 'pixels'"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) and x.min() >= 0 and x.max() <= 1 and y.min() >= 0 and y.max() <= 1:
+        return "fraction"
+    return "pixels"
+
+
+def pixel_positions(x: np.ndarray, y: np.ndarray, width: int, height: int,
+                    units: str = "auto") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized section_pixel_coords for point arrays: (rows, cols). units is "fraction"
+    (scaled to the image), "pixels", or "auto" to decide once for the whole array.
+    """
+    if units not in POSITION_UNITS:
+        raise ValueError(f"units must be one of {', '.join(POSITION_UNITS)}")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if units == "auto":
+        units = position_units(x, y)
+    if units == "fraction":
+        x, y = x * width, y * height
+    return y.astype(np.int64), x.astype(np.int64)
+
+
+def route_tiles(segment, grid_shape, tile: int = ROUTE_TILE) -> np.ndarray:
+    """Ids of the tiles a routed segment passes through"""
+    pts = np.asarray(segment, dtype=np.int64)
+    tiles_x = (grid_shape[1] + tile - 1) // tile
+    return np.unique((pts[:, 0] // tile) * tiles_x + pts[:, 1] // tile)
+
+
+class StoreState:
+    """
+    Snapshot of one store's layout and aisle grid plus lazily filled routing caches.
+    The layout and grid of a snapshot never change; a reload builds a new snapshot
+    while readers keep using the one they hold.
+    """
+
+    def __init__(self, store_data: Dict[str, Any], grid: np.ndarray, mask: np.ndarray,
+                 size: Tuple[int, int], layout_mtime: float = 0.0, mask_mtime: float = 0.0,
+                 engine: str = "dial", labels: np.ndarray = None):
+        self.store_data = store_data
+        self.grid = grid
+        self.mask = mask
+        self.width, self.height = size
+        self.layout_mtime = layout_mtime
+        self.mask_mtime = mask_mtime
+        # Dial's bucket queue is the default: same optimal cost as A*, far less heap overhead
+        self.engine = engine
+        self.section_coords = section_pixel_coords(store_data, self.width, self.height)
+        # Connected walkable regions, labelled once so unreachable pairs are rejected in O(1)
+        self.labels = label_components(grid) if labels is None else labels
+        self.snapped: Dict[str, Tuple[int, int]] = {}
+        self.routes: Dict[Tuple[str, str], Optional[List[Tuple[int, int]]]] = {}
+        self.route_tile_ids: Dict[Tuple[str, str], np.ndarray] = {}
+        self.smoothed_routes: Dict[Tuple[str, str, bool], List[Tuple[int, int]]] = {}
+        self.section_names = list(self.section_coords)
+        self._section_labels: Optional[np.ndarray] = None
+        self._nearest_walkable: Optional[np.ndarray] = None
+        self._distance_rows: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def snapped_point(self, section: str) -> Tuple[int, int]:
+        point = self.snapped.get(section)
+        if point is None:
+            point = tuple(int(v) for v in snap_to_aisle(self.grid, self.section_coords[section]))
+            with self._lock:
+                self.snapped[section] = point
+        return point
+
+    def route(self, start_section: str, end_section: str, resnap: bool = False):
+        """
+        Cached shortest route between two sections' snapped points (None if unreachable).
+        With resnap, a start stop in a different walkable region than the destination is
+        moved to the nearest pixel of the destination's region instead of failing.
+        """
+        key = (start_section, end_section)
+        if key in self.routes and not (resnap and self.routes[key] is None):
+            return self.routes[key]
+        start, end = self.snapped_point(start_section), self.snapped_point(end_section)
+        if resnap and not same_component(self.labels, start, end):
+            key = (start_section, end_section, "resnap")
+            if key in self.routes:
+                return self.routes[key]
+            start = snap_to_component(self.labels, start, self.labels[end])
+        segment = ROUTING_ENGINES[self.engine](self.grid, start, end, labels=self.labels)
+        with self._lock:
+            self.routes[key] = segment
+            if segment is not None:
+                self.route_tile_ids[key] = route_tiles(segment, self.grid.shape)
+        return segment
+
+    def smoothed_route(self, start_section: str, end_section: str, resnap: bool = False):
+        """Any-angle version of route(): a handful of vertices with true Euclidean length"""
+        segment = self.route(start_section, end_section, resnap=resnap)
+        if segment is None:
+            return None
+        key = (start_section, end_section, resnap)
+        smoothed = self.smoothed_routes.get(key)
+        if smoothed is None:
+            smoothed = smooth_path(self.grid, segment)
+            with self._lock:
+                self.smoothed_routes[key] = smoothed
+        return smoothed
+
+    def route_sections(self, sections: List[str], resnap: bool = False, smooth: bool = False):
+        """Route a sequence of sections; same return shape as pathfinding_cv.route_stops"""
+        sections = [s for s in sections if s in self.section_coords]
+        snapped_stops = [self.snapped_point(s) for s in sections]
+        path_segments = []
+        failed_pairs = []
+        route = self.smoothed_route if smooth else self.route
+        for i in range(len(sections)-1):
+            segment = route(sections[i], sections[i+1], resnap=resnap)
+            if segment is None:
+                failed_pairs.append((snapped_stops[i], snapped_stops[i+1]))
+                continue
+            path_segments.append(segment)
+        return snapped_stops, path_segments, failed_pairs
+
+    @property
+    def section_labels(self) -> np.ndarray:
+        """
+        Pixel -> section index image (into section_names) by walking distance from each
+        section's snapped point; built on first use, -1 off the aisles
+        """
+        if self._section_labels is None:
+            seeds = [self.snapped_point(s) for s in self.section_names]
+            labels, _ = walking_voronoi(self.grid, seeds)
+            with self._lock:
+                self._section_labels = labels
+        return self._section_labels
+
+    @property
+    def nearest_walkable(self) -> np.ndarray:
+        """Per-pixel flat index of the nearest walkable pixel, for vectorized snapping; built on first use"""
+        if self._nearest_walkable is None:
+            nearest = nearest_walkable_index(self.grid)
+            with self._lock:
+                self._nearest_walkable = nearest
+        return self._nearest_walkable
+
+    def section_distance_row(self, index: int) -> np.ndarray:
+        """Walking distances (pixels) from section_names[index] to every section; NaN if unreachable"""
+        row = self._distance_rows.get(index)
+        if row is None:
+            targets = [self.snapped_point(s) for s in self.section_names]
+            row = walking_distances(self.grid, targets[index], targets)
+            with self._lock:
+                self._distance_rows[index] = row
+        return row
+
+    def section_distances(self, sources: List[int] = None) -> np.ndarray:
+        """
+        Section-to-section walking-distance matrix in pixels, one aisle-grid search per
+        source section, cached per row; rows not in sources (default: all) are NaN
+        """
+        n = len(self.section_names)
+        matrix = np.full((n, n), np.nan)
+        for i in (range(n) if sources is None else sources):
+            matrix[i] = self.section_distance_row(i)
+        return matrix
+
+    def attribute_segments(self, path_segments, times=None, min_stop: float = 1.0) -> Dict[str, np.ndarray]:
+        """Per-section dwell, visits, stops and pass-throughs of a routed (or recorded) pixel path"""
+        points = trajectory_points(path_segments)
+        return attribute_trajectory(self.section_labels, points, len(self.section_names),
+                                    times=times, min_stop=min_stop)
+
+    def reachability(self) -> Dict[str, Dict[str, Any]]:
+        """Per-section reachability diagnostics for this layout and mask"""
+        return reachability_report(self.grid, self.labels, self.section_coords)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by this snapshot"""
+        route_points = sum(len(r) for r in self.routes.values() if r)
+        route_points += sum(len(r) for r in self.smoothed_routes.values())
+        # A routed point is a tuple of two ints: roughly 120 bytes in CPython
+        labels_bytes = self._section_labels.nbytes if self._section_labels is not None else 0
+        labels_bytes += self._nearest_walkable.nbytes if self._nearest_walkable is not None else 0
+        labels_bytes += sum(row.nbytes for row in self._distance_rows.values())
+        return int(self.grid.nbytes + self.mask.nbytes + self.labels.nbytes + labels_bytes + route_points * 120)
+
+
+def load_store_state(layout_path: str, mask_path: str, map_path: str) -> StoreState:
+    """Load layout and aisle mask, aligning the walkable grid to the store map size"""
+    store_data = load_store_layout(layout_path)
+    with PIL.Image.open(map_path) as img:
+        size = img.size
+    grid, mask = load_aisle_mask(mask_path)
+    if grid.shape[:2] != (size[1], size[0]):
+        logging.warning(f"Resizing aisle mask from {grid.shape[1]}x{grid.shape[0]} to {size[0]}x{size[1]} for alignment.")
+        grid = cv2.resize(grid, size, interpolation=cv2.INTER_NEAREST)
+        mask = cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)
+    return StoreState(store_data, grid, mask, size,
+                      layout_mtime=os.path.getmtime(layout_path), mask_mtime=os.path.getmtime(mask_path))
+
+
+class StoreAssets:
+    """
+    Holds the current StoreState for one store and swaps in reloaded snapshots
+    """
+
+    def __init__(self, layout_path: str, mask_path: str, map_path: str):
+        self.layout_path = layout_path
+        self.mask_path = mask_path
+        self.map_path = map_path
+        self.state = load_store_state(layout_path, mask_path, map_path)
+
+    def __getattr__(self, name):
+        # Delegate reads (grid, section_coords, route_sections, ...) to the current snapshot
+        return getattr(self.__dict__["state"], name)
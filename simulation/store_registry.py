@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+from simulation.store_assets import StoreAssets, load_store_layout
+from simulation.hot_reload import HotReloader
+
+# Paths in the registry config are resolved against the project root, not the CWD
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, "data", "stores.json")
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+
+class StoreRegistry:
+    """
+    Loads per-store layout, aisle grid and route caches on demand and shares them
+    across simulators. Whole-store state is evicted least-recently-used first once
+    the total footprint exceeds memory_budget bytes.
+    """
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 watch: bool = False):
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        self.stores: Dict[str, Dict[str, str]] = {}
+        for store_id, entry in config["stores"].items():
+            self.stores[store_id] = {
+                "name": entry.get("name", store_id),
+                "layout": os.path.join(PROJECT_ROOT, entry["layout"]),
+                "mask": os.path.join(PROJECT_ROOT, entry["mask"]),
+                "map": os.path.join(PROJECT_ROOT, entry["map"]),
+            }
+            if entry.get("personas"):
+                # Optional calibrated persona file loaded by CustomerSimulator
+                self.stores[store_id]["personas"] = os.path.join(PROJECT_ROOT, entry["personas"])
+            if entry.get("arrivals"):
+                # Optional time-of-day arrival profile for day simulations
+                self.stores[store_id]["arrivals"] = os.path.join(PROJECT_ROOT, entry["arrivals"])
+        self.default_store = config.get("default_store", next(iter(self.stores)))
+        self.memory_budget = memory_budget
+        self.watch = watch
+        self._assets: "OrderedDict[str, StoreAssets]" = OrderedDict()
+        self._reloaders: Dict[str, Any] = {}
+        self._layouts: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def store_ids(self) -> List[str]:
+        return list(self.stores)
+
+    def resolve(self, store_id: Optional[str]) -> str:
+        store_id = store_id or self.default_store
+        if store_id not in self.stores:
+            raise KeyError(f"Unknown store id: {store_id}")
+        return store_id
+
+    def paths(self, store_id: str = None) -> Dict[str, str]:
+        return self.stores[self.resolve(store_id)]
+
+    def layout(self, store_id: str = None) -> Dict[str, Any]:
+        """Parsed store_layout.json; cheap, and does not load the aisle mask"""
+        store_id = self.resolve(store_id)
+        with self._lock:
+            if store_id in self._assets:
+                return self._assets[store_id].state.store_data
+            if store_id not in self._layouts:
+                self._layouts[store_id] = load_store_layout(self.stores[store_id]["layout"])
+            return self._layouts[store_id]
+
+    def get(self, store_id: str = None) -> StoreAssets:
+        """Shared StoreAssets for a store, loading it (and evicting others) as needed"""
+        store_id = self.resolve(store_id)
+        with self._lock:
+            assets = self._assets.get(store_id)
+            if assets is not None:
+                self._assets.move_to_end(store_id)
+            else:
+                paths = self.stores[store_id]
+                assets = StoreAssets(paths["layout"], paths["mask"], paths["map"])
+                self._assets[store_id] = assets
+                if self.watch:
+                    self._reloaders[store_id] = HotReloader(assets).start()
+            self._enforce_budget(keep=store_id)
+            return assets
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held per loaded store (route caches grow as routes are requested)"""
+        with self._lock:
+            return {store_id: assets.state.nbytes for store_id, assets in self._assets.items()}
+
+    def _enforce_budget(self, keep: str):
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        for store_id in list(self._assets):
+            if total <= self.memory_budget:
+                break
+            if store_id == keep:
+                continue
+            total -= usage[store_id]
+            self.evict(store_id)
+        if total > self.memory_budget:
+            logging.warning(f"Store {keep} alone uses {total} bytes, above the {self.memory_budget} byte budget")
+
+    def evict(self, store_id: str):
+        """Drop all cached state for a store; simulators holding its assets keep their reference"""
+        with self._lock:
+            self._assets.pop(store_id, None)
+            reloader = self._reloaders.pop(store_id, None)
+        if reloader is not None:
+            reloader.stop()
+        logging.info(f"Evicted store state: {store_id}")
+
+
+_default_registry: Optional[StoreRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry() -> StoreRegistry:
+    """Process-wide registry shared by every CustomerSimulator"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = StoreRegistry()
+        return _default_registry
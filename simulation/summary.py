@@ -0,0 +1,142 @@
+from typing import Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+from simulation.travel import journey_total_time
+
+# Columnar persona summaries. Journeys are turned into flat numpy columns once
+# (straight from the journey store's memmap, or from result dicts for small lists),
+# then every per-persona statistic is a grouped numpy/pandas aggregation.
+
+SPECIAL_TYPES = ("entry", "exit", "checkout")
+
+
+class JourneyColumns:
+    """Column arrays for a batch of journeys"""
+
+    def __init__(self, personas: List[str], persona: np.ndarray, total_time: np.ndarray,
+                 path_len: np.ndarray, skipped_count: np.ndarray, visited: np.ndarray,
+                 sections: List[str], special_mask: np.ndarray):
+        self.personas = personas           # persona vocabulary; persona holds indices into it
+        self.persona = persona
+        self.total_time = total_time
+        self.path_len = path_len
+        self.skipped_count = skipped_count
+        self.visited = visited             # (n, n_sections) bool
+        self.sections = sections
+        self.special_mask = special_mask   # sections excluded from coverage (entrances, exits, checkout)
+
+    def __len__(self) -> int:
+        return len(self.persona)
+
+    @property
+    def coverage(self) -> np.ndarray:
+        """Share of regular sections visited, as shown in the app's Path Analysis"""
+        regular = ~self.special_mask
+        total = max(int(regular.sum()), 1)
+        return self.visited[:, regular].sum(axis=1) / total
+
+    @property
+    def skip_rate(self) -> np.ndarray:
+        return self.skipped_count / max(len(self.sections), 1)
+
+    @property
+    def efficiency(self) -> np.ndarray:
+        """path / (path + skipped), matching generate_advanced_analytics' efficiency_score"""
+        denom = self.path_len + self.skipped_count
+        return np.divide(self.path_len, denom, out=np.zeros(len(self), dtype=np.float64), where=denom > 0)
+
+
+def special_section_mask(store_data: Dict[str, Any], sections: List[str]) -> np.ndarray:
+    special = {s['name'] for s in store_data.get('sections', []) if s.get('type') in SPECIAL_TYPES}
+    return np.array([s in special for s in sections], dtype=bool)
+
+
+def columns_from_store(store, store_data: Dict[str, Any] = None, records: np.ndarray = None) -> JourneyColumns:
+    """Zero-copy-friendly columns over a JourneyStore (tombstoned records excluded)"""
+    if records is None:
+        records = store.records()
+    live = store.live_mask(records)
+    records = records[live] if not live.all() else records
+    special = special_section_mask(store_data or {}, store.sections)
+    return JourneyColumns(
+        personas=store.personas,
+        persona=np.asarray(records["persona"], dtype=np.int64),
+        total_time=np.asarray(records["total_time"], dtype=np.float64),
+        path_len=np.asarray(records["path_len"], dtype=np.float64),
+        skipped_count=np.asarray(records["skipped_count"], dtype=np.float64),
+        visited=np.asarray(records["dwell"]) > 0,
+        sections=store.sections,
+        special_mask=special,
+    )
+
+
+def columns_from_results(results_list: List[Dict[str, Any]], sections: List[str] = None,
+                         store_data: Dict[str, Any] = None) -> JourneyColumns:
+    """Columns for an in-memory list of simulate_journey results"""
+    if sections is None and store_data:
+        sections = [s['name'] for s in store_data.get('sections', [])]
+    if sections is None:
+        sections = list(dict.fromkeys(s for r in results_list for s in r.get('path', [])))
+    section_ids = {s: i for i, s in enumerate(sections)}
+    personas = list(dict.fromkeys(r.get('persona', 'Unknown') for r in results_list))
+    persona_ids = {p: i for i, p in enumerate(personas)}
+    n = len(results_list)
+    visited = np.zeros((n, len(sections)), dtype=bool)
+    rows = [(j, section_ids[s]) for j, r in enumerate(results_list) for s in r.get('path', []) if s in section_ids]
+    if rows:
+        rows = np.array(rows)
+        visited[rows[:, 0], rows[:, 1]] = True
+    return JourneyColumns(
+        personas=personas,
+        persona=np.array([persona_ids[r.get('persona', 'Unknown')] for r in results_list], dtype=np.int64),
+        total_time=np.array([journey_total_time(r) for r in results_list], dtype=np.float64),
+        path_len=np.array([len(r.get('path', [])) for r in results_list], dtype=np.float64),
+        skipped_count=np.array([len(r.get('skipped', [])) for r in results_list], dtype=np.float64),
+        visited=visited,
+        sections=sections,
+        special_mask=special_section_mask(store_data or {}, sections),
+    )
+
+
+def persona_summary(columns: JourneyColumns, top_n: int = 3) -> pd.DataFrame:
+    """
+    One row per persona: journey count, total time / path length / coverage distributions,
+    skip rate and most visited sections. All aggregations are grouped, not per-journey.
+    """
+    if len(columns) == 0:
+        return pd.DataFrame()
+    frame = pd.DataFrame({
+        "persona": columns.persona,
+        "total_time": columns.total_time,
+        "path_length": columns.path_len,
+        "coverage": columns.coverage,
+        "skip_rate": columns.skip_rate,
+    })
+    grouped = frame.groupby("persona", sort=True)
+    summary = pd.DataFrame({
+        "Journeys": grouped.size(),
+        "Avg Time (min)": grouped["total_time"].mean(),
+        "P10 Time": grouped["total_time"].quantile(0.1),
+        "Median Time": grouped["total_time"].median(),
+        "P90 Time": grouped["total_time"].quantile(0.9),
+        "Avg Path Length": grouped["path_length"].mean(),
+        "Median Path Length": grouped["path_length"].median(),
+        "Avg Coverage (%)": grouped["coverage"].mean() * 100,
+        "P90 Coverage (%)": grouped["coverage"].quantile(0.9) * 100,
+        "Skip Rate (%)": grouped["skip_rate"].mean() * 100,
+    })
+    # Per-persona visit counts for every section: one bincount per section column
+    n_personas = len(columns.personas)
+    regular = np.flatnonzero(~columns.special_mask)
+    counts = np.stack([np.bincount(columns.persona, weights=columns.visited[:, j], minlength=n_personas)
+                       for j in regular], axis=1) if len(regular) else np.zeros((n_personas, 0))
+    top = np.argsort(-counts, axis=1, kind="stable")[:, :top_n]
+    summary["Top Sections"] = [
+        ", ".join(columns.sections[regular[j]] for j in top[p] if counts[p, j] > 0)
+        for p in summary.index
+    ]
+    summary.index = [columns.personas[p] for p in summary.index]
+    summary.index.name = "Persona"
+    return summary.round(1)
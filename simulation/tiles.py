@@ -0,0 +1,224 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Multi-resolution tile pyramids for map rendering. Each layer (the store map, the
+# aisle mask, heatmaps) is stored once per zoom level as a tile-major array of
+# (rows, cols, tile, tile, channels), halving the resolution per level. Persisted
+# levels are .npy files opened as memmaps, so reading a tile touches only its pages.
+# The renderer picks the level for the requested zoom, composites only the tiles in
+# the viewport and keeps composited tiles in an LRU keyed by layer versions, so
+# layers that did not change are not blended again on the next rerun.
+
+TILE_SIZE = 256
+DEFAULT_TILE_CACHE = 128
+# Aisle mask blend strength, as in pathfinding_cv.overlay_mask_on_map
+MASK_ALPHA = 0.4
+HEAT_ALPHA = 0.55
+
+
+def pyramid_levels(image: np.ndarray, tile: int = TILE_SIZE) -> List[np.ndarray]:
+    """Full-resolution image, then halved copies until one tile covers the image"""
+    levels = [image]
+    while max(levels[-1].shape[:2]) > tile:
+        h, w = levels[-1].shape[:2]
+        half = cv2.resize(levels[-1], ((w + 1) // 2, (h + 1) // 2), interpolation=cv2.INTER_AREA)
+        levels.append(half.reshape(half.shape[:2] + image.shape[2:]))
+    return levels
+
+
+def to_tiles(image: np.ndarray, tile: int = TILE_SIZE) -> np.ndarray:
+    """(rows, cols, tile, tile, channels) tile-major copy of an image, zero padded at the edges"""
+    if image.ndim == 2:
+        image = image[:, :, None]
+    h, w, channels = image.shape
+    rows, cols = -(-h // tile), -(-w // tile)
+    padded = np.zeros((rows * tile, cols * tile, channels), dtype=image.dtype)
+    padded[:h, :w] = image
+    return np.ascontiguousarray(padded.reshape(rows, tile, cols, tile, channels).transpose(0, 2, 1, 3, 4))
+
+
+class TilePyramid:
+    """
+    One layer at every zoom level. version identifies the source the tiles were built
+    from; renderer caches are keyed by it.
+    """
+
+    def __init__(self, levels: List[np.ndarray], width: int, height: int, tile: int = TILE_SIZE, version: str = ""):
+        self.levels = levels
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.version = version
+
+    @property
+    def channels(self) -> int:
+        return self.levels[0].shape[-1]
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        """(width, height) in pixels of a level"""
+        scale = 1 << level
+        return -(-self.width // scale), -(-self.height // scale)
+
+    @classmethod
+    def build(cls, image: np.ndarray, tile: int = TILE_SIZE, version: str = "") -> "TilePyramid":
+        h, w = image.shape[:2]
+        return cls([to_tiles(level, tile) for level in pyramid_levels(image, tile)], w, h, tile, version)
+
+    def save(self, directory: str):
+        """Write levels as .npy files plus meta.json (written last, so a partial build is never opened)"""
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for i, level in enumerate(self.levels):
+            tmp = os.path.join(directory, f"level_{i}.tmp.npy")
+            np.save(tmp, level)
+            os.replace(tmp, os.path.join(directory, f"level_{i}.npy"))
+        meta = {"width": self.width, "height": self.height, "tile": self.tile, "levels": len(self.levels),
+                "version": self.version}
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def open(cls, directory: str) -> "TilePyramid":
+        """Memory-map a saved pyramid"""
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        levels = [np.load(os.path.join(directory, f"level_{i}.npy"), mmap_mode="r") for i in range(meta["levels"])]
+        return cls(levels, meta["width"], meta["height"], meta["tile"], meta["version"])
+
+
+def file_version(*paths: str) -> str:
+    """Version string of source files: modification times and sizes"""
+    return ";".join(f"{os.path.getmtime(p)}:{os.path.getsize(p)}" for p in paths)
+
+
+def ensure_pyramid(directory: str, version: str, build_image: Callable[[], np.ndarray],
+                   tile: int = TILE_SIZE) -> TilePyramid:
+    """Open the saved pyramid if it was built from this version of its source, else build and save it"""
+    meta_path = os.path.join(directory, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("version") == version and meta.get("tile") == tile:
+            return TilePyramid.open(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+    TilePyramid.build(build_image(), tile, version).save(directory)
+    return TilePyramid.open(directory)
+
+
+def mask_layer(mask: np.ndarray, alpha: float = MASK_ALPHA) -> np.ndarray:
+    """BGRA overlay of the decoded aisle mask at a uniform blend strength"""
+    if mask.ndim == 2:
+        mask = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+    elif mask.shape[2] == 4:
+        mask = cv2.cvtColor(mask, cv2.COLOR_BGRA2BGR)
+    layer = np.empty(mask.shape[:2] + (4,), dtype=np.uint8)
+    layer[:, :, :3] = mask
+    layer[:, :, 3] = int(round(alpha * 255))
+    return layer
+
+
+def heat_layer(section_labels: np.ndarray, values: np.ndarray, alpha: float = HEAT_ALPHA,
+               colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
+    """
+    BGRA heatmap painting each aisle pixel with its section's value (section_labels
+    from StoreState.section_labels); sections with no value and non-aisle pixels stay clear
+    """
+    values = np.asarray(values, dtype=np.float64)
+    top = values.max() if len(values) and values.max() > 0 else 1.0
+    levels = np.clip(values / top * 255, 0, 255).astype(np.uint8)
+    colors = cv2.applyColorMap(levels.reshape(-1, 1), colormap).reshape(-1, 3)
+    # One extra entry for off-aisle pixels (label -1)
+    lut = np.zeros((len(values) + 1, 4), dtype=np.uint8)
+    lut[:-1, :3] = colors
+    lut[:-1, 3] = np.where(values > 0, int(round(alpha * 255)), 0)
+    return lut[np.where(section_labels >= 0, section_labels, len(values))]
+
+
+def blend(base: np.ndarray, overlay: np.ndarray) -> np.ndarray:
+    """Alpha-composite a BGRA overlay onto a BGR image of the same size"""
+    alpha = overlay[:, :, 3:].astype(np.uint16)
+    mixed = base.astype(np.uint16) * (255 - alpha) + overlay[:, :, :3].astype(np.uint16) * alpha
+    return ((mixed + 127) // 255).astype(np.uint8)
+
+
+class TileRenderer:
+    """
+    Composites a base map pyramid with overlay pyramids for a viewport and zoom level.
+    Composited tiles are kept in an LRU keyed by the layer versions, level and tile.
+    """
+
+    def __init__(self, base: TilePyramid, cache_tiles: int = DEFAULT_TILE_CACHE):
+        self.base = base
+        self.cache_tiles = cache_tiles
+        self._cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def level_for(self, viewport_width: float, output_width: Optional[int]) -> int:
+        """Coarsest level that still has at least output_width pixels across the viewport"""
+        if not output_width or viewport_width <= output_width:
+            return 0
+        level = int(np.floor(np.log2(viewport_width / output_width)))
+        return min(level, len(self.base.levels) - 1)
+
+    def _tile(self, level: int, r: int, c: int, overlays: List[TilePyramid]) -> np.ndarray:
+        key = (self.base.version, tuple(o.version for o in overlays), level, r, c)
+        with self._lock:
+            tile = self._cache.get(key)
+            if tile is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return tile
+        tile = np.array(self.base.levels[level][r, c])
+        for overlay in overlays:
+            if overlay.width != self.base.width or overlay.height != self.base.height:
+                raise ValueError("Overlay pyramids must match the base map size")
+            tile = blend(tile, overlay.levels[level][r, c])
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = tile
+            while len(self._cache) > self.cache_tiles:
+                self._cache.popitem(last=False)
+        return tile
+
+    def render(self, viewport: Tuple[float, float, float, float] = None, output_width: int = None,
+               overlays: List[TilePyramid] = ()) -> Dict[str, Any]:
+        """
+        Composite the viewport (x0, y0, x1, y1 in full-resolution pixels; default: the
+        whole map) at the level matching output_width. Returns the image (BGR, at the
+        level's resolution), the level and the viewport actually rendered.
+        """
+        x0, y0, x1, y1 = viewport or (0, 0, self.base.width, self.base.height)
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(self.base.width, int(np.ceil(x1))), min(self.base.height, int(np.ceil(y1)))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("Empty viewport")
+        level = self.level_for(x1 - x0, output_width)
+        scale = 1 << level
+        width, height = self.base.level_size(level)
+        lx0, ly0 = x0 // scale, y0 // scale
+        lx1, ly1 = min(width, -(-x1 // scale)), min(height, -(-y1 // scale))
+        tile = self.base.tile
+        rows = range(ly0 // tile, -(-ly1 // tile))
+        cols = range(lx0 // tile, -(-lx1 // tile))
+        image = np.empty((ly1 - ly0, lx1 - lx0, 3), dtype=np.uint8)
+        for r in rows:
+            for c in cols:
+                composited = self._tile(level, r, c, list(overlays))
+                ty0, tx0 = max(ly0, r * tile), max(lx0, c * tile)
+                ty1, tx1 = min(ly1, (r + 1) * tile), min(lx1, (c + 1) * tile)
+                image[ty0 - ly0:ty1 - ly0, tx0 - lx0:tx1 - lx0] = composited[ty0 - r * tile:ty1 - r * tile,
+                                                                           tx0 - c * tile:tx1 - c * tile]
+        return {"image": image, "level": level, "scale": scale, "viewport": (x0, y0, x1, y1),
+                "tiles": len(rows) * len(cols)}
@@ -0,0 +1,249 @@
+import json
+import struct
+import zlib
+from typing import Dict, List, Any, Iterator, Optional, Tuple, BinaryIO
+
+import numpy as np
+
+# Compact binary encoding of routed journeys.
+#
+# File layout:
+#   header   8s magic b"SHOPTWTR", u2 version, u2 reserved
+#   chunks   b"C", u4 compressed size, u4 journeys, then zlib(payload)
+#   index    b"I", u4 journeys, u4 chunks, u8[chunks] chunk file offsets,
+#            u4[journeys] chunk id, u4[journeys] byte offset in the chunk's varint stream
+#   trailer  u8 index offset, 8s b"STTRIEND"
+#
+# Chunk payload: u4 varint stream length, varint stream, JSON list of per-journey metadata.
+# Per journey the varint stream holds: n_segments, then per segment n_vertices followed by
+# zigzag-encoded int16 (dy, dx) deltas. Deltas run across segment boundaries and the first
+# vertex is relative to (0, 0), so every value is a small unsigned varint.
+
+MAGIC = b"SHOPTWTR"
+TRAILER_MAGIC = b"STTRIEND"
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_JOURNEYS = 1024
+
+
+def zigzag_encode(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int32)
+    return ((values << 1) ^ (values >> 31)).astype(np.uint32)
+
+
+def zigzag_decode(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return (values >> 1) ^ -(values & 1)
+
+
+def varint_encode(values: np.ndarray) -> bytes:
+    """LEB128-encode a uint32 array in one vectorized pass"""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b""
+    nbytes = np.ones(values.shape, dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        nbytes += values >= (1 << shift)
+    ends = np.cumsum(nbytes)
+    out = np.zeros(int(ends[-1]), dtype=np.uint8)
+    starts = ends - nbytes
+    for k in range(int(nbytes.max())):
+        has = nbytes > k
+        byte = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = nbytes[has] > k + 1
+        out[starts[has] + k] = byte.astype(np.uint8) | (more.astype(np.uint8) << 7)
+    return out.tobytes()
+
+
+def varint_decode(data) -> np.ndarray:
+    """Decode a whole LEB128 byte stream into a uint64 array in one vectorized pass"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(buf < 0x80)
+    if ends.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    buf = buf[:ends[-1] + 1]
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shift = ((np.arange(buf.size) - starts[group]) * 7).astype(np.uint64)
+    parts = (buf & 0x7F).astype(np.uint64) << shift
+    return np.add.reduceat(parts, starts)
+
+
+def encode_journey(segments: List[List[Tuple[int, int]]]) -> np.ndarray:
+    """Varint-ready value stream (before LEB128) for one journey's routed segments"""
+    parts = [np.array([len(segments)], dtype=np.uint32)]
+    prev = np.zeros(2, dtype=np.int32)
+    for segment in segments:
+        pts = np.asarray(segment, dtype=np.int32).reshape(-1, 2)
+        if pts.size and (pts.min() < -32768 or pts.max() > 32767):
+            raise ValueError("Trajectory coordinates must fit in int16")
+        deltas = np.diff(np.vstack([prev, pts]), axis=0)
+        if len(pts):
+            prev = pts[-1]
+        parts.append(np.array([len(pts)], dtype=np.uint32))
+        parts.append(zigzag_encode(deltas.ravel()))
+    return np.concatenate(parts)
+
+
+class TrajectoryWriter:
+    """
+    Streams journeys into the compressed trajectory format; works on any writable
+    binary file object (file, BytesIO, socket) since it never seeks.
+    """
+
+    def __init__(self, fileobj: BinaryIO, chunk_journeys: int = DEFAULT_CHUNK_JOURNEYS, level: int = 6):
+        self.f = fileobj
+        self.chunk_journeys = chunk_journeys
+        self.level = level
+        self.offset = 0
+        self.chunk_offsets: List[int] = []
+        self.journey_chunks: List[int] = []
+        self.journey_offsets: List[int] = []
+        self._stream: List[bytes] = []
+        self._stream_len = 0
+        self._meta: List[Any] = []
+        self._write(struct.pack("<8sHH", MAGIC, FORMAT_VERSION, 0))
+
+    def _write(self, data: bytes):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def add(self, segments: List[List[Tuple[int, int]]], meta: Optional[Dict[str, Any]] = None):
+        """Add one journey as a list of (y, x) polylines (e.g. routed segments between stops)"""
+        encoded = varint_encode(encode_journey(segments))
+        self.journey_chunks.append(len(self.chunk_offsets))
+        self.journey_offsets.append(self._stream_len)
+        self._stream.append(encoded)
+        self._stream_len += len(encoded)
+        self._meta.append(meta)
+        if len(self._meta) >= self.chunk_journeys:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        if not self._meta:
+            return
+        stream = b"".join(self._stream)
+        payload = struct.pack("<I", len(stream)) + stream + json.dumps(self._meta).encode("utf-8")
+        compressed = zlib.compress(payload, self.level)
+        self.chunk_offsets.append(self.offset)
+        self._write(b"C" + struct.pack("<II", len(compressed), len(self._meta)) + compressed)
+        self._stream, self._stream_len, self._meta = [], 0, []
+
+    def close(self):
+        """Flush the last chunk and write the random-access index"""
+        self._flush_chunk()
+        index_offset = self.offset
+        self._write(b"I" + struct.pack("<II", len(self.journey_chunks), len(self.chunk_offsets)))
+        self._write(np.asarray(self.chunk_offsets, dtype="<u8").tobytes())
+        self._write(np.asarray(self.journey_chunks, dtype="<u4").tobytes())
+        self._write(np.asarray(self.journey_offsets, dtype="<u4").tobytes())
+        self._write(struct.pack("<Q8s", index_offset, TRAILER_MAGIC))
+        self.f.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def _read_header(f: BinaryIO):
+    magic, version, _ = struct.unpack("<8sHH", f.read(12))
+    if magic != MAGIC:
+        raise ValueError("Not a ShopTwin trajectory file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported trajectory format version {version}")
+
+
+def _decode_chunk(compressed: bytes):
+    payload = zlib.decompress(compressed)
+    (stream_len,) = struct.unpack_from("<I", payload)
+    stream = payload[4:4 + stream_len]
+    meta = json.loads(payload[4 + stream_len:].decode("utf-8"))
+    return stream, meta
+
+
+def _parse_journeys(values: np.ndarray, count: int, pos: int = 0) -> Iterator[List[np.ndarray]]:
+    """Walk a decoded value stream yielding each journey's segments as (n, 2) int16 arrays"""
+    for _ in range(count):
+        n_segments = int(values[pos])
+        pos += 1
+        sizes = []
+        starts = []
+        for _ in range(n_segments):
+            n = int(values[pos])
+            sizes.append(n)
+            starts.append(pos + 1)
+            pos += 1 + 2 * n
+        if n_segments:
+            deltas = np.concatenate([values[s:s + 2 * n] for s, n in zip(starts, sizes)])
+            pts = np.cumsum(zigzag_decode(deltas).reshape(-1, 2), axis=0).astype(np.int16)
+            yield np.split(pts, np.cumsum(sizes)[:-1])
+        else:
+            yield []
+
+
+def iter_trajectories(fileobj: BinaryIO) -> Iterator[Tuple[List[np.ndarray], Any]]:
+    """
+    Stream (segments, meta) for every journey, one chunk in memory at a time.
+    Reads sequentially, so it also works on non-seekable streams.
+    """
+    _read_header(fileobj)
+    while True:
+        tag = fileobj.read(1)
+        if tag != b"C":
+            return
+        size, count = struct.unpack("<II", fileobj.read(8))
+        stream, meta = _decode_chunk(fileobj.read(size))
+        values = varint_decode(stream)
+        for segments, m in zip(_parse_journeys(values, count), meta):
+            yield segments, m
+
+
+class TrajectoryReader:
+    """Random access to journeys of a trajectory file through its index"""
+
+    def __init__(self, path: str):
+        self.f = open(path, "rb")
+        _read_header(self.f)
+        self.f.seek(-16, 2)
+        index_offset, trailer = struct.unpack("<Q8s", self.f.read(16))
+        if trailer != TRAILER_MAGIC:
+            raise ValueError("Trajectory file has no index (was the writer closed?)")
+        self.f.seek(index_offset)
+        tag, n_journeys, n_chunks = struct.unpack("<cII", self.f.read(9))
+        self.chunk_offsets = np.frombuffer(self.f.read(8 * n_chunks), dtype="<u8")
+        self.journey_chunks = np.frombuffer(self.f.read(4 * n_journeys), dtype="<u4")
+        self.journey_offsets = np.frombuffer(self.f.read(4 * n_journeys), dtype="<u4")
+        self._cached_chunk = None
+
+    def __len__(self) -> int:
+        return len(self.journey_chunks)
+
+    def _chunk(self, chunk_id: int):
+        if self._cached_chunk is None or self._cached_chunk[0] != chunk_id:
+            self.f.seek(int(self.chunk_offsets[chunk_id]))
+            _, size, _ = struct.unpack("<cII", self.f.read(9))
+            self._cached_chunk = (chunk_id,) + _decode_chunk(self.f.read(size))
+        return self._cached_chunk[1], self._cached_chunk[2]
+
+    def __getitem__(self, i: int) -> Tuple[List[np.ndarray], Any]:
+        chunk_id = int(self.journey_chunks[i])
+        stream, meta = self._chunk(chunk_id)
+        first = int(np.searchsorted(self.journey_chunks, chunk_id))
+        start = int(self.journey_offsets[i])
+        same_chunk = i + 1 < len(self) and self.journey_chunks[i + 1] == chunk_id
+        end = int(self.journey_offsets[i + 1]) if same_chunk else len(stream)
+        segments = next(_parse_journeys(varint_decode(stream[start:end]), 1))
+        return segments, meta[i - first]
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
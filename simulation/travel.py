@@ -0,0 +1,123 @@
+import logging
+from typing import Dict, List, Any, Iterable, Tuple
+
+import numpy as np
+
+# Walking-time model for journeys. The pixel scale comes from the store layout
+# (meters_per_pixel, or the real store width store_width_m over the map width) and
+# section-to-section distances from walking searches on the aisle grid, cached per
+# source section on the StoreState. A batch of journeys is costed with one gather
+# over the distance matrix for all legs at once.
+
+# Shopping pace with a cart: about 0.8 m/s
+WALKING_SPEED = 48.0  # meters per minute
+# A supercenter footprint (~16,700 m²) at the store map's aspect ratio
+DEFAULT_STORE_WIDTH_M = 146.0
+
+
+def meters_per_pixel(store_data: Dict[str, Any], width: int) -> float:
+    """Map scale from the layout: explicit meters_per_pixel, else store_width_m / map width"""
+    if store_data.get("meters_per_pixel"):
+        return float(store_data["meters_per_pixel"])
+    return float(store_data.get("store_width_m", DEFAULT_STORE_WIDTH_M)) / width
+
+
+def calibrate_scale(pixel_distance: float, meters: float) -> float:
+    """Meters per pixel from one measured reference, e.g. a known aisle length on the map"""
+    if pixel_distance <= 0:
+        raise ValueError("Reference distance must be positive")
+    return meters / pixel_distance
+
+
+class TravelModel:
+    """
+    Walking distances and times between sections of one StoreState snapshot
+    """
+
+    def __init__(self, state, scale: float = None, walking_speed: float = WALKING_SPEED):
+        self.state = state
+        self.scale = scale or meters_per_pixel(state.store_data, state.width)
+        self.walking_speed = walking_speed
+        self.sections = state.section_names
+        self.index = {s: i for i, s in enumerate(self.sections)}
+        n = len(self.sections)
+        self._distances = np.full((n, n), np.nan)
+        self._loaded = np.zeros(n, dtype=bool)
+
+    def distances(self, sources: Iterable[int] = None) -> np.ndarray:
+        """
+        Section-to-section walking distances in meters, indexed like state.section_names.
+        Only rows for sources (default: all) are guaranteed to be filled.
+        """
+        rows = range(len(self.sections)) if sources is None else sources
+        for i in rows:
+            if self._loaded[i]:
+                continue
+            row = self.state.section_distance_row(i) * self.scale
+            unreachable = np.isnan(row)
+            if unreachable.any():
+                # Different walkable regions: fall back to the straight line between snapped points
+                points = np.array([self.state.snapped_point(s) for s in self.sections], dtype=np.float64)
+                straight = np.hypot(*(points - points[i]).T) * self.scale
+                row[unreachable] = straight[unreachable]
+                logging.warning(f"{int(unreachable.sum())} sections not reachable on foot from {self.sections[i]}; "
+                                f"using straight-line distances")
+            self._distances[i] = row
+            self._loaded[i] = True
+        return self._distances
+
+    def distance(self, start_section: str, end_section: str) -> float:
+        """Walking distance in meters between two sections"""
+        i, j = self.index[start_section], self.index[end_section]
+        return float(self.distances([i])[i, j])
+
+    def legs(self, results_list: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(source, destination, journey) arrays of every leg between consecutive known path sections"""
+        codes = []
+        lengths = []
+        for r in results_list:
+            path = [self.index[s] for s in r.get('path', []) if s in self.index]
+            codes.extend(path)
+            lengths.append(len(path))
+        codes = np.array(codes, dtype=np.int64)
+        journey = np.repeat(np.arange(len(results_list)), lengths)
+        same = journey[1:] == journey[:-1]
+        return codes[:-1][same], codes[1:][same], journey[:-1][same]
+
+    def apply_batch(self, results_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add walking to each result in place: leg_distance_m and leg_walk_time (minutes) per
+        leg between consecutive path sections, their totals walk_distance_m and walk_time,
+        and total_time = dwell + walking. Returns results_list.
+        """
+        if not results_list:
+            return results_list
+        src, dst, journey = self.legs(results_list)
+        matrix = self.distances(np.unique(src).tolist())
+        meters = matrix[src, dst]
+        minutes = meters / self.walking_speed
+        n = len(results_list)
+        total_m = np.bincount(journey, weights=meters, minlength=n)
+        total_min = np.bincount(journey, weights=minutes, minlength=n)
+        bounds = np.searchsorted(journey, np.arange(n + 1))
+        meters = np.round(meters, 1).tolist()
+        minutes = np.round(minutes, 2).tolist()
+        for k, r in enumerate(results_list):
+            legs = slice(bounds[k], bounds[k + 1])
+            r['leg_distance_m'] = meters[legs]
+            r['leg_walk_time'] = minutes[legs]
+            r['walk_distance_m'] = round(float(total_m[k]), 1)
+            r['walk_time'] = round(float(total_min[k]), 2)
+            r['total_time'] = round(sum(r.get('dwell_time', {}).values()) + float(total_min[k]), 1)
+        return results_list
+
+    def apply(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Add walking distances and times to one result in place (see apply_batch)"""
+        return self.apply_batch([results])[0]
+
+
+def journey_total_time(results: Dict[str, Any]) -> float:
+    """Trip minutes: total_time when walking has been added, else the dwell total"""
+    if 'total_time' in results:
+        return results['total_time']
+    return sum(results.get('dwell_time', {}).values())